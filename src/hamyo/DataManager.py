@@ -2,26 +2,222 @@ import aiosqlite
 import asyncio
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Tuple
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Dict, Iterable, List, Tuple, Union
 import pytz
 
 KST = pytz.timezone("Asia/Seoul")
 db_path = "data/voice_logs.db"
+flush_interval = 300  # 버퍼에 쌓인 음성 시간을 DB에 반영하는 주기 (초)
+
+# 채널 조건: 채널 ID 목록, 또는 expanded_tracked_channels에 저장된 source 이름 ('voice' 등)
+ChannelFilter = Union[str, List[int]]
+
+SCHEMA_VERSION = 2  # PRAGMA user_version (1: 일별 기록을 정수 일자 voice_days로 저장, 2: guild_id 분할)
+MIGRATION_CHUNK = 5000  # 스키마 마이그레이션 시 한 트랜잭션에서 옮기는 행 수
+EPOCH_DATE = datetime(1970, 1, 1).date()
+IMPORT_CHUNK = 5000  # JSON 가져오기 시 한 트랜잭션에서 반영하는 행 수
+DAILY_RETENTION_DAYS = 180  # 이보다 오래된 일별 기록은 월간 롤업만 남기고 정리 (압축)
+COMPACTION_CHUNK = 5000  # 압축 시 한 트랜잭션에서 지우는 행 수
+VACUUM_STEP_PAGES = 1000  # incremental_vacuum 한 번에 돌려주는 페이지 수
+HOURLY_BUCKETS = True  # 서버별 시간대 활동(voice_hours) 기록 여부
+KST_OFFSET = 9 * 3600  # KST는 서머타임이 없으므로 unix timestamp에 더해 로컬 시각을 구함
+# tasks.loop(time=...)용 고정 오프셋 KST (pytz 시간대를 time에 직접 넣으면 LMT(+08:28)로 해석됨)
+KST_FIXED = timezone(timedelta(seconds=KST_OFFSET))
+
+# guild_id는 채널로 정해지므로 키에 넣지 않고, 0(미분류)이면 알게 된 서버 ID로 채움
+VOICE_TIME_UPSERT = """
+    INSERT INTO voice_days (user_id, day, channel_id, seconds, guild_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, day, channel_id)
+    DO UPDATE SET seconds = seconds + excluded.seconds, guild_id = MAX(guild_id, excluded.guild_id)
+"""
+
+WEEKLY_ROLLUP_UPSERT = """
+    INSERT INTO voice_times_weekly (week_start, user_id, channel_id, seconds, guild_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(week_start, user_id, channel_id)
+    DO UPDATE SET seconds = seconds + excluded.seconds, guild_id = MAX(guild_id, excluded.guild_id)
+"""
+
+MONTHLY_ROLLUP_UPSERT = """
+    INSERT INTO voice_times_monthly (month, user_id, channel_id, seconds, guild_id)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(month, user_id, channel_id)
+    DO UPDATE SET seconds = seconds + excluded.seconds, guild_id = MAX(guild_id, excluded.guild_id)
+"""
+
+# guild_id로 나뉘는 테이블과 guild_id가 0인 행을 청크 단위로 고를 때 쓰는 키 컬럼
+GUILD_TABLES = {
+    "voice_days": "user_id, day, channel_id",
+    "voice_times_weekly": "week_start, user_id, channel_id",
+    "voice_times_monthly": "month, user_id, channel_id",
+    "tracked_channels": "channel_id, source",
+    "deleted_channels": "channel_id",
+}
+
+VOICE_HOUR_UPSERT = """
+    INSERT INTO voice_hours (guild_id, day, hour, seconds)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(guild_id, day, hour)
+    DO UPDATE SET seconds = seconds + excluded.seconds
+"""
+
+DATE_BOUND_UPSERT = """
+    INSERT INTO voice_meta (key, value) VALUES ('first_date', ?), ('last_date', ?)
+    ON CONFLICT(key) DO UPDATE SET value = CASE
+        WHEN key = 'first_date' THEN MIN(value, excluded.value)
+        ELSE MAX(value, excluded.value)
+    END
+"""
+
+# 아직 voice_days로 옮기지 않은 schema 0 일별 기록 (서버는 channel_guilds로 아는 채널만 채움)
+LEGACY_VOICE_TIMES = """
+    SELECT date, user_id, channel_id, seconds,
+           COALESCE((SELECT g.guild_id FROM channel_guilds g WHERE g.channel_id = l.channel_id), 0) AS guild_id
+      FROM voice_times l
+"""
+
+def _day_number(date_str: str) -> int:
+    """'YYYY-MM-DD' (KST 날짜)를 1970-01-01 기준 일수로 변환합니다."""
+    return (datetime.strptime(date_str, "%Y-%m-%d").date() - EPOCH_DATE).days
+
+@lru_cache(maxsize=16)
+def _day_str(day: int) -> str:
+    return (EPOCH_DATE + timedelta(days=day)).strftime("%Y-%m-%d")
+
+def _split_hours(start_ts: int, end_ts: int) -> List[Tuple[int, int, int]]:
+    """[start_ts, end_ts) 구간을 KST (일자, 시, 초) 조각으로 나눕니다."""
+    pieces = []
+    local = start_ts + KST_OFFSET
+    local_end = end_ts + KST_OFFSET
+    while local < local_end:
+        boundary = min((local // 3600 + 1) * 3600, local_end)
+        pieces.append((local // 86400, (local % 86400) // 3600, boundary - local))
+        local = boundary
+    return pieces
+
+def _iter_json_items(path: str, read_size: int = 1 << 20):
+    """
+    최상위가 객체인 JSON 파일을 (key, value) 단위로 읽습니다.
+    파일 전체를 한 번에 올리지 않고, 최상위 항목 하나씩 raw_decode로 해석합니다.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # 숫자 등은 버퍼 끝에서 잘렸을 수 있으므로 끝에 닿았으면 더 읽고 다시 해석
+                    if end < len(buf) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        skip_ws()
+        if pos >= len(buf) or buf[pos] != "{":
+            raise ValueError(f"{path}: 최상위가 JSON 객체가 아닙니다.")
+        pos += 1
+        while True:
+            skip_ws()
+            if pos < len(buf) and buf[pos] == ",":
+                pos += 1
+                skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: JSON이 중간에 끝났습니다.")
+            if buf[pos] == "}":
+                return
+            key = decode()
+            skip_ws()
+            if pos >= len(buf) or buf[pos] != ":":
+                raise ValueError(f"{path}: 잘못된 JSON 형식입니다.")
+            pos += 1
+            skip_ws()
+            yield key, decode()
+
+def _rollup_keys(date_str: str) -> Tuple[str, str]:
+    """'YYYY-MM-DD' 날짜의 (주 시작일, 'YYYY-MM') 롤업 키를 반환합니다. 주는 월요일 시작입니다."""
+    day = datetime.strptime(date_str, "%Y-%m-%d")
+    week_start = day - timedelta(days=day.weekday())
+    return week_start.strftime("%Y-%m-%d"), date_str[:7]
+
+class CompactedPeriodError(ValueError):
+    """압축되어 일별/주간 기록이 없는 기간을 일별/주간 단위로 조회하려 할 때"""
+
+    def __init__(self, horizon: datetime):
+        self.horizon = horizon
+        super().__init__(
+            f"{horizon.strftime('%Y-%m-%d')} 이전의 일별/주간 기록은 압축되어 월간 합계만 남아 있습니다. "
+            "월간 또는 누적으로 조회해주세요."
+        )
 
 class DataManager:
     _instance = None
     _initialized = False
     _init_lock = asyncio.Lock()
 
-    def __new__(cls, db_path: str = db_path):
+    def __new__(cls, db_path: str = db_path, flush_interval: int = flush_interval):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance.db_path = db_path
             cls._instance._db = None
+            # write-behind 버퍼: {(date, user_id, channel_id): seconds}
+            cls._instance.flush_interval = flush_interval
+            cls._instance._pending = {}
+            cls._instance._pending_date = None
+            cls._instance._last_flush = time.monotonic()
+            cls._instance._flush_lock = asyncio.Lock()
+            cls._instance._voice_listeners = []
+            # 세션 저널: flush와 같은 트랜잭션으로 기록할 {session_id: 마지막 적립 시각}
+            cls._instance._session_checkpoints = {}
+            # 시간대별 활동 버퍼: {(guild_id, day, hour): seconds}
+            cls._instance._pending_hours = {}
+            # channel_guilds의 메모리 사본 {channel_id: guild_id}
+            cls._instance._channel_guilds = {}
+            # expanded_tracked_channels의 메모리 사본 {source: frozenset(channel_id)}
+            cls._instance._expanded_channels = {}
+            # role_members의 메모리 사본 {role_id: frozenset(user_id)}
+            cls._instance._role_snapshots = {}
+            # voice_meta 'compacted_before'의 메모리 사본 (압축 전이면 None)
+            cls._instance._compacted_before = None
+            # schema 0의 voice_times가 남아 있는 동안 True (조회가 voice_times도 함께 읽음)
+            cls._instance._legacy_days = False
+            # False면 롤업을 voice_times까지 옮긴 뒤 다시 계산해야 하므로 조회는 일별 기록만 읽음
+            cls._instance._rollups_ready = True
+            cls._instance._migration_task = None
         return cls._instance
         
-    def __init__(self, db_path: str = db_path):
+    def __init__(self, db_path: str = db_path, flush_interval: int = flush_interval):
         # Only set the db_path if this is a new instance
         if not hasattr(self, 'db_path'):
             self.db_path = db_path
@@ -42,42 +238,310 @@ class DataManager:
         
         if self._db is None:
             self._db = await aiosqlite.connect(self.db_path)
+            async with self._db.execute("PRAGMA user_version") as cursor:
+                schema_version = (await cursor.fetchone())[0]
+            async with self._db.execute("PRAGMA page_count") as cursor:
+                is_new_file = (await cursor.fetchone())[0] == 0
+            if is_new_file:
+                # 첫 테이블을 만들기 전에만 VACUUM 없이 바꿀 수 있음 (기존 파일은 enable_incremental_vacuum)
+                await self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # 일별 기록: day는 KST 날짜의 1970-01-01 기준 일수 (유저별 기간 조회가 한 구간 스캔이 되도록 user_id 우선)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_days (
+                    user_id INTEGER NOT NULL,
+                    day INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    seconds INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, day, channel_id)
+                ) WITHOUT ROWID
+            """)
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_days_day ON voice_days (day)")
+            # 시간대별 활동: 서버 전체 (KST 일자, 시) 합계만 보관 (유저/채널 구분 없음)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_hours (
+                    guild_id INTEGER NOT NULL,
+                    day INTEGER NOT NULL,
+                    hour INTEGER NOT NULL,
+                    seconds INTEGER NOT NULL,
+                    PRIMARY KEY (guild_id, day, hour)
+                ) WITHOUT ROWID
+            """)
+            # 주간/월간 롤업: voice_days와 같은 트랜잭션에서 함께 갱신
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_times_weekly (
+                    week_start TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    seconds INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (week_start, user_id, channel_id)
+                )
+            """)
             await self._db.execute("""
-                CREATE TABLE IF NOT EXISTS voice_times (
-                    date TEXT NOT NULL,
+                CREATE TABLE IF NOT EXISTS voice_times_monthly (
+                    month TEXT NOT NULL,
                     user_id INTEGER NOT NULL,
                     channel_id INTEGER NOT NULL,
                     seconds INTEGER NOT NULL,
-                    PRIMARY KEY (date, user_id, channel_id)
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (month, user_id, channel_id)
+                )
+            """)
+            # 유저 단위 조회(개인/역할 순위)용 인덱스
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_times_weekly_user ON voice_times_weekly (user_id, week_start)")
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_times_monthly_user ON voice_times_monthly (user_id, month)")
+            # 역할 멤버 스냅샷 (역할 순위를 SQL에서 역할 멤버만 집계하기 위함)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS role_members (
+                    role_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    PRIMARY KEY (role_id, user_id)
+                ) WITHOUT ROWID
+            """)
+            # 누적 기간 계산용 메타데이터 (first_date / last_date)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
                 )
             """)
             await self._db.execute("""
                 CREATE TABLE IF NOT EXISTS deleted_channels (
                     channel_id INTEGER PRIMARY KEY,
-                    category_id INTEGER NOT NULL
+                    category_id INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            # 삭제가 확인된 채널/카테고리 ID (추적 채널 확장 시 REST 조회 생략용)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS missing_channels (
+                    channel_id INTEGER PRIMARY KEY,
+                    detected_at TEXT NOT NULL
                 )
             """)
+            # source별로 확장된 추적 채널 (TrackedChannelRegistry가 기록, 조회 시 source로 조인)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS expanded_tracked_channels (
+                    source TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    PRIMARY KEY (source, channel_id)
+                ) WITHOUT ROWID
+            """)
             await self._db.execute("""
                 CREATE TABLE IF NOT EXISTS tracked_channels (
                     channel_id INTEGER NOT NULL,
                     source TEXT NOT NULL,
+                    guild_id INTEGER NOT NULL DEFAULT 0,
                     PRIMARY KEY (channel_id, source)
                 )
             """)
+            # 채널 → 서버 매핑 (봇 채널 캐시에서 기록, guild_id가 0인 기존 행을 채우는 데 사용)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS channel_guilds (
+                    channel_id INTEGER PRIMARY KEY,
+                    guild_id INTEGER NOT NULL
+                )
+            """)
+            # 음성 세션 기록 (ended_at이 NULL이면 진행 중인 세션, 시각은 unix timestamp)
+            # checkpoint_at: voice_days에 반영이 끝난 마지막 시각 (재시작 시 이어서 적립)
+            await self._db.execute("""
+                CREATE TABLE IF NOT EXISTS voice_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    started_at INTEGER NOT NULL,
+                    ended_at INTEGER,
+                    checkpoint_at INTEGER
+                )
+            """)
+            async with self._db.execute("PRAGMA table_info(voice_sessions)") as cursor:
+                columns = await cursor.fetchall()
+            if not any(col[1] == 'checkpoint_at' for col in columns):
+                await self._db.execute("ALTER TABLE voice_sessions ADD COLUMN checkpoint_at INTEGER")
+            await self._db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_voice_sessions_open
+                ON voice_sessions (user_id, channel_id) WHERE ended_at IS NULL
+            """)
+
+            # schema 2: 기존 테이블에 guild_id 추가 (0 = 미분류, assign_channel_guilds로 채움)
+            for table in GUILD_TABLES:
+                async with self._db.execute(f"PRAGMA table_info({table})") as cursor:
+                    columns = await cursor.fetchall()
+                if not any(col[1] == 'guild_id' for col in columns):
+                    await self._db.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+            # 서버 단위 기간 조회/순위용 인덱스
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_days_guild_day ON voice_days (guild_id, day)")
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_times_weekly_guild ON voice_times_weekly (guild_id, week_start)")
+            await self._db.execute("CREATE INDEX IF NOT EXISTS idx_voice_times_monthly_guild ON voice_times_monthly (guild_id, month)")
             await self._db.commit()
 
+            await self._prepare_legacy_days()
+            if schema_version < SCHEMA_VERSION:
+                await self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                await self._db.commit()
+
+            # 롤업 테이블이 새로 생긴 경우 기존 일별 기록으로 채움 (옮길 voice_times가 남았으면 이동이 끝난 뒤)
+            async with self._db.execute("SELECT EXISTS (SELECT 1 FROM voice_times_monthly)") as cursor:
+                has_rollup = (await cursor.fetchone())[0]
+            if not has_rollup:
+                if self._legacy_days:
+                    self._rollups_ready = False
+                else:
+                    await self._rebuild_rollups()
+                    await self._db.commit()
+
+            async with self._db.execute("SELECT EXISTS (SELECT 1 FROM voice_meta WHERE key = 'first_date')") as cursor:
+                has_bounds = (await cursor.fetchone())[0]
+            if not has_bounds:
+                await self._refresh_date_bounds()
+                await self._db.commit()
+
+            expanded: Dict[str, set] = {}
+            async with self._db.execute("SELECT source, channel_id FROM expanded_tracked_channels") as cursor:
+                async for source, channel_id in cursor:
+                    expanded.setdefault(source, set()).add(channel_id)
+            self._expanded_channels = {source: frozenset(ids) for source, ids in expanded.items()}
+            async with self._db.execute("SELECT channel_id, guild_id FROM channel_guilds") as cursor:
+                self._channel_guilds = {channel_id: guild_id async for channel_id, guild_id in cursor}
+            self._compacted_before = await self.get_compaction_horizon()
+            if self._legacy_days:
+                self._migration_task = asyncio.get_running_loop().create_task(self._migrate_voice_days())
+
+    async def _prepare_legacy_days(self):
+        """
+        schema 0의 voice_times가 남아 있으면 백그라운드 이동을 준비합니다.
+        빈 테이블(이전 이동이 끝난 경우)은 바로 지우고, 이전 버전의 이동 위치(voice_days_migrated_rowid)까지
+        이미 옮겨진 행은 voice_times에서 지워 두 테이블에 같은 기록이 남지 않게 합니다.
+        """
+        async with self._db.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'voice_times')") as cursor:
+            has_legacy = (await cursor.fetchone())[0]
+        if not has_legacy:
+            return
+        async with self._db.execute("SELECT value FROM voice_meta WHERE key = 'voice_days_migrated_rowid'") as cursor:
+            row = await cursor.fetchone()
+        if row:
+            await self._db.execute("DELETE FROM voice_times WHERE rowid <= ?", (int(row[0]),))
+            await self._db.execute("DELETE FROM voice_meta WHERE key = 'voice_days_migrated_rowid'")
+        async with self._db.execute("SELECT MIN(date), MAX(date) FROM voice_times") as cursor:
+            first_date, last_date = await cursor.fetchone()
+        if first_date is None:
+            await self._db.execute("DROP TABLE voice_times")
+        else:
+            await self._db.execute(DATE_BOUND_UPSERT, (first_date, last_date))
+            self._legacy_days = True
+        await self._db.commit()
+
+    async def _migrate_voice_days(self):
+        """
+        schema 0 → 1: TEXT 날짜의 voice_times를 정수 일자의 voice_days로 옮깁니다.
+        initialize가 끝난 뒤 백그라운드 작업으로 실행되며, 옮기는 동안 조회는 남은 voice_times도 함께 읽습니다.
+        - rowid 순서로 MIGRATION_CHUNK 행씩, 옮긴 행을 voice_times에서 지우는 것까지 한 트랜잭션으로 커밋
+          (그 사이 새로 적립된 같은 날짜 기록에 더하므로 중단돼도 다음 시작 때 남은 행부터 이어서 진행)
+        - 청크마다 _flush_lock을 잡았다 놓아 실시간 음성 반영을 오래 막지 않음
+        - 다 옮기면 기간 메타데이터(필요하면 롤업도)를 다시 계산하고, 빈 voice_times는 다음 시작 때 지움
+        """
+        while True:
+            async with self._flush_lock:
+                try:
+                    async with self._db.execute(
+                        "SELECT MAX(rowid) FROM (SELECT rowid FROM voice_times ORDER BY rowid LIMIT ?)",
+                        (MIGRATION_CHUNK,)
+                    ) as cursor:
+                        chunk_end = (await cursor.fetchone())[0]
+                    if chunk_end is None:
+                        if not self._rollups_ready:
+                            await self._rebuild_rollups()
+                        self._legacy_days = False
+                        await self._refresh_date_bounds()
+                        await self._db.commit()
+                        self._rollups_ready = True
+                        return
+                    await self._db.execute(f"""
+                        INSERT INTO voice_days (user_id, day, channel_id, seconds, guild_id)
+                        SELECT user_id, CAST(julianday(date) - 2440587.5 AS INTEGER), channel_id, seconds, guild_id
+                          FROM ({LEGACY_VOICE_TIMES} WHERE l.rowid <= ?)
+                         WHERE true
+                        ON CONFLICT(user_id, day, channel_id) DO UPDATE SET
+                            seconds = seconds + excluded.seconds,
+                            guild_id = MAX(guild_id, excluded.guild_id)
+                    """, (chunk_end,))
+                    await self._db.execute("DELETE FROM voice_times WHERE rowid <= ?", (chunk_end,))
+                    await self._db.commit()
+                except asyncio.CancelledError:
+                    await self._db.rollback()
+                    raise
+                except Exception as e:
+                    await self._db.rollback()
+                    print(f"❌ voice_days 마이그레이션 중 오류 발생: {e}")
+                    return
+            await asyncio.sleep(0)
+
+    async def _wait_for_migration(self):
+        """voice_times → voice_days 백그라운드 이동이 진행 중이면 끝날 때까지 기다립니다."""
+        task = self._migration_task
+        if task is not None and not task.done():
+            await asyncio.shield(task)
+
+    async def _refresh_date_bounds(self):
+        """
+        voice_days의 가장 이른/늦은 날짜를 voice_meta에 다시 기록합니다. (커밋은 호출자가 처리)
+        압축되어 월간 롤업만 남은 달이 있으면 그 달 1일부터로 봅니다.
+        """
+        await self._db.execute("DELETE FROM voice_meta WHERE key IN ('first_date', 'last_date')")
+        async with self._db.execute("SELECT MIN(day), MAX(day) FROM voice_days") as cursor:
+            first_day, last_day = await cursor.fetchone()
+        async with self._db.execute("SELECT MIN(month) FROM voice_times_monthly") as cursor:
+            first_month = (await cursor.fetchone())[0]
+        dates = [_day_str(day) for day in (first_day, last_day) if day is not None]
+        if first_month is not None:
+            dates.append(f"{first_month}-01")
+        if self._legacy_days:
+            async with self._db.execute("SELECT MIN(date), MAX(date) FROM voice_times") as cursor:
+                dates.extend(date for date in await cursor.fetchone() if date is not None)
+        if not dates:
+            return
+        await self._db.execute(DATE_BOUND_UPSERT, (min(dates), max(dates)))
+
+    async def _rebuild_rollups(self):
+        """voice_days 전체로부터 주간/월간 롤업 테이블을 다시 계산합니다. (커밋은 호출자가 처리)"""
+        await self._db.execute("DELETE FROM voice_times_weekly")
+        await self._db.execute("DELETE FROM voice_times_monthly")
+        # 1970-01-01은 목요일이므로 (day + 3) % 7이 월요일 기준 요일
+        await self._db.execute("""
+            INSERT INTO voice_times_weekly (week_start, user_id, channel_id, seconds, guild_id)
+            SELECT date((day - (day + 3) % 7) * 86400, 'unixepoch'),
+                   user_id, channel_id, SUM(seconds), MAX(guild_id)
+              FROM voice_days
+             GROUP BY 1, user_id, channel_id
+        """)
+        await self._db.execute("""
+            INSERT INTO voice_times_monthly (month, user_id, channel_id, seconds, guild_id)
+            SELECT strftime('%Y-%m', day * 86400, 'unixepoch'), user_id, channel_id, SUM(seconds), MAX(guild_id)
+              FROM voice_days
+             GROUP BY 1, user_id, channel_id
+        """)
+
     async def close(self):
         if self._db:
+            task, self._migration_task = self._migration_task, None
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            await self.flush_voice_times()
             await self._db.close()
             self._db = None
             DataManager._initialized = False
             
-    async def register_tracked_channel(self, channel_id: int, source: str):
+    async def register_tracked_channel(self, channel_id: int, source: str, guild_id: int = 0):
         await self.ensure_initialized()
         await self._db.execute("""
-            INSERT OR IGNORE INTO tracked_channels (channel_id, source)
-            VALUES (?, ?)
-        """, (channel_id, source))
+            INSERT OR IGNORE INTO tracked_channels (channel_id, source, guild_id)
+            VALUES (?, ?, ?)
+        """, (channel_id, source, guild_id))
         await self._db.commit()
 
     async def unregister_tracked_channel(self, channel_id: int, source: str):
@@ -87,35 +551,462 @@ class DataManager:
         """, (channel_id, source))
         await self._db.commit()
 
-    async def get_tracked_channels(self, source: str) -> List[int]:
+    async def get_tracked_channels(self, source: str, guild_id: Optional[int] = None) -> List[int]:
+        """source의 추적 채널/카테고리 ID. guild_id를 주면 해당 서버 등록분만 반환합니다."""
         await self.ensure_initialized()
-        async with self._db.execute("SELECT channel_id FROM tracked_channels WHERE source = ?", (source,)) as cursor:
+        sql = "SELECT channel_id FROM tracked_channels WHERE source = ?"
+        params: List = [source]
+        if guild_id is not None:
+            sql += " AND guild_id = ?"
+            params.append(guild_id)
+        async with self._db.execute(sql, params) as cursor:
             return [row[0] async for row in cursor]
 
+    async def set_expanded_tracked_channels(self, source: str, channel_ids: Iterable[int]):
+        """source의 확장된 추적 채널 목록을 expanded_tracked_channels에 저장합니다. (바뀐 경우에만 기록)"""
+        await self.ensure_initialized()
+        channel_ids = frozenset(channel_ids)
+        if self._expanded_channels.get(source) == channel_ids:
+            return
+        async with self._flush_lock:
+            try:
+                await self._db.execute("DELETE FROM expanded_tracked_channels WHERE source = ?", (source,))
+                await self._db.executemany(
+                    "INSERT INTO expanded_tracked_channels (source, channel_id) VALUES (?, ?)",
+                    [(source, cid) for cid in channel_ids]
+                )
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                raise
+            self._expanded_channels[source] = channel_ids
+
+    async def sync_role_members(self, role_id: int, user_ids: Iterable[int]):
+        """역할 멤버 스냅샷을 갱신합니다. (바뀐 멤버만 추가/삭제)"""
+        await self.ensure_initialized()
+        user_ids = frozenset(user_ids)
+        async with self._flush_lock:
+            previous = self._role_snapshots.get(role_id)
+            if previous is None:
+                async with self._db.execute("SELECT user_id FROM role_members WHERE role_id = ?", (role_id,)) as cursor:
+                    previous = frozenset([row[0] async for row in cursor])
+            if previous == user_ids:
+                self._role_snapshots[role_id] = user_ids
+                return
+            try:
+                await self._db.executemany(
+                    "DELETE FROM role_members WHERE role_id = ? AND user_id = ?",
+                    [(role_id, uid) for uid in previous - user_ids]
+                )
+                await self._db.executemany(
+                    "INSERT INTO role_members (role_id, user_id) VALUES (?, ?)",
+                    [(role_id, uid) for uid in user_ids - previous]
+                )
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                self._role_snapshots.pop(role_id, None)
+                raise
+            self._role_snapshots[role_id] = user_ids
+
+    def _channel_condition(self, channel_filter: ChannelFilter) -> Tuple[str, List]:
+        """채널 조건을 WHERE 절로 변환합니다. source 이름이면 expanded_tracked_channels 인덱스로 조회"""
+        if isinstance(channel_filter, str):
+            return "channel_id IN (SELECT channel_id FROM expanded_tracked_channels WHERE source = ?)", [channel_filter]
+        return f"channel_id IN ({','.join('?' for _ in channel_filter)})", list(channel_filter)
+
     async def get_all_tracked_sources(self) -> List[str]:
         await self.ensure_initialized()
         async with self._db.execute("SELECT DISTINCT source FROM tracked_channels") as cursor:
             return [row[0] async for row in cursor]
 
-    async def add_voice_time(self, user_id: int, channel_id: int, seconds: int):
+    async def add_voice_time(
+        self,
+        user_id: int,
+        channel_id: int,
+        seconds: int,
+        session_id: Optional[int] = None,
+        checkpoint_at: Optional[int] = None,
+        guild_id: Optional[int] = None,
+        day: Optional[int] = None,
+        flush: bool = True
+    ):
+        """
+        음성 시간을 메모리 버퍼에 누적합니다.
+        실제 DB 반영은 flush_voice_times에서 한 번의 트랜잭션으로 처리됩니다.
+        session_id/checkpoint_at(unix timestamp)을 주면 해당 세션이 checkpoint_at까지 적립되었다고 같은 트랜잭션에 기록합니다.
+        guild_id를 주면 채널의 서버로 기억해 행의 guild_id로 기록합니다.
+        day(KST 일수)를 주면 그 날짜로 적립합니다. (생략하면 오늘)
+        flush=False면 반영 주기 검사를 건너뜁니다. (호출자가 모아서 flush_voice_times 호출)
+        """
         await self.ensure_initialized()
-        now = datetime.now(KST).strftime("%Y-%m-%d")
-        await self._db.execute("""
-            INSERT INTO voice_times (date, user_id, channel_id, seconds)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(date, user_id, channel_id)
-            DO UPDATE SET seconds = seconds + excluded.seconds
-        """, (now, user_id, channel_id, seconds))
-        await self._db.commit()
+        if not seconds:
+            return
+        if guild_id:
+            self._channel_guilds[channel_id] = guild_id
+        date_str = _day_str(day) if day is not None else datetime.now(KST).strftime("%Y-%m-%d")
+        # 버퍼보다 새 날짜가 들어오면 전날 누적분을 먼저 반영
+        if flush and self._pending_date is not None and self._pending_date < date_str:
+            await self.flush_voice_times()
+
+        key = (date_str, user_id, channel_id)
+        self._pending[key] = self._pending.get(key, 0) + seconds
+        self._pending_date = max(self._pending_date or date_str, date_str)
+        if session_id is not None and checkpoint_at is not None:
+            self._session_checkpoints[session_id] = checkpoint_at
+
+        for listener in self._voice_listeners:
+            try:
+                listener(date_str, user_id, channel_id, seconds)
+            except Exception as e:
+                print(f"❌ 음성 시간 리스너 처리 중 오류 발생: {e}")
+
+        if flush and time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush_voice_times()
+
+    def add_voice_hours(self, guild_id: int, start_ts: int, end_ts: int):
+        """
+        start_ts~end_ts(unix timestamp) 동안의 활동을 서버의 KST 시간대별 버퍼에 누적합니다.
+        DB 반영은 flush_voice_times에서 음성 시간과 같은 트랜잭션으로 처리됩니다.
+        """
+        if not HOURLY_BUCKETS:
+            return
+        for day, hour, seconds in _split_hours(start_ts, end_ts):
+            key = (guild_id, day, hour)
+            self._pending_hours[key] = self._pending_hours.get(key, 0) + seconds
+
+    def add_voice_listener(self, listener):
+        """add_voice_time으로 누적되는 (date, user_id, channel_id, seconds)를 전달받을 콜백을 등록합니다."""
+        if listener not in self._voice_listeners:
+            self._voice_listeners.append(listener)
+
+    async def flush_if_due(self):
+        """반영 주기가 지났거나 날짜가 바뀌었으면 버퍼를 DB에 반영합니다."""
+        today = datetime.now(KST).strftime("%Y-%m-%d")
+        if (self._pending_date is not None and self._pending_date != today) \
+                or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush_voice_times()
+
+    async def flush_voice_times(self) -> int:
+        """버퍼에 쌓인 음성 시간을 executemany 한 번으로 반영하고, 반영한 행 수를 반환합니다."""
+        await self.ensure_initialized()
+        async with self._flush_lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._session_checkpoints and not self._pending_hours:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            checkpoints, self._session_checkpoints = self._session_checkpoints, {}
+            hours, self._pending_hours = self._pending_hours, {}
+            self._pending_date = None
+            guild_of = self._channel_guilds
+            rows = [
+                (uid, _day_number(date), cid, secs, guild_of.get(cid, 0))
+                for (date, uid, cid), secs in pending.items()
+            ]
+            weekly: Dict[Tuple[str, int, int], int] = {}
+            monthly: Dict[Tuple[str, int, int], int] = {}
+            for (date, uid, cid), secs in pending.items():
+                week_start, month = _rollup_keys(date)
+                weekly[(week_start, uid, cid)] = weekly.get((week_start, uid, cid), 0) + secs
+                monthly[(month, uid, cid)] = monthly.get((month, uid, cid), 0) + secs
+            channel_guilds = {cid: guild_of[cid] for _, _, cid in pending if guild_of.get(cid)}
+            try:
+                await self._db.executemany(VOICE_TIME_UPSERT, rows)
+                await self._db.executemany(
+                    WEEKLY_ROLLUP_UPSERT, [(*key, secs, guild_of.get(key[2], 0)) for key, secs in weekly.items()]
+                )
+                await self._db.executemany(
+                    MONTHLY_ROLLUP_UPSERT, [(*key, secs, guild_of.get(key[2], 0)) for key, secs in monthly.items()]
+                )
+                await self._db.executemany(
+                    "INSERT OR REPLACE INTO channel_guilds (channel_id, guild_id) VALUES (?, ?)",
+                    list(channel_guilds.items())
+                )
+                await self._db.executemany(VOICE_HOUR_UPSERT, [(*key, secs) for key, secs in hours.items()])
+                if pending:
+                    dates = [date for date, _, _ in pending]
+                    await self._db.execute(DATE_BOUND_UPSERT, (min(dates), max(dates)))
+                await self._db.executemany(
+                    "UPDATE voice_sessions SET checkpoint_at = MAX(COALESCE(checkpoint_at, 0), ?) WHERE id = ?",
+                    [(ts, session_id) for session_id, ts in checkpoints.items()]
+                )
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                # 실패분은 버퍼로 되돌려 다음 주기에 다시 시도
+                for key, secs in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + secs
+                for session_id, ts in checkpoints.items():
+                    self._session_checkpoints[session_id] = max(self._session_checkpoints.get(session_id, 0), ts)
+                for key, secs in hours.items():
+                    self._pending_hours[key] = self._pending_hours.get(key, 0) + secs
+                if self._pending:
+                    self._pending_date = max(key[0] for key in self._pending)
+                raise
+            return len(rows)
+
+    async def open_voice_session(self, user_id: int, channel_id: int, started_at: int) -> int:
+        """음성 세션을 시작(started_at: unix timestamp)하고 세션 id를 반환합니다."""
+        await self.ensure_initialized()
+        # flush 트랜잭션 중간에 커밋되지 않도록 같은 락으로 직렬화
+        async with self._flush_lock:
+            cursor = await self._db.execute("""
+                INSERT INTO voice_sessions (user_id, channel_id, started_at)
+                VALUES (?, ?, ?)
+            """, (user_id, channel_id, started_at))
+            await self._db.commit()
+            return cursor.lastrowid
+
+    async def close_voice_session(self, session_id: int, ended_at: int):
+        await self.ensure_initialized()
+        async with self._flush_lock:
+            await self._db.execute(
+                "UPDATE voice_sessions SET ended_at = ? WHERE id = ? AND ended_at IS NULL",
+                (ended_at, session_id)
+            )
+            await self._db.commit()
 
-    async def register_deleted_channel(self, channel_id: int, category_id: int):
+    async def get_open_voice_sessions(self) -> List[Tuple[int, int, int, int]]:
+        """
+        종료되지 않은 세션 목록 (session_id, user_id, channel_id, 마지막 적립 시각 unix timestamp)
+        아직 flush 안 된 체크포인트는 메모리 값을 우선합니다.
+        """
+        await self.ensure_initialized()
+        async with self._db.execute("""
+            SELECT id, user_id, channel_id, COALESCE(checkpoint_at, started_at)
+              FROM voice_sessions
+             WHERE ended_at IS NULL
+             ORDER BY id
+        """) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            (session_id, user_id, channel_id, max(checkpoint_at, self._session_checkpoints.get(session_id, 0)))
+            for session_id, user_id, channel_id, checkpoint_at in rows
+        ]
+
+    def _window_segments(self, start_date: datetime, end_date: datetime) -> List[Tuple[str, str, object, object]]:
+        """
+        [start_date, end_date) 구간을 (테이블, 키 컬럼, 시작 키, 끝 키) 조각으로 나눕니다.
+        구간 안에 온전히 들어가는 달은 월간 롤업, 남은 가장자리의 온전한 주는 주간 롤업,
+        나머지 날짜는 일별 기록(정수 일자)에서 읽습니다. 키 범위는 양 끝을 포함합니다.
+        """
+        start = start_date.date()
+        end = end_date.date()
+        if not self._rollups_ready:
+            return [("voice_days", "day", (start - EPOCH_DATE).days, (end - EPOCH_DATE).days - 1)] if start < end else []
+        segments: List[Tuple[str, str, object, object]] = []
+
+        first_month = start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        last_month_end = end.replace(day=1)
+        if first_month < last_month_end:
+            segments.append((
+                "voice_times_monthly", "month",
+                first_month.strftime("%Y-%m"),
+                (last_month_end - timedelta(days=1)).strftime("%Y-%m"),
+            ))
+            edges = [(start, first_month), (last_month_end, end)]
+        else:
+            edges = [(start, end)]
+
+        for lo, hi in edges:
+            if lo >= hi:
+                continue
+            first_week = lo + timedelta(days=(7 - lo.weekday()) % 7)
+            last_week_end = hi - timedelta(days=hi.weekday())
+            if first_week < last_week_end:
+                segments.append((
+                    "voice_times_weekly", "week_start",
+                    first_week.strftime("%Y-%m-%d"),
+                    (last_week_end - timedelta(days=7)).strftime("%Y-%m-%d"),
+                ))
+                day_ranges = [(lo, first_week), (last_week_end, hi)]
+            else:
+                day_ranges = [(lo, hi)]
+
+            for day_lo, day_hi in day_ranges:
+                if day_lo < day_hi:
+                    segments.append((
+                        "voice_days", "day",
+                        (day_lo - EPOCH_DATE).days,
+                        (day_hi - EPOCH_DATE).days - 1,
+                    ))
+
+        return segments
+
+    def _window_source(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        columns: str,
+        where: str = "",
+        where_params: Optional[List] = None,
+        guild_id: Optional[int] = None,
+        channel_scoped: bool = False
+    ) -> Tuple[str, List]:
+        """
+        기간을 롤업 조각들의 UNION ALL 서브쿼리로 바꿔 (sql, params)를 반환합니다.
+        guild_id를 주면 해당 서버 행만 읽습니다. ((guild_id, 기간) 인덱스 사용)
+        channel_scoped(where에 호출자의 추적 채널 조건이 있음)이면 서버를 모르는(0) 행도 그 채널 것이면 포함합니다.
+        압축으로 지워진 일별/주간 기록이 필요한 기간이면 CompactedPeriodError를 냅니다.
+        voice_days로 옮기는 중이면 일별 조각마다 아직 남은 voice_times 행도 함께 읽습니다.
+        """
+        if guild_id is not None:
+            guild_where = "guild_id IN (?, 0)" if channel_scoped else "guild_id = ?"
+            where = " AND ".join(filter(None, [guild_where, where]))
+            where_params = [guild_id] + list(where_params or [])
+        segments = self._window_segments(start_date, end_date)
+        self._check_compacted(segments)
+        parts = []
+        params: List = []
+        for table, key, lo, hi in segments:
+            part = f"SELECT {columns} FROM {table} WHERE {key} BETWEEN ? AND ?"
+            params.extend([lo, hi])
+            if where:
+                part += f" AND {where}"
+                params.extend(where_params or [])
+            parts.append(part)
+            if table == "voice_days" and self._legacy_days:
+                part = f"SELECT {columns} FROM ({LEGACY_VOICE_TIMES}) WHERE date BETWEEN ? AND ?"
+                params.extend([_day_str(lo), _day_str(hi)])
+                if where:
+                    part += f" AND {where}"
+                    params.extend(where_params or [])
+                parts.append(part)
+        return " UNION ALL ".join(parts), params
+
+    def _check_compacted(self, segments: List[Tuple[str, str, object, object]]):
+        """압축 기준일 이전의 일별 기록이나 기준일 전에 끝나는 주의 주간 롤업을 읽는 조각이 있으면 거부합니다."""
+        horizon = self._compacted_before
+        if horizon is None:
+            return
+        horizon_day = (horizon.date() - EPOCH_DATE).days
+        last_week_start = (horizon - timedelta(days=7)).strftime("%Y-%m-%d")
+        for table, _, lo, _ in segments:
+            if (table == "voice_days" and lo < horizon_day) or (table == "voice_times_weekly" and lo <= last_week_start):
+                raise CompactedPeriodError(horizon)
+
+    def _iter_pending(
+        self,
+        start_str: str,
+        end_str: str,
+        user_id: Optional[int] = None,
+        channel_filter: Optional[ChannelFilter] = None,
+        guild_id: Optional[int] = None
+    ):
+        """
+        아직 DB에 반영되지 않은 (user_id, channel_id, seconds)를 기간/채널/서버 조건에 맞게 반환합니다.
+        서버를 모르는 채널은 채널 조건이 있을 때 그 조건만으로 포함합니다. (_window_source의 channel_scoped와 같음)
+        """
+        if isinstance(channel_filter, str):
+            channel_set = self._expanded_channels.get(channel_filter, frozenset())
+        else:
+            channel_set = set(channel_filter) if channel_filter is not None else None
+        for (date, uid, cid), secs in self._pending.items():
+            if not (start_str <= date <= end_str):
+                continue
+            if user_id is not None and uid != user_id:
+                continue
+            if channel_set is not None and cid not in channel_set:
+                continue
+            if guild_id is not None:
+                channel_guild = self._channel_guilds.get(cid, 0)
+                if channel_guild != guild_id and not (channel_guild == 0 and channel_set is not None):
+                    continue
+            yield uid, cid, secs
+
+    async def register_deleted_channel(self, channel_id: int, category_id: int, guild_id: int = 0):
         await self.ensure_initialized()
         await self._db.execute("""
-            INSERT OR REPLACE INTO deleted_channels (channel_id, category_id)
-            VALUES (?, ?)
-        """, (channel_id, category_id))
+            INSERT OR REPLACE INTO deleted_channels (channel_id, category_id, guild_id)
+            VALUES (?, ?, ?)
+        """, (channel_id, category_id, guild_id))
         await self._db.commit()
 
+    def get_channel_guild(self, channel_id: int) -> int:
+        """채널의 서버 ID (모르면 0)"""
+        return self._channel_guilds.get(channel_id, 0)
+
+    async def assign_channel_guilds(
+        self,
+        channel_guilds: Dict[int, int],
+        bot_guild_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """
+        봇 채널 캐시의 {channel_id: guild_id}를 channel_guilds에 기록하고,
+        guild_id가 0인 기존 행을 채널 기준으로 채웁니다. 채운 행 수를 반환합니다.
+        서버를 모르는 채널은 다음 순서로 추정합니다.
+        - deleted_channels에 기록된 서버 → 카테고리가 속한 서버
+        - 채널이 속한 추적 source를 등록한 서버가 하나뿐이면 그 서버
+        - bot_guild_ids(봇이 들어가 있는 서버 전체, 시작 시에만 전달)가 하나뿐이면 그 서버
+        - 끝내 서버를 모르는 행은 0으로 남고, 서버 조회에서는 추적 채널 조건에 맞을 때만 포함 (get_unassigned_counts)
+        - COMPACTION_CHUNK 행씩 커밋해 음성 기록 반영을 오래 막지 않음
+        """
+        await self.ensure_initialized()
+        async with self._flush_lock:
+            await self._db.executemany(
+                "INSERT OR REPLACE INTO channel_guilds (channel_id, guild_id) VALUES (?, ?)",
+                [(cid, gid) for cid, gid in channel_guilds.items() if gid]
+            )
+            await self._db.execute("""
+                INSERT OR IGNORE INTO channel_guilds (channel_id, guild_id)
+                SELECT channel_id, guild_id FROM deleted_channels WHERE guild_id != 0
+            """)
+            await self._db.execute("""
+                INSERT OR IGNORE INTO channel_guilds (channel_id, guild_id)
+                SELECT d.channel_id, g.guild_id
+                  FROM deleted_channels d
+                  JOIN channel_guilds g ON g.channel_id = d.category_id
+            """)
+            await self._db.execute("""
+                INSERT OR IGNORE INTO channel_guilds (channel_id, guild_id)
+                SELECT e.channel_id, MIN(t.guild_id)
+                  FROM expanded_tracked_channels e
+                  JOIN tracked_channels t ON t.source = e.source AND t.guild_id != 0
+                 GROUP BY e.channel_id
+                HAVING COUNT(DISTINCT t.guild_id) = 1
+            """)
+            bot_guild_ids = set(bot_guild_ids or ())
+            if len(bot_guild_ids) == 1:
+                (only_guild,) = bot_guild_ids
+                for table in ("voice_days", "voice_times_weekly", "voice_times_monthly", "deleted_channels"):
+                    await self._db.execute(f"""
+                        INSERT OR IGNORE INTO channel_guilds (channel_id, guild_id)
+                        SELECT DISTINCT channel_id, ? FROM {table} WHERE guild_id = 0
+                    """, (only_guild,))
+            await self._db.commit()
+            async with self._db.execute("SELECT channel_id, guild_id FROM channel_guilds") as cursor:
+                self._channel_guilds = {channel_id: guild_id async for channel_id, guild_id in cursor}
+
+        assigned = 0
+        for table, key in GUILD_TABLES.items():
+            while True:
+                async with self._flush_lock:
+                    cursor = await self._db.execute(f"""
+                        UPDATE {table}
+                           SET guild_id = (SELECT guild_id FROM channel_guilds c WHERE c.channel_id = {table}.channel_id)
+                         WHERE ({key}) IN (
+                            SELECT {key} FROM {table}
+                             WHERE guild_id = 0 AND channel_id IN (SELECT channel_id FROM channel_guilds)
+                             LIMIT ?
+                         )
+                    """, (COMPACTION_CHUNK,))
+                    await self._db.commit()
+                assigned += cursor.rowcount
+                if cursor.rowcount < COMPACTION_CHUNK:
+                    break
+                await asyncio.sleep(0)
+        return assigned
+
+    async def get_unassigned_counts(self) -> Dict[str, int]:
+        """서버를 알 수 없는(guild_id = 0) 음성 기록 행 수 (테이블별, 서버 내보내기/삭제에서는 제외됨)"""
+        await self.ensure_initialized()
+        counts = {}
+        for table in ("voice_days", "voice_times_weekly", "voice_times_monthly"):
+            async with self._db.execute(f"SELECT COUNT(*) FROM {table} WHERE guild_id = 0") as cursor:
+                counts[table] = (await cursor.fetchone())[0]
+        return counts
+
     async def get_deleted_channel_category(self, channel_id: int) -> Optional[int]:
         await self.ensure_initialized()
         async with self._db.execute("""
@@ -124,12 +1015,41 @@ class DataManager:
             row = await cursor.fetchone()
             return row[0] if row else None
 
+    async def get_missing_channels(self) -> List[int]:
+        await self.ensure_initialized()
+        async with self._db.execute("SELECT channel_id FROM missing_channels") as cursor:
+            return [row[0] async for row in cursor]
+
+    async def mark_channels_missing(self, channel_ids: List[int]):
+        """삭제가 확인된 채널/카테고리 ID를 기록합니다."""
+        await self.ensure_initialized()
+        if not channel_ids:
+            return
+        detected_at = datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S")
+        await self._db.executemany(
+            "INSERT OR IGNORE INTO missing_channels (channel_id, detected_at) VALUES (?, ?)",
+            [(cid, detected_at) for cid in channel_ids]
+        )
+        await self._db.commit()
+
+    async def clear_missing_channels(self, channel_ids: List[int]):
+        """다시 나타난 채널 ID를 삭제 기록에서 제거합니다."""
+        await self.ensure_initialized()
+        if not channel_ids:
+            return
+        await self._db.executemany(
+            "DELETE FROM missing_channels WHERE channel_id = ?",
+            [(cid,) for cid in channel_ids]
+        )
+        await self._db.commit()
+
     async def get_user_times(
         self,
         user_id: int,
         period: str,
         base_date: Optional[datetime] = None,
-        channel_filter: Optional[List[int]] = None
+        channel_filter: Optional[ChannelFilter] = None,
+        guild_id: Optional[int] = None
     ) -> Tuple[Dict[int, int], Optional[datetime], Optional[datetime]]:
         await self.ensure_initialized()
         if base_date is None:
@@ -144,28 +1064,26 @@ class DataManager:
         if channel_filter is None and not channel_filter:
             return {}, start_date, end_date
 
-        sql = """
-            SELECT channel_id, SUM(seconds)
-              FROM voice_times
-             WHERE user_id = ?
-               AND date BETWEEN ? AND ?
-        """
-        params = [
-            user_id,
-            start_date.strftime("%Y-%m-%d"),
-            (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
-        ]
-
+        where = "user_id = ?"
+        where_params = [user_id]
         if channel_filter is not None:
-            placeholders = ",".join("?" for _ in channel_filter)
-            sql += f" AND channel_id IN ({placeholders})"
-            params.extend(channel_filter)
+            condition, condition_params = self._channel_condition(channel_filter)
+            where += f" AND {condition}"
+            where_params.extend(condition_params)
 
-        sql += " GROUP BY channel_id"
+        source, params = self._window_source(start_date, end_date, "channel_id, seconds", where, where_params, guild_id, channel_filter is not None)
+        sql = f"SELECT channel_id, SUM(seconds) FROM ({source}) GROUP BY channel_id"
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
 
-        async with self._db.execute(sql, params) as cursor:
-            async for cid, secs in cursor:
-                result[cid] = secs
+        # DB 조회와 버퍼 병합 사이에 flush가 끼어들지 않도록 잠금
+        async with self._flush_lock:
+            async with self._db.execute(sql, params) as cursor:
+                async for cid, secs in cursor:
+                    result[cid] = secs
+
+            for _, cid, secs in self._iter_pending(start_str, end_str, user_id, channel_filter, guild_id):
+                result[cid] = result.get(cid, 0) + secs
 
         return result, start_date, end_date
 
@@ -173,7 +1091,8 @@ class DataManager:
         self,
         period: str,
         base_date: datetime,
-        channel_filter: Optional[List[int]] = None
+        channel_filter: Optional[ChannelFilter] = None,
+        guild_id: Optional[int] = None
     ) -> Tuple[Dict[int, Dict[int, int]], Optional[datetime], Optional[datetime]]:
         await self.ensure_initialized()
         result: Dict[int, Dict[int, int]] = {}
@@ -185,60 +1104,234 @@ class DataManager:
         if channel_filter is not None and not channel_filter:
             return {}, start_date, end_date
 
-        sql = """
-            SELECT user_id, channel_id, SUM(seconds)
-              FROM voice_times
-             WHERE date BETWEEN ? AND ?
-        """
-        params = [
-            start_date.strftime("%Y-%m-%d"),
-            (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
-        ]
-
+        where = ""
+        where_params = []
         if channel_filter is not None:
-            placeholders = ",".join("?" for _ in channel_filter)
-            sql += f" AND channel_id IN ({placeholders})"
-            params.extend(channel_filter)
+            where, where_params = self._channel_condition(channel_filter)
 
-        sql += " GROUP BY user_id, channel_id"
+        source, params = self._window_source(start_date, end_date, "user_id, channel_id, seconds", where, where_params, guild_id, channel_filter is not None)
+        sql = f"SELECT user_id, channel_id, SUM(seconds) FROM ({source}) GROUP BY user_id, channel_id"
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
 
-        async with self._db.execute(sql, params) as cursor:
-            async for uid, cid, secs in cursor:
+        async with self._flush_lock:
+            async with self._db.execute(sql, params) as cursor:
+                async for uid, cid, secs in cursor:
+                    user_map = result.setdefault(uid, {})
+                    user_map[cid] = secs
+
+            for uid, cid, secs in self._iter_pending(start_str, end_str, None, channel_filter, guild_id):
                 user_map = result.setdefault(uid, {})
-                user_map[cid] = secs
+                user_map[cid] = user_map.get(cid, 0) + secs
 
         return result, start_date, end_date
 
+    async def get_users_period_totals(
+        self,
+        user_ids: List[int],
+        period: str,
+        base_date: datetime,
+        channel_filter: Optional[ChannelFilter] = None,
+        guild_id: Optional[int] = None
+    ) -> Dict[int, int]:
+        """여러 유저의 기간 합계 초를 GROUP BY 쿼리 한 번으로 반환합니다. {user_id: seconds}"""
+        await self.ensure_initialized()
+        result: Dict[int, int] = {}
+        if not user_ids or (channel_filter is not None and not channel_filter):
+            return result
+        start_date, end_date = await self.get_period_range(period, base_date)
+        if not start_date or not end_date:
+            return result
+
+        where = f"user_id IN ({','.join('?' for _ in user_ids)})"
+        where_params = list(user_ids)
+        if channel_filter is not None:
+            condition, condition_params = self._channel_condition(channel_filter)
+            where += f" AND {condition}"
+            where_params.extend(condition_params)
+
+        source, params = self._window_source(start_date, end_date, "user_id, seconds", where, where_params, guild_id, channel_filter is not None)
+        sql = f"SELECT user_id, SUM(seconds) FROM ({source}) GROUP BY user_id"
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
+        user_set = set(user_ids)
+
+        async with self._flush_lock:
+            async with self._db.execute(sql, params) as cursor:
+                async for uid, secs in cursor:
+                    result[uid] = secs
+
+            for uid, _, secs in self._iter_pending(start_str, end_str, None, channel_filter, guild_id):
+                if uid in user_set:
+                    result[uid] = result.get(uid, 0) + secs
+
+        return result
+
+    async def _ranking_totals(
+        self,
+        period: str,
+        base_date: datetime,
+        channel_filter: Optional[ChannelFilter] = None,
+        role_id: Optional[int] = None,
+        extra_seconds: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Tuple[Optional[str], List, Optional[datetime], Optional[datetime]]:
+        """
+        기간 내 유저별 합계(user_id, total)를 내는 SQL과 파라미터를 반환합니다.
+        순위는 SQL에서 정렬하므로 기간에 걸친 미반영분은 먼저 DB에 반영합니다.
+        role_id를 주면 sync_role_members로 기록된 역할 멤버만 집계합니다.
+        extra_seconds={user_id: seconds}는 DB에 쓰지 않고 합계에만 더합니다. (채널/서버 조건은 호출자가 맞춤)
+        guild_id를 주면 해당 서버 기록만 집계합니다.
+        """
+        start_date, end_date = await self.get_period_range(period, base_date)
+        if not start_date or not end_date or (channel_filter is not None and not channel_filter):
+            return None, [], start_date, end_date
+
+        where = ""
+        where_params = []
+        if channel_filter is not None:
+            where, where_params = self._channel_condition(channel_filter)
+        if role_id is not None:
+            where = " AND ".join(filter(None, [where, "user_id IN (SELECT user_id FROM role_members WHERE role_id = ?)"]))
+            where_params.append(role_id)
+
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
+        if any(start_str <= date <= end_str for date, _, _ in self._pending):
+            await self.flush_voice_times()
+
+        source, params = self._window_source(start_date, end_date, "user_id, seconds", where, where_params, guild_id, channel_filter is not None)
+        extra_rows = [(uid, secs) for uid, secs in (extra_seconds or {}).items() if secs]
+        if extra_rows:
+            source += " UNION ALL SELECT column1, column2 FROM (VALUES " + ", ".join("(?, ?)" for _ in extra_rows) + ")"
+            params.extend(value for row in extra_rows for value in row)
+            if role_id is not None:
+                source += " WHERE column1 IN (SELECT user_id FROM role_members WHERE role_id = ?)"
+                params.append(role_id)
+        totals = f"SELECT user_id, SUM(seconds) AS total FROM ({source}) GROUP BY user_id HAVING total > 0"
+        return totals, params, start_date, end_date
+
+    async def get_ranking_page(
+        self,
+        period: str,
+        base_date: datetime,
+        channel_filter: Optional[ChannelFilter] = None,
+        offset: int = 0,
+        limit: int = 10,
+        after: Optional[Tuple[int, int]] = None,
+        role_id: Optional[int] = None,
+        extra_seconds: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        순위 한 페이지 [(user_id, seconds)]를 반환합니다. (합계 내림차순, 같으면 user_id 오름차순)
+        after=(seconds, user_id)를 주면 OFFSET 대신 그 행 다음부터 가져옵니다.
+        """
+        await self.ensure_initialized()
+        totals, params, _, _ = await self._ranking_totals(
+            period, base_date, channel_filter, role_id, extra_seconds, guild_id
+        )
+        if totals is None:
+            return []
+
+        sql = f"WITH totals AS ({totals}) SELECT user_id, total FROM totals"
+        if after is not None:
+            sql += " WHERE total < ? OR (total = ? AND user_id > ?)"
+            params.extend([after[0], after[0], after[1]])
+            offset = 0
+        sql += " ORDER BY total DESC, user_id LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        async with self._flush_lock:
+            async with self._db.execute(sql, params) as cursor:
+                return [(uid, total) async for uid, total in cursor]
+
+    async def count_ranked_users(
+        self,
+        period: str,
+        base_date: datetime,
+        channel_filter: Optional[ChannelFilter] = None,
+        role_id: Optional[int] = None,
+        extra_seconds: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Tuple[int, Optional[datetime], Optional[datetime]]:
+        """(기록이 있는 유저 수, start_date, end_date)"""
+        await self.ensure_initialized()
+        totals, params, start_date, end_date = await self._ranking_totals(
+            period, base_date, channel_filter, role_id, extra_seconds, guild_id
+        )
+        if totals is None:
+            return 0, start_date, end_date
+
+        async with self._flush_lock:
+            async with self._db.execute(f"SELECT COUNT(*) FROM ({totals})", params) as cursor:
+                return (await cursor.fetchone())[0], start_date, end_date
+
     async def get_user_rank(
         self,
         user_id: int,
         period: str,
         base_date: datetime,
-        channel_filter: Optional[List[int]] = None,
+        channel_filter: Optional[ChannelFilter] = None,
+        role_id: Optional[int] = None,
+        extra_seconds: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
     ) -> Tuple[Optional[int], int, int, Optional[datetime], Optional[datetime]]:
         """
         Returns (rank, total_users, user_total_seconds, start_date, end_date)
         rank is 1-based; None if user has no data in the window.
         """
-        all_data, start_date, end_date = await self.get_all_users_times(period, base_date, channel_filter)
-        if not all_data:
+        await self.ensure_initialized()
+        totals, params, start_date, end_date = await self._ranking_totals(
+            period, base_date, channel_filter, role_id, extra_seconds, guild_id
+        )
+        if totals is None:
             return None, 0, 0, start_date, end_date
 
-        user_totals = [(uid, sum(times.values())) for uid, times in all_data.items()]
-        ranked = sorted(user_totals, key=lambda x: x[1], reverse=True)
-
-        total_users = len(ranked)
-        user_total = 0
-        rank = None
-        for idx, (uid, seconds) in enumerate(ranked, start=1):
-            if uid == user_id:
-                rank = idx
-                user_total = seconds
-                break
+        sql = f"""
+            WITH totals AS ({totals}),
+            ranked AS (
+                SELECT user_id, total,
+                       ROW_NUMBER() OVER (ORDER BY total DESC, user_id) AS rank,
+                       COUNT(*) OVER () AS total_users
+                  FROM totals
+            )
+            SELECT rank, total_users, total FROM ranked WHERE user_id = ?
+        """
+        async with self._flush_lock:
+            async with self._db.execute(sql, params + [user_id]) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                async with self._db.execute(f"SELECT COUNT(*) FROM ({totals})", params) as cursor:
+                    total_users = (await cursor.fetchone())[0]
+                return None, total_users, 0, start_date, end_date
 
+        rank, total_users, user_total = row
         return rank, total_users, user_total, start_date, end_date
 
-    
+    async def get_voice_heatmap(self, guild_id: int, start_date: datetime, end_date: datetime) -> List[List[int]]:
+        """
+        [start_date, end_date) 기간의 요일(월=0) x 시(0~23) 활동 초 합계 7x24 행렬을 반환합니다.
+        집계는 SQL GROUP BY 한 번으로 처리합니다.
+        """
+        await self.ensure_initialized()
+        first_day = (start_date.date() - EPOCH_DATE).days
+        last_day = (end_date.date() - EPOCH_DATE).days - 1
+        if any(gid == guild_id and first_day <= day <= last_day for gid, day, _ in self._pending_hours):
+            await self.flush_voice_times()
+
+        heatmap = [[0] * 24 for _ in range(7)]
+        # 1970-01-01은 목요일이므로 (day + 3) % 7이 월요일=0 기준 요일
+        async with self._db.execute("""
+            SELECT (day + 3) % 7 AS weekday, hour, SUM(seconds)
+              FROM voice_hours
+             WHERE guild_id = ? AND day BETWEEN ? AND ?
+             GROUP BY weekday, hour
+        """, (guild_id, first_day, last_day)) as cursor:
+            async for weekday, hour, seconds in cursor:
+                heatmap[weekday][hour] = seconds
+        return heatmap
+
     async def get_period_range(self, period: str, base_datetime: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
         await self.ensure_initialized()
         # base_datetime은 항상 KST로 전달되어야 함
@@ -258,26 +1351,253 @@ class DataManager:
             else:
                 end = start.replace(month=start.month + 1)
         elif period == '누적':
-            async with self._db.execute("SELECT date FROM voice_times ORDER BY date ASC") as cursor:
-                dates = [datetime.strptime(row[0], "%Y-%m-%d").replace(tzinfo=KST) async for row in cursor]
-                if not dates:
-                    return None, None
-                return dates[0], dates[-1] + timedelta(days=1)
+            async with self._db.execute("""
+                SELECT key, value FROM voice_meta WHERE key IN ('first_date', 'last_date')
+            """) as cursor:
+                bounds = {key: value async for key, value in cursor}
+            # 아직 반영되지 않은 버퍼의 날짜도 기간에 포함
+            dates = [key[0] for key in self._pending]
+            if bounds:
+                dates.extend((bounds["first_date"], bounds["last_date"]))
+            if not dates:
+                return None, None
+            first = datetime.strptime(min(dates), "%Y-%m-%d").replace(tzinfo=KST)
+            horizon = await self.get_compaction_horizon()
+            last = datetime.strptime(max(dates), "%Y-%m-%d").replace(tzinfo=KST)
+            end = last + timedelta(days=1)
+            if horizon is not None and first < horizon:
+                # 압축된 구간은 월간 롤업만 있으므로 온전한 달로만 읽도록 1일부터 (최소) 기준일까지 조회
+                first = first.replace(day=1)
+                end = max(end, horizon)
+            return first, end
         else:
             return None, None
 
         return start, end
 
+    async def get_compaction_horizon(self) -> Optional[datetime]:
+        """이 날짜 이전의 일별 기록은 압축되어 월간 롤업으로만 남아 있습니다. (없으면 None)"""
+        async with self._db.execute("SELECT value FROM voice_meta WHERE key = 'compacted_before'") as cursor:
+            row = await cursor.fetchone()
+        return datetime.strptime(row[0], "%Y-%m-%d").replace(tzinfo=KST) if row else None
+
+    async def get_storage_stats(self) -> Dict[str, int]:
+        """일별/주간/월간 행 수와 DB 파일 크기(바이트)"""
+        await self.ensure_initialized()
+        stats = {}
+        for table in ("voice_days", "voice_times_weekly", "voice_times_monthly"):
+            async with self._db.execute(f"SELECT COUNT(*) FROM {table}") as cursor:
+                stats[table] = (await cursor.fetchone())[0]
+        async with self._db.execute("PRAGMA page_count") as cursor:
+            page_count = (await cursor.fetchone())[0]
+        async with self._db.execute("PRAGMA page_size") as cursor:
+            page_size = (await cursor.fetchone())[0]
+        stats["file_size"] = page_count * page_size
+        return stats
+
+    async def compact_voice_days(self, retention_days: int = DAILY_RETENTION_DAYS) -> Optional[str]:
+        """
+        retention_days보다 오래된 달의 일별 기록(voice_days)과 그 이전 주간 롤업을 지웁니다.
+        월간 롤업은 일별 기록과 같은 트랜잭션에서 갱신되므로 지워도 월 단위 합계는 그대로입니다.
+        - 기준일(horizon)은 달의 1일로 맞춰, 압축된 구간은 항상 온전한 달로만 남음
+        - COMPACTION_CHUNK 행씩 커밋해 음성 기록 반영을 오래 막지 않음
+        - 끝나면 비워진 페이지를 incremental vacuum으로 돌려줌 (auto_vacuum=INCREMENTAL인 파일만)
+        - 이후 기준일 이전을 일별/주간으로 읽는 조회는 CompactedPeriodError
+        반환값: 이번에 적용한 horizon 'YYYY-MM-DD' (새로 정리할 구간이 없으면 None)
+        voice_days로 옮기는 중이면 이동이 끝난 뒤 정리합니다.
+        """
+        await self.ensure_initialized()
+        await self._wait_for_migration()
+        cutoff = (datetime.now(KST) - timedelta(days=retention_days)).date()
+        horizon = cutoff.replace(day=1)
+        previous = await self.get_compaction_horizon()
+        if previous is not None and previous.date() >= horizon:
+            return None
+
+        horizon_day = (horizon - EPOCH_DATE).days
+        # 기준일 이전에 완전히 끝나는 주만 지움 (걸쳐 있는 주는 주간 롤업이 그 주 전체 합계를 계속 보장)
+        last_week_start = (horizon - timedelta(days=7)).strftime("%Y-%m-%d")
+        deletes = [
+            ("""
+                DELETE FROM voice_days WHERE (user_id, day, channel_id) IN (
+                    SELECT user_id, day, channel_id FROM voice_days WHERE day < ? LIMIT ?
+                )
+            """, horizon_day),
+            ("""
+                DELETE FROM voice_times_weekly WHERE (week_start, user_id, channel_id) IN (
+                    SELECT week_start, user_id, channel_id FROM voice_times_weekly WHERE week_start <= ? LIMIT ?
+                )
+            """, last_week_start),
+        ]
+        for sql, bound in deletes:
+            while True:
+                async with self._flush_lock:
+                    cursor = await self._db.execute(sql, (bound, COMPACTION_CHUNK))
+                    await self._db.commit()
+                if cursor.rowcount < COMPACTION_CHUNK:
+                    break
+                await asyncio.sleep(0)
+
+        async with self._flush_lock:
+            await self._db.execute(
+                "INSERT OR REPLACE INTO voice_meta (key, value) VALUES ('compacted_before', ?)",
+                (horizon.strftime("%Y-%m-%d"),)
+            )
+            await self._db.commit()
+            self._compacted_before = datetime.combine(horizon, datetime.min.time()).replace(tzinfo=KST)
+
+        await self._reclaim_free_pages()
+        return horizon.strftime("%Y-%m-%d")
+
+    async def _reclaim_free_pages(self):
+        """
+        비워진 페이지를 VACUUM_STEP_PAGES씩 나눠 파일에서 돌려줍니다.
+        auto_vacuum=INCREMENTAL이 아닌 파일은 그대로 두고, 빈 페이지는 이후 기록에 재사용됩니다.
+        """
+        async with self._db.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode != 2:
+            return
+        while True:
+            async with self._db.execute("PRAGMA freelist_count") as cursor:
+                free_pages = (await cursor.fetchone())[0]
+            if not free_pages:
+                break
+            async with self._flush_lock:
+                # 한 단계(step)마다 한 페이지씩 돌려주므로 결과를 끝까지 읽어야 함
+                async with self._db.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})") as cursor:
+                    await cursor.fetchall()
+                await self._db.commit()
+            await asyncio.sleep(0)
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """
+        기존 파일을 auto_vacuum=INCREMENTAL로 바꿉니다. (관리자가 한가한 시간에 한 번 실행)
+        전체 VACUUM으로 파일을 다시 쓰므로 끝날 때까지 음성 기록 반영이 멈춥니다.
+        반환값: 이번에 바꿨으면 True, 이미 INCREMENTAL이면 False
+        """
+        await self.ensure_initialized()
+        async with self._db.execute("PRAGMA auto_vacuum") as cursor:
+            mode = (await cursor.fetchone())[0]
+        if mode == 2:
+            return False
+        async with self._flush_lock:
+            await self._db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await self._db.execute("VACUUM")
+        return True
+
+    async def purge_guild(self, guild_id: int) -> Dict[str, int]:
+        """
+        한 서버의 음성 기록(일별/롤업/시간대)과 추적/삭제 채널 설정을 지우고 테이블별 삭제 행 수를 반환합니다.
+        서버를 모르는(0) 행은 건드리지 않습니다. COMPACTION_CHUNK 행씩 나눠 커밋합니다.
+        voice_days로 옮기는 중이면 이동이 끝난 뒤 지웁니다.
+        """
+        await self.ensure_initialized()
+        await self._wait_for_migration()
+        async with self._flush_lock:
+            # 아직 반영되지 않은 해당 서버분도 버림
+            self._pending = {
+                key: secs for key, secs in self._pending.items()
+                if self._channel_guilds.get(key[2], 0) != guild_id
+            }
+            self._pending_hours = {key: secs for key, secs in self._pending_hours.items() if key[0] != guild_id}
+
+        removed: Dict[str, int] = {}
+        tables = dict(GUILD_TABLES, voice_hours="guild_id, day, hour")
+        for table, key in tables.items():
+            removed[table] = 0
+            while True:
+                async with self._flush_lock:
+                    cursor = await self._db.execute(f"""
+                        DELETE FROM {table} WHERE ({key}) IN (
+                            SELECT {key} FROM {table} WHERE guild_id = ? LIMIT ?
+                        )
+                    """, (guild_id, COMPACTION_CHUNK))
+                    await self._db.commit()
+                removed[table] += cursor.rowcount
+                if cursor.rowcount < COMPACTION_CHUNK:
+                    break
+                await asyncio.sleep(0)
+
+        async with self._flush_lock:
+            await self._refresh_date_bounds()
+            await self._db.commit()
+        return removed
+
+    async def export_guild(self, guild_id: int, path: str) -> int:
+        """
+        한 서버의 음성 기록을 레거시 user_times.json 형식({날짜: {유저: {채널: 초}}})으로 내보내고 행 수를 반환합니다.
+        migrate_multiple_user_times로 다시 가져올 수 있습니다.
+        압축된 달은 월간 합계를 그 달 1일 기록으로 씁니다. 하루치씩 파일에 바로 씁니다.
+        voice_days로 옮기는 중이면 이동이 끝난 뒤 내보냅니다.
+        """
+        await self.flush_voice_times()
+        await self._wait_for_migration()
+        horizon = await self.get_compaction_horizon()
+        horizon_day = (horizon.date() - EPOCH_DATE).days if horizon else None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        queries = []
+        if horizon is not None:
+            queries.append(("""
+                SELECT month || '-01', user_id, channel_id, seconds
+                  FROM voice_times_monthly
+                 WHERE guild_id = ? AND month < ?
+                 ORDER BY month, user_id
+            """, (guild_id, horizon.strftime("%Y-%m"))))
+        queries.append(("""
+            SELECT day, user_id, channel_id, seconds
+              FROM voice_days
+             WHERE guild_id = ? AND day >= ?
+             ORDER BY day, user_id
+        """, (guild_id, horizon_day or 0)))
+
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("{")
+            first = True
+            current_date = None
+            users: Dict[str, Dict[str, int]] = {}
+
+            def write_day():
+                nonlocal first
+                if current_date is None:
+                    return
+                f.write(("" if first else ",") + "\n" + json.dumps(current_date) + ": " + json.dumps(users))
+                first = False
+
+            for sql, params in queries:
+                async with self._db.execute(sql, params) as cursor:
+                    async for date, user_id, channel_id, seconds in cursor:
+                        date = _day_str(date) if isinstance(date, int) else date
+                        if date != current_date:
+                            write_day()
+                            current_date, users = date, {}
+                        users.setdefault(str(user_id), {})[str(channel_id)] = seconds
+                        count += 1
+            write_day()
+            f.write("\n}\n")
+        return count
+
     async def reset_data(self):
         await self.ensure_initialized()
-        await self._db.execute("DELETE FROM voice_times")
-        await self._db.execute("DELETE FROM deleted_channels")
-        await self._db.commit()
+        await self._wait_for_migration()
+        async with self._flush_lock:
+            self._pending.clear()
+            self._pending_hours.clear()
+            self._pending_date = None
+            await self._db.execute("DELETE FROM voice_days")
+            await self._db.execute("DELETE FROM voice_hours")
+            await self._db.execute("DELETE FROM voice_times_weekly")
+            await self._db.execute("DELETE FROM voice_times_monthly")
+            await self._db.execute("DELETE FROM voice_meta WHERE key IN ('first_date', 'last_date')")
+            await self._db.execute("DELETE FROM deleted_channels")
+            await self._db.commit()
         
     async def reset_tracked_channels(self, source: str):
         """
         트래킹된 채널 목록(tracked_channels)만 모두 삭제합니다.
-        voice_times, deleted_channels 테이블은 건드리지 않습니다.
+        voice_days, deleted_channels 테이블은 건드리지 않습니다.
         """
         await self.ensure_initialized()
         await self._db.execute(
@@ -286,48 +1606,162 @@ class DataManager:
         )
         await self._db.commit()
 
-    async def migrate_multiple_user_times(self, user_times_paths: List[str], deleted_channels_path: str):
+    async def migrate_multiple_user_times(
+        self,
+        user_times_paths: List[str],
+        deleted_channels_path: str,
+        progress=None
+    ) -> int:
+        """
+        레거시 user_times.json들과 deleted_channels.json을 가져오고, 새로 추가된 행 수를 반환합니다.
+        - 파일을 날짜 항목 단위로 스트리밍 해석하고 IMPORT_CHUNK 행씩 executemany로 반영
+        - 청크마다 진행 위치를 voice_meta에 함께 커밋하므로 중단되면 다음 실행에서 이어서 진행
+        - 청크 사이에만 잠금을 잡아 실시간 음성 적립/반영을 막지 않음
+        progress: async (path, entries_done, rows_inserted) 콜백 (청크마다 호출)
+        voice_days로 옮기는 중이면 이동이 끝난 뒤 가져옵니다. (이미 있는 기록 판단이 voice_days 기준)
+        """
         await self.ensure_initialized()
+        await self._wait_for_migration()
         # ① 매번 깨끗한 상태에서 시작하기 위해 이전 삭제채널 기록을 모두 지웁니다.
-        await self._db.execute("DELETE FROM deleted_channels")
+        async with self._flush_lock:
+            await self._db.execute("DELETE FROM deleted_channels")
+            await self._db.commit()
 
         # ② user_times 마이그레이션
+        inserted = 0
         for path in user_times_paths:
             if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
-                    user_times = json.load(f)
-                for date_str, users in user_times.items():
-                    for user_id, channels in users.items():
-                        for channel_id, seconds in channels.items():
-                            await self._db.execute(
-                                """
-                                INSERT INTO voice_times (date, user_id, channel_id, seconds)
-                                VALUES (?, ?, ?, ?)
-                                ON CONFLICT(date, user_id, channel_id) DO NOTHING
-                                """,
-                                (date_str, int(user_id), int(channel_id), int(seconds))
-                            )
+                inserted += await self._import_user_times(path, inserted, progress)
 
         # ③ deleted_channels 로드
         if os.path.exists(deleted_channels_path):
-            with open(deleted_channels_path, 'r', encoding='utf-8') as f:
-                deleted_channels = json.load(f)
-            for channel_id, payload in deleted_channels.items():
-                # JSON 구조가 { "채널ID": { "category_id": 숫자 } } 이므로 payload에서 꺼냅니다.
-                category_id = payload.get("category_id")
-                if category_id is None:
-                    continue
+            await self._import_deleted_channels(deleted_channels_path)
+
+        return inserted
+
+    async def _import_user_times(self, path: str, inserted_before: int = 0, progress=None) -> int:
+        """{날짜: {유저: {채널: 초}}} 형식의 파일 하나를 가져옵니다."""
+        progress_key = f"import:{os.path.abspath(path)}"
+        async with self._db.execute("SELECT value FROM voice_meta WHERE key = ?", (progress_key,)) as cursor:
+            row = await cursor.fetchone()
+        resume_from = int(row[0]) if row else 0
+        await self._db.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_rows (
+                user_id INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                seconds INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day, channel_id)
+            ) WITHOUT ROWID
+        """)
+
+        inserted = 0
+        entries_done = 0
+        rows: List[Tuple[int, int, int, int]] = []
+        for date_str, users in _iter_json_items(path):
+            entries_done += 1
+            if entries_done <= resume_from:
+                continue  # 이전 실행에서 반영된 날짜
+            day = _day_number(date_str)
+            for user_id, channels in users.items():
+                for channel_id, seconds in channels.items():
+                    rows.append((int(user_id), day, int(channel_id), int(seconds)))
+            if len(rows) >= IMPORT_CHUNK:
+                inserted += await self._import_chunk(rows, progress_key, entries_done)
+                rows = []
+                if progress:
+                    await progress(path, entries_done, inserted_before + inserted)
+                await asyncio.sleep(0)
+
+        if rows:
+            inserted += await self._import_chunk(rows, progress_key, entries_done)
+        async with self._flush_lock:
+            await self._db.execute("DELETE FROM voice_meta WHERE key = ?", (progress_key,))
+            await self._db.commit()
+        if progress:
+            await progress(path, entries_done, inserted_before + inserted)
+        return inserted
+
+    async def _import_chunk(self, rows: List[Tuple[int, int, int, int]], progress_key: str, entries_done: int) -> int:
+        """
+        한 청크를 한 트랜잭션으로 반영합니다. 이미 있는 (유저, 날짜, 채널)은 건너뛰고(DO NOTHING과 동일),
+        새로 들어간 행만 주간/월간 롤업과 기간 메타데이터에 더합니다.
+        서버는 channel_guilds로 아는 채널만 채우고, 나머지는 0으로 두어 assign_channel_guilds에서 채웁니다.
+        """
+        async with self._flush_lock:
+            try:
+                await self._db.execute("DELETE FROM temp.import_rows")
+                await self._db.executemany(
+                    "INSERT OR IGNORE INTO temp.import_rows (user_id, day, channel_id, seconds, guild_id) VALUES (?, ?, ?, ?, ?)",
+                    [(*row, self._channel_guilds.get(row[2], 0)) for row in rows]
+                )
+                await self._db.execute("""
+                    DELETE FROM temp.import_rows
+                     WHERE EXISTS (
+                        SELECT 1 FROM voice_days v
+                         WHERE v.user_id = import_rows.user_id
+                           AND v.day = import_rows.day
+                           AND v.channel_id = import_rows.channel_id
+                     )
+                """)
+                cursor = await self._db.execute("""
+                    INSERT INTO voice_days (user_id, day, channel_id, seconds, guild_id)
+                    SELECT user_id, day, channel_id, seconds, guild_id FROM temp.import_rows
+                """)
+                inserted = cursor.rowcount
+                await self._db.execute("""
+                    INSERT INTO voice_times_weekly (week_start, user_id, channel_id, seconds, guild_id)
+                    SELECT date((day - (day + 3) % 7) * 86400, 'unixepoch'), user_id, channel_id, SUM(seconds), MAX(guild_id)
+                      FROM temp.import_rows WHERE true
+                     GROUP BY 1, user_id, channel_id
+                    ON CONFLICT(week_start, user_id, channel_id)
+                    DO UPDATE SET seconds = seconds + excluded.seconds, guild_id = MAX(guild_id, excluded.guild_id)
+                """)
+                await self._db.execute("""
+                    INSERT INTO voice_times_monthly (month, user_id, channel_id, seconds, guild_id)
+                    SELECT strftime('%Y-%m', day * 86400, 'unixepoch'), user_id, channel_id, SUM(seconds), MAX(guild_id)
+                      FROM temp.import_rows WHERE true
+                     GROUP BY 1, user_id, channel_id
+                    ON CONFLICT(month, user_id, channel_id)
+                    DO UPDATE SET seconds = seconds + excluded.seconds, guild_id = MAX(guild_id, excluded.guild_id)
+                """)
+                async with self._db.execute("SELECT MIN(day), MAX(day) FROM temp.import_rows") as cursor:
+                    first_day, last_day = await cursor.fetchone()
+                if first_day is not None:
+                    await self._db.execute(DATE_BOUND_UPSERT, (_day_str(first_day), _day_str(last_day)))
                 await self._db.execute(
-                    """
-                    INSERT OR REPLACE INTO deleted_channels (channel_id, category_id)
-                    VALUES (?, ?)
-                    """,
-                    (int(channel_id), int(category_id))
+                    "INSERT OR REPLACE INTO voice_meta (key, value) VALUES (?, ?)",
+                    (progress_key, str(entries_done))
                 )
+                await self._db.commit()
+            except Exception:
+                await self._db.rollback()
+                raise
+        return inserted
 
-        # ④ 최종 커밋
-        await self._db.commit()
-        
+    async def _import_deleted_channels(self, path: str):
+        """{채널ID: {"category_id": 숫자}} 형식의 파일을 청크 단위로 INSERT OR REPLACE 합니다."""
+        rows: List[Tuple[int, int]] = []
+        for channel_id, payload in _iter_json_items(path):
+            category_id = payload.get("category_id")
+            if category_id is None:
+                continue
+            rows.append((int(channel_id), int(category_id)))
+            if len(rows) >= IMPORT_CHUNK:
+                await self._replace_deleted_channels(rows)
+                rows = []
+                await asyncio.sleep(0)
+        if rows:
+            await self._replace_deleted_channels(rows)
+
+    async def _replace_deleted_channels(self, rows: List[Tuple[int, int]]):
+        async with self._flush_lock:
+            await self._db.executemany(
+                "INSERT OR REPLACE INTO deleted_channels (channel_id, category_id) VALUES (?, ?)",
+                rows
+            )
+            await self._db.commit()
 
     async def migrate_deleted_channels(self, deleted_channels_paths: List[str]):
         """
@@ -337,13 +1771,15 @@ class DataManager:
         # DB 초기화 및 준비
         await self.ensure_initialized()
         # 1) 기존 레코드 삭제
-        await self._db.execute("DELETE FROM deleted_channels")
+        async with self._flush_lock:
+            await self._db.execute("DELETE FROM deleted_channels")
+            await self._db.commit()
 
         # 프로젝트 루트를 기준으로 경로 재해석
         from pathlib import Path
         base_dir = Path(__file__).resolve().parent.parent
 
-        # 2) 각 JSON 파일을 순회하며 데이터 병합
+        # 2) 각 JSON 파일을 스트리밍으로 읽어 청크 단위로 병합
         for fp in deleted_channels_paths:
             path = Path(fp)
             # 상대 경로가 없으면 data 디렉터리에서 찾기
@@ -351,23 +1787,7 @@ class DataManager:
                 path = base_dir / "data" / fp
             if not path.exists():
                 continue
-
-            # JSON 로드
-            with open(path, 'r', encoding='utf-8') as f:
-                deleted = json.load(f)
-
-            # 중복 없이 INSERT OR REPLACE
-            for channel_id, payload in deleted.items():
-                category_id = payload.get("category_id")
-                if category_id is None:
-                    continue
-                await self._db.execute(
-                    "INSERT OR REPLACE INTO deleted_channels (channel_id, category_id) VALUES (?, ?)",
-                    (int(channel_id), int(category_id))
-                )
-
-        # 3) 커밋
-        await self._db.commit()
+            await self._import_deleted_channels(str(path))
 
     async def get_deleted_channels_by_categories(self, category_ids: List[int]) -> List[int]:
         """주어진 카테고리ID 목록에 속한 삭제된 채널ID들을 반환합니다."""
@@ -393,20 +1813,17 @@ class DataManager:
         if not start_date or not end_date:
             return 0
 
-        sql = """
-            SELECT SUM(seconds)
-              FROM voice_times
-             WHERE user_id = ?
-               AND date BETWEEN ? AND ?
-        """
-        params = [
-            user_id,
-            start_date.strftime("%Y-%m-%d"),
-            (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
-        ]
-        async with self._db.execute(sql, params) as cursor:
-            row = await cursor.fetchone()
-            return row[0] if row and row[0] else 0
+        source, params = self._window_source(start_date, end_date, "seconds", "user_id = ?", [user_id])
+        sql = f"SELECT SUM(seconds) FROM ({source})"
+        start_str = start_date.strftime("%Y-%m-%d")
+        end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
+
+        async with self._flush_lock:
+            async with self._db.execute(sql, params) as cursor:
+                row = await cursor.fetchone()
+            total = row[0] if row and row[0] else 0
+            total += sum(secs for _, _, secs in self._iter_pending(start_str, end_str, user_id))
+        return total
 
     async def get_user_voice_seconds_daily(self, user_id: int, base_date: Optional[datetime] = None) -> int:
         """오늘 하루 동안 유저가 음성 채널에서 활동한 총 시간을 초 단위로 반환합니다."""
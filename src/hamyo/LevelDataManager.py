@@ -1,13 +1,34 @@
 import aiosqlite
 import asyncio
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Tuple
 import logging
 import pytz
 import os
 
+from rank_service import RankService, rank_query
+
 KST = pytz.timezone("Asia/Seoul")
 db_path = "data/level_system.db"
+BACKFILL_CHUNK = 5000  # kst_date/kst_month 채우기 시 한 트랜잭션에서 갱신하는 행 수
+
+# 기간별 다공 합계 테이블: period_type -> (테이블, 기간 키 컬럼, quest_logs의 대응 컬럼)
+PERIOD_COUNTERS = {
+    'daily': ('user_exp_daily', 'kst_date', 'kst_date'),
+    'weekly': ('user_exp_weekly', 'week_start', 'week_start'),
+    'monthly': ('user_exp_monthly', 'month', 'kst_month'),
+}
+
+# 내정보에 표시하는 퀘스트 (quest_type, quest_subtype)
+DASHBOARD_QUESTS = (
+    ('daily', 'attendance'),
+    ('daily', 'diary'),
+    ('daily', 'call'),
+    ('daily', 'friend'),
+    ('weekly', 'recommend'),
+    ('weekly', 'board_participate'),
+    ('weekly', 'shop_purchase'),
+)
 
 class LevelDataManager:
     _instance = None
@@ -19,6 +40,13 @@ class LevelDataManager:
             cls._instance = super().__new__(cls)
             cls._instance.db_path = db_path
             cls._instance._db = None
+            cls._instance._ranks = RankService({
+                'total': cls._instance._load_total_ranks,
+                **{
+                    period_type: cls._instance._period_rank_loader(period_type)
+                    for period_type in PERIOD_COUNTERS
+                },
+            })
         return cls._instance
     
     def __init__(self, db_path: str = db_path):
@@ -60,9 +88,37 @@ class LevelDataManager:
                 completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 exp_gained INTEGER DEFAULT 0,
                 week_start DATE,
+                kst_date TEXT,
+                kst_month TEXT,
                 FOREIGN KEY (user_id) REFERENCES user_exp (user_id)
             )
         """)
+        await self._migrate_quest_log_dates()
+        # 기간 조회는 저장된 KST 날짜/월 컬럼으로 인덱스를 탐색
+        await self._db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_quest_logs_user_quest_date
+            ON quest_logs (user_id, quest_type, quest_subtype, kst_date)
+        """)
+        await self._db.execute("CREATE INDEX IF NOT EXISTS idx_quest_logs_date_user ON quest_logs (kst_date, user_id)")
+        await self._db.execute("CREATE INDEX IF NOT EXISTS idx_quest_logs_month_user ON quest_logs (kst_month, user_id)")
+        await self._db.execute("CREATE INDEX IF NOT EXISTS idx_quest_logs_week_user ON quest_logs (week_start, user_id)")
+
+        # 기간별 다공 합계 (add_exp에서 quest_logs와 같은 트랜잭션으로 갱신)
+        async with self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'") as cursor:
+            existing_tables = {row[0] async for row in cursor}
+        for table, key, _ in PERIOD_COUNTERS.values():
+            await self._db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    exp INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY ({key}, user_id)
+                ) WITHOUT ROWID
+            """)
+            # 순위 조회(ORDER BY exp DESC, exp > ? 개수)를 인덱스 범위로 처리
+            await self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_exp ON {table} ({key}, exp)")
+        if any(table not in existing_tables for table, _, _ in PERIOD_COUNTERS.values()):
+            await self.rebuild_period_counters()
         
         # 일회성 퀘스트 완료 기록
         await self._db.execute("""
@@ -89,6 +145,69 @@ class LevelDataManager:
         
         await self._db.commit()
     
+    async def _migrate_quest_log_dates(self):
+        """기존 quest_logs에 kst_date/kst_month 컬럼을 추가하고 completed_at(UTC) 기준으로 채웁니다."""
+        async with self._db.execute("PRAGMA table_info(quest_logs)") as cursor:
+            columns = {row[1] async for row in cursor}
+        for column in ("kst_date", "kst_month"):
+            if column not in columns:
+                await self._db.execute(f"ALTER TABLE quest_logs ADD COLUMN {column} TEXT")
+        await self._db.commit()
+
+        while True:
+            cursor = await self._db.execute("""
+                UPDATE quest_logs
+                   SET kst_date = DATE(completed_at, '+9 hours'),
+                       kst_month = strftime('%Y-%m', completed_at, '+9 hours')
+                 WHERE id IN (SELECT id FROM quest_logs WHERE kst_date IS NULL LIMIT ?)
+            """, (BACKFILL_CHUNK,))
+            await self._db.commit()
+            if cursor.rowcount < BACKFILL_CHUNK:
+                break
+
+    async def rebuild_period_counters(self) -> Dict[str, int]:
+        """quest_logs에서 기간별 다공 합계 테이블을 다시 만들고 테이블별 행 수를 반환합니다."""
+        counts = {}
+        try:
+            for period_type, (table, key, log_key) in PERIOD_COUNTERS.items():
+                await self._db.execute(f"DELETE FROM {table}")
+                cursor = await self._db.execute(f"""
+                    INSERT INTO {table} ({key}, user_id, exp)
+                    SELECT {log_key}, user_id, SUM(exp_gained)
+                      FROM quest_logs
+                     WHERE {log_key} IS NOT NULL AND exp_gained > 0
+                     GROUP BY {log_key}, user_id
+                """)
+                counts[period_type] = cursor.rowcount
+            await self._db.commit()
+        except Exception:
+            await self._db.rollback()
+            raise
+        finally:
+            for period_type in PERIOD_COUNTERS:
+                self._ranks.invalidate(period_type)
+        return counts
+
+    def _period_counter(self, period_type: str):
+        """period_type의 (합계 테이블, 기간 키 컬럼, 현재 기간 키). 없는 기간이면 None"""
+        if period_type not in PERIOD_COUNTERS:
+            return None
+        table, key, log_key = PERIOD_COUNTERS[period_type]
+        return table, key, self._kst_period_keys()[log_key]
+
+    async def _load_total_ranks(self, bucket=None):
+        async with self._db.execute(rank_query('user_exp', 'total_exp')) as cursor:
+            return await cursor.fetchall()
+
+    def _period_rank_loader(self, period_type: str):
+        table, key, _ = PERIOD_COUNTERS[period_type]
+        sql = rank_query(table, 'exp', f"{key} = ?")
+
+        async def load(period_key: str):
+            async with self._db.execute(sql, (period_key,)) as cursor:
+                return await cursor.fetchall()
+        return load
+
     def db_connect(self):
         """데이터베이스 연결 컨텍스트 매니저"""
         return aiosqlite.connect(self.db_path)
@@ -102,7 +221,91 @@ class LevelDataManager:
         days_since_monday = date.weekday()
         week_start = date - timedelta(days=days_since_monday)
         return week_start.strftime('%Y-%m-%d')
+
+    def _kst_period_keys(self, date: datetime = None) -> Dict[str, str]:
+        """quest_logs에 저장하는 KST 기간 키 (kst_date, kst_month, week_start)"""
+        date = (date or datetime.now(KST)).astimezone(KST)
+        return {
+            'kst_date': date.strftime('%Y-%m-%d'),
+            'kst_month': date.strftime('%Y-%m'),
+            'week_start': self._get_week_start(date),
+        }
+
+    async def add_quest_log(self, user_id: int, quest_type: str, quest_subtype: str = None,
+                            exp_gained: int = 0, count: int = 1, commit: bool = True):
+        """퀘스트 수행 기록을 KST 기간 키와 함께 count건 남기고, 다공이 있으면 기간별 합계도 더합니다."""
+        await self.ensure_initialized()
+        keys = self._kst_period_keys()
+        await self._db.executemany("""
+            INSERT INTO quest_logs (user_id, quest_type, quest_subtype, exp_gained, week_start, kst_date, kst_month)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(user_id, quest_type, quest_subtype, exp_gained, keys['week_start'], keys['kst_date'], keys['kst_month'])] * count)
+        if exp_gained > 0:
+            for table, key, log_key in PERIOD_COUNTERS.values():
+                await self._db.execute(f"""
+                    INSERT INTO {table} ({key}, user_id, exp) VALUES (?, ?, ?)
+                    ON CONFLICT({key}, user_id) DO UPDATE SET exp = exp + excluded.exp
+                """, (keys[log_key], user_id, exp_gained * count))
+            for period_type, (_, _, log_key) in PERIOD_COUNTERS.items():
+                self._ranks.invalidate(period_type, keys[log_key])
+        if commit:
+            await self._db.commit()
     
+    async def get_quest_log_counts(self, user_id: int, keys: Iterable[Tuple[str, str, str]]) -> Dict[Tuple[str, str, str], int]:
+        """
+        {(quest_type, quest_subtype, period): 기록 수}를 한 번에 조회합니다.
+        period는 'day'(오늘) 또는 'week'(이번 주)이며 모두 이번 주 기록에서 조건부 집계합니다.
+        """
+        await self.ensure_initialized()
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        period_keys = self._kst_period_keys()
+        columns = []
+        params = []
+        for quest_type, quest_subtype, period in keys:
+            if period == 'day':
+                columns.append("COALESCE(SUM(quest_type = ? AND quest_subtype = ? AND kst_date = ?), 0)")
+                params.extend((quest_type, quest_subtype, period_keys['kst_date']))
+            elif period == 'week':
+                columns.append("COALESCE(SUM(quest_type = ? AND quest_subtype = ?), 0)")
+                params.extend((quest_type, quest_subtype))
+            else:
+                raise ValueError(f"Unsupported period: {period}")
+        params.extend((user_id, period_keys['week_start']))
+        async with self._db.execute(f"""
+            SELECT {', '.join(columns)}
+              FROM quest_logs
+             WHERE user_id = ? AND week_start = ?
+        """, params) as cursor:
+            row = await cursor.fetchone()
+        return dict(zip(keys, row))
+
+    async def apply_quest_logs(self, user_id: int, entries: Iterable[Tuple[str, str, int, int]]):
+        """(quest_type, quest_subtype, exp_per_log, count) 기록들과 다공 합계를 한 트랜잭션으로 씁니다."""
+        await self.ensure_initialized()
+        entries = list(entries)
+        total = sum(exp * count for _, _, exp, count in entries)
+        try:
+            if total:
+                await self._db.execute("""
+                    INSERT INTO user_exp (user_id, total_exp)
+                    VALUES (?, ?)
+                    ON CONFLICT(user_id)
+                    DO UPDATE SET
+                        total_exp = total_exp + excluded.total_exp,
+                        last_updated = CURRENT_TIMESTAMP
+                """, (user_id, total))
+                self._ranks.invalidate('total')
+            for quest_type, quest_subtype, exp, count in entries:
+                await self.add_quest_log(user_id, quest_type, quest_subtype, exp, count=count, commit=False)
+            await self._db.commit()
+        except Exception:
+            await self._db.rollback()
+            raise
+        if total:
+            self.logger.info(f"Added {total} 다공 to user {user_id}")
+
     async def add_exp(self, user_id: int, exp_amount: int, quest_type: str = None, quest_subtype: str = None) -> bool:
         await self.ensure_initialized()
         """다공 지급"""
@@ -116,19 +319,17 @@ class LevelDataManager:
                     total_exp = total_exp + ?,
                     last_updated = CURRENT_TIMESTAMP
             """, (user_id, exp_amount, exp_amount))
+            self._ranks.invalidate('total')
             
             # 퀘스트 로그 기록
             if quest_type:
-                week_start = self._get_week_start(datetime.now(KST))
-                await self._db.execute("""
-                    INSERT INTO quest_logs (user_id, quest_type, quest_subtype, exp_gained, week_start)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (user_id, quest_type, quest_subtype, exp_amount, week_start))
+                await self.add_quest_log(user_id, quest_type, quest_subtype, exp_amount, commit=False)
             
             await self._db.commit()
             self.logger.info(f"Added {exp_amount} 다공 to user {user_id}")
             return True
         except Exception as e:
+            await self._db.rollback()
             self.logger.error(f"Error adding 다공: {e}")
             return False
     
@@ -172,6 +373,7 @@ class LevelDataManager:
                 WHERE user_id = ?
             """, (exp_amount, user_id))
             await self._db.commit()
+            self._ranks.invalidate('total')
             self.logger.info(f"Removed {exp_amount} 다공 from user {user_id}")
             return True
         except Exception as e:
@@ -185,7 +387,10 @@ class LevelDataManager:
             await self._db.execute("DELETE FROM user_exp")
             await self._db.execute("DELETE FROM quest_logs")
             await self._db.execute("DELETE FROM one_time_quests")
+            for table, _, _ in PERIOD_COUNTERS.values():
+                await self._db.execute(f"DELETE FROM {table}")
             await self._db.commit()
+            self._ranks.invalidate()
             self.logger.info("Reset all users")
             return True
         except Exception as e:
@@ -197,14 +402,26 @@ class LevelDataManager:
         """특정 유저 초기화"""
         try:
             await self._db.execute("DELETE FROM user_exp WHERE user_id = ?", (user_id,))
-            await self._db.execute("DELETE FROM quest_logs WHERE user_id = ?", (user_id,))
-            await self._db.execute("DELETE FROM one_time_quests WHERE user_id = ?", (user_id,))
+            await self.reset_user_quests(user_id, commit=False)
             await self._db.commit()
+            self._ranks.invalidate('total')
             self.logger.info(f"Reset user {user_id}")
             return True
         except Exception as e:
             self.logger.error(f"Error resetting user: {e}")
             return False
+
+    async def reset_user_quests(self, user_id: int, commit: bool = True):
+        """유저의 퀘스트 기록(일회성 포함)과 기간별 다공 합계를 지웁니다. 누적 다공은 유지됩니다."""
+        await self.ensure_initialized()
+        await self._db.execute("DELETE FROM quest_logs WHERE user_id = ?", (user_id,))
+        await self._db.execute("DELETE FROM one_time_quests WHERE user_id = ?", (user_id,))
+        for table, _, _ in PERIOD_COUNTERS.values():
+            await self._db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        for period_type in PERIOD_COUNTERS:
+            self._ranks.invalidate(period_type)
+        if commit:
+            await self._db.commit()
     
     async def get_quest_count(self, user_id: int, quest_type: str, quest_subtype: str = None, timeframe: str = 'week') -> int:
         await self.ensure_initialized()
@@ -218,7 +435,7 @@ class LevelDataManager:
                         SELECT EXISTS (
                             SELECT 1 FROM quest_logs 
                             WHERE user_id = ? AND quest_type = ? AND quest_subtype = ? 
-                            AND DATE(completed_at, '+9 hours') = ?
+                            AND kst_date = ?
                         ) as did_today
                     """, (user_id, quest_type, quest_subtype, today_kst))
                 else:
@@ -226,7 +443,7 @@ class LevelDataManager:
                         SELECT EXISTS (
                             SELECT 1 FROM quest_logs 
                             WHERE user_id = ? AND quest_type = ? 
-                            AND DATE(completed_at, '+9 hours') = ?
+                            AND kst_date = ?
                         ) as did_today
                     """, (user_id, quest_type, today_kst))
                 result = await cursor.fetchone()
@@ -319,50 +536,21 @@ class LevelDataManager:
                     ORDER BY total_exp DESC 
                     LIMIT ?
                 """, (limit,))
-            elif period_type == 'daily':
-                # 일간 순위 (오늘 획득한 경험치, KST 기준)
-                today_kst = datetime.now(KST).strftime('%Y-%m-%d')
-                cursor = await self._db.execute("""
-                    SELECT ql.user_id, SUM(ql.exp_gained) as period_exp, 
-                            COALESCE(ue.current_role, 'hub') as current_role
-                    FROM quest_logs ql
-                    LEFT JOIN user_exp ue ON ql.user_id = ue.user_id
-                    WHERE DATE(ql.completed_at, 'localtime') = ?
-                    GROUP BY ql.user_id
-                    HAVING period_exp > 0
-                    ORDER BY period_exp DESC
-                    LIMIT ?
-                """, (today_kst, limit))
-            elif period_type == 'weekly':
-                # 주간 순위 (이번 주 획득한 경험치)
-                week_start = self._get_week_start(datetime.now(KST))
-                cursor = await self._db.execute("""
-                    SELECT ql.user_id, SUM(ql.exp_gained) as period_exp,
-                            COALESCE(ue.current_role, 'hub') as current_role
-                    FROM quest_logs ql
-                    LEFT JOIN user_exp ue ON ql.user_id = ue.user_id
-                    WHERE ql.week_start = ?
-                    GROUP BY ql.user_id
-                    HAVING period_exp > 0
-                    ORDER BY period_exp DESC
-                    LIMIT ?
-                """, (week_start, limit))
-            elif period_type == 'monthly':
-                # 월간 순위 (이번 달 획득한 경험치)
-                month_kst = datetime.now(KST).strftime('%Y-%m')
-                cursor = await self._db.execute("""
-                    SELECT ql.user_id, SUM(ql.exp_gained) as period_exp,
+            else:
+                # 일간/주간/월간 순위 (이번 기간 합계 테이블에서 인덱스 순서대로)
+                counter = self._period_counter(period_type)
+                if counter is None:
+                    return []
+                table, key, period_key = counter
+                cursor = await self._db.execute(f"""
+                    SELECT c.user_id, c.exp as period_exp,
                             COALESCE(ue.current_role, 'hub') as current_role
-                    FROM quest_logs ql
-                    LEFT JOIN user_exp ue ON ql.user_id = ue.user_id
-                    WHERE strftime('%Y-%m', ql.completed_at, 'localtime') = ?
-                    GROUP BY ql.user_id
-                    HAVING period_exp > 0
-                    ORDER BY period_exp DESC
+                    FROM {table} c
+                    LEFT JOIN user_exp ue ON c.user_id = ue.user_id
+                    WHERE c.{key} = ? AND c.exp > 0
+                    ORDER BY c.exp DESC
                     LIMIT ?
-                """, (month_kst, limit))
-            else:
-                return []
+                """, (period_key, limit))
             
             results = await cursor.fetchall()
             return results if results else []
@@ -379,32 +567,15 @@ class LevelDataManager:
                 cursor = await self._db.execute("""
                     SELECT total_exp FROM user_exp WHERE user_id = ?
                 """, (user_id,))
-            elif period_type == 'daily':
-                # 오늘 획득한 경험치
-                today_kst = datetime.now(KST).strftime('%Y-%m-%d')
-                cursor = await self._db.execute("""
-                    SELECT COALESCE(SUM(exp_gained), 0) as daily_exp
-                    FROM quest_logs 
-                    WHERE user_id = ? AND DATE(completed_at, 'localtime') = ?
-                """, (user_id, today_kst))
-            elif period_type == 'weekly':
-                # 이번 주 획득한 경험치
-                week_start = self._get_week_start(datetime.now(KST))
-                cursor = await self._db.execute("""
-                    SELECT COALESCE(SUM(exp_gained), 0) as weekly_exp
-                    FROM quest_logs 
-                    WHERE user_id = ? AND week_start = ?
-                """, (user_id, week_start))
-            elif period_type == 'monthly':
-                # 이번 달 획득한 경험치
-                month_kst = datetime.now(KST).strftime('%Y-%m')
-                cursor = await self._db.execute("""
-                    SELECT COALESCE(SUM(exp_gained), 0) as monthly_exp
-                    FROM quest_logs 
-                    WHERE user_id = ? AND strftime('%Y-%m', completed_at, 'localtime') = ?
-                """, (user_id, month_kst))
             else:
-                return 0
+                # 이번 기간 획득한 경험치
+                counter = self._period_counter(period_type)
+                if counter is None:
+                    return 0
+                table, key, period_key = counter
+                cursor = await self._db.execute(f"""
+                    SELECT exp FROM {table} WHERE {key} = ? AND user_id = ?
+                """, (period_key, user_id))
             
             result = await cursor.fetchone()
             return result[0] if result else 0
@@ -412,79 +583,97 @@ class LevelDataManager:
             self.logger.error(f"Error getting user period exp for {period_type}: {e}")
             return 0
     
-    async def get_user_period_rank(self, user_id: int, period_type: str) -> int:
+    def _rank_bucket(self, period_type: str):
+        """순위 캐시 버킷 (누적: None, 일간/주간/월간: 이번 기간 키). 없는 기간이면 False"""
+        if period_type == 'total':
+            return None
+        counter = self._period_counter(period_type)
+        return counter[2] if counter else False
+
+    async def get_user_rank_context(self, user_id: int, period_type: str) -> Optional[Dict[str, Any]]:
+        """
+        기간별 순위와 바로 위/아래 유저 ("N위, N-1위와 X 다공 차이" 표시용)
+        {rank, score, total, above, below, gap}, above/below는 {user_id, score, rank} 또는 None
+        """
         await self.ensure_initialized()
-        """특정 유저의 기간별 순위 조회"""
+        bucket = self._rank_bucket(period_type)
+        if bucket is False:
+            return None
         try:
-            if period_type == 'total':
-                # 누적 순위
-                cursor = await self._db.execute("""
-                    SELECT COUNT(*) + 1 as rank
-                    FROM user_exp u1
-                    WHERE u1.total_exp > (
-                        SELECT COALESCE(total_exp, 0) FROM user_exp WHERE user_id = ?
-                    )
-                """, (user_id,))
-            elif period_type == 'daily':
-                # 일간 순위
-                today_kst = datetime.now(KST).strftime('%Y-%m-%d')
-                cursor = await self._db.execute("""
-                    SELECT COUNT(*) + 1 as rank
-                    FROM (
-                        SELECT user_id, SUM(exp_gained) as daily_exp
-                        FROM quest_logs 
-                        WHERE DATE(completed_at, 'localtime') = ?
-                        GROUP BY user_id
-                    ) daily_ranks
-                    WHERE daily_exp > (
-                        SELECT COALESCE(SUM(exp_gained), 0)
-                        FROM quest_logs 
-                        WHERE user_id = ? AND DATE(completed_at, 'localtime') = ?
-                    )
-                """, (today_kst, user_id, today_kst))
-            elif period_type == 'weekly':
-                # 주간 순위
-                week_start = self._get_week_start(datetime.now(KST))
-                cursor = await self._db.execute("""
-                    SELECT COUNT(*) + 1 as rank
-                    FROM (
-                        SELECT user_id, SUM(exp_gained) as weekly_exp
-                        FROM quest_logs 
-                        WHERE week_start = ?
-                        GROUP BY user_id
-                    ) weekly_ranks
-                    WHERE weekly_exp > (
-                        SELECT COALESCE(SUM(exp_gained), 0)
-                        FROM quest_logs 
-                        WHERE user_id = ? AND week_start = ?
-                    )
-                """, (week_start, user_id, week_start))
-            elif period_type == 'monthly':
-                # 월간 순위
-                month_kst = datetime.now(KST).strftime('%Y-%m')
-                cursor = await self._db.execute("""
-                    SELECT COUNT(*) + 1 as rank
-                    FROM (
-                        SELECT user_id, SUM(exp_gained) as monthly_exp
-                        FROM quest_logs 
-                        WHERE strftime('%Y-%m', completed_at, 'localtime') = ?
-                        GROUP BY user_id
-                    ) monthly_ranks
-                    WHERE monthly_exp > (
-                        SELECT COALESCE(SUM(exp_gained), 0)
-                        FROM quest_logs 
-                        WHERE user_id = ? AND strftime('%Y-%m', completed_at, 'localtime') = ?
-                    )
-                """, (month_kst, user_id, month_kst))
-            else:
-                return 1
-            
-            result = await cursor.fetchone()
-            return result[0] if result else 1
+            return await self._ranks.lookup(period_type, user_id, bucket)
         except Exception as e:
-            self.logger.error(f"Error getting user period rank for {period_type}: {e}")
-            return 1
+            self.logger.error(f"Error getting user rank context for {period_type}: {e}")
+            return None
+
+    async def get_user_period_rank(self, user_id: int, period_type: str) -> int:
+        """특정 유저의 기간별 순위 조회"""
+        context = await self.get_user_rank_context(user_id, period_type)
+        return context['rank'] if context else 1
     
+    async def get_user_dashboard(
+        self,
+        user_id: int,
+        quests: Iterable[Tuple[str, str]] = DASHBOARD_QUESTS
+    ) -> Dict[str, Any]:
+        """
+        내정보 화면에 필요한 값을 SQL 한 번과 순위 캐시로 조회합니다.
+        - total_exp, current_role, certified({rank_type: level})
+        - daily/weekly: {(quest_type, quest_subtype): 오늘/이번 주 완료 횟수} (quest_logs 조건부 집계)
+        - weekly_exp, weekly_rank: 이번 주 합계와 순위 (순위 캐시 RankService, get_user_rank_context와 같은 값)
+        """
+        await self.ensure_initialized()
+        quests = list(quests)
+        keys = self._kst_period_keys()
+
+        quest_columns = []
+        quest_params = []
+        for quest_type, quest_subtype in quests:
+            quest_columns.append(
+                "COALESCE(SUM(quest_type = ? AND quest_subtype = ? AND kst_date = ?), 0), "
+                "COALESCE(SUM(quest_type = ? AND quest_subtype = ?), 0)"
+            )
+            quest_params.extend((quest_type, quest_subtype, keys['kst_date'], quest_type, quest_subtype))
+
+        sql = f"""
+            WITH quest AS (
+                SELECT {', '.join(quest_columns) or '0'}
+                  FROM quest_logs
+                 WHERE user_id = ? AND week_start = ?
+            )
+            SELECT (SELECT total_exp FROM user_exp WHERE user_id = ?),
+                   (SELECT current_role FROM user_exp WHERE user_id = ?),
+                   (SELECT group_concat(rank_type || ':' || certified_level) FROM rank_certifications WHERE user_id = ?),
+                   quest.*
+              FROM quest
+        """
+        params = quest_params + [
+            user_id, keys['week_start'],
+            user_id, user_id, user_id,
+        ]
+        try:
+            async with self._db.execute(sql, params) as cursor:
+                row = await cursor.fetchone()
+        except Exception as e:
+            self.logger.error(f"Error getting user dashboard: {e}")
+            return None
+
+        weekly = await self.get_user_rank_context(user_id, 'weekly')
+        total_exp, current_role, certified = row[:3]
+        counts = row[3:]
+        return {
+            'user_id': user_id,
+            'total_exp': total_exp or 0,
+            'current_role': current_role or 'hub',
+            'certified': {
+                rank_type: int(level)
+                for rank_type, level in (item.rsplit(':', 1) for item in certified.split(','))
+            } if certified else {},
+            'daily': {quest: counts[i * 2] for i, quest in enumerate(quests)},
+            'weekly': {quest: counts[i * 2 + 1] for i, quest in enumerate(quests)},
+            'weekly_exp': weekly['score'] if weekly else 0,
+            'weekly_rank': weekly['rank'] if weekly else 1,
+        }
+
     async def get_period_summary(self, user_id: int) -> Dict[str, int]:
         await self.ensure_initialized()
         """유저의 모든 기간별 경험치 요약"""
@@ -6,6 +6,8 @@ import logging
 import pytz
 import os
 
+from rank_service import RankService, rank_query
+
 KST = pytz.timezone("Asia/Seoul")
 db_path = "data/tree.db"
 
@@ -19,6 +21,7 @@ class TreeDataManager:
             cls._instance = super().__new__(cls)
             cls._instance.db_path = db_path
             cls._instance._db = None
+            cls._instance._ranks = RankService({'total': cls._instance._load_ranks})
         return cls._instance
     
     def __init__(self, db_path: str = db_path):
@@ -104,6 +107,7 @@ class TreeDataManager:
                 """, (user_id, quest_name, quest_subtype, amount, week_start))
             
             await self._db.commit()
+            self._ranks.invalidate('total')
             self.logger.info(f"Added {amount} snowflakes to user {user_id}")
             return True
         except Exception as e:
@@ -121,6 +125,7 @@ class TreeDataManager:
                 WHERE user_id = ?
             """, (amount, amount, user_id))
             await self._db.commit()
+            self._ranks.invalidate('total')
             self.logger.info(f"Removed {amount} snowflakes from user {user_id}")
             return True
         except Exception as e:
@@ -293,22 +298,23 @@ class TreeDataManager:
             self.logger.error(f"Error getting rankings: {e}")
             return []
 
-    async def get_user_rank(self, user_id: int) -> int:
+    async def _load_ranks(self, bucket=None):
+        async with self._db.execute(rank_query('user_snowflakes', 'total_gathered')) as cursor:
+            return await cursor.fetchall()
+
+    async def get_user_rank_context(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """유저 순위와 바로 위/아래 유저 {rank, score, total, above, below, gap}"""
         await self.ensure_initialized()
-        """유저 순위 조회"""
         try:
-            cursor = await self._db.execute("""
-                SELECT COUNT(*) + 1
-                FROM user_snowflakes
-                WHERE total_gathered > (
-                    SELECT total_gathered FROM user_snowflakes WHERE user_id = ?
-                )
-            """, (user_id,))
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+            return await self._ranks.lookup('total', user_id)
         except Exception as e:
-            self.logger.error(f"Error getting user rank: {e}")
-            return 0
+            self.logger.error(f"Error getting user rank context: {e}")
+            return None
+
+    async def get_user_rank(self, user_id: int) -> int:
+        """유저 순위 조회"""
+        context = await self.get_user_rank_context(user_id)
+        return context['rank'] if context else 0
 
     async def reset_database(self) -> bool:
         """데이터베이스 초기화 (모든 데이터 삭제)"""
@@ -318,6 +324,7 @@ class TreeDataManager:
             await self._db.execute("DELETE FROM quest_logs")
             await self._db.execute("DELETE FROM sqlite_sequence WHERE name='quest_logs'") # Reset autoincrement
             await self._db.commit()
+            self._ranks.invalidate()
             self.logger.info("Database reset complete.")
             return True
         except Exception as e:
@@ -2,10 +2,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
-from DataManager import DataManager
+from DataManager import CompactedPeriodError, DataManager
+from voice_utils import TrackedChannelRegistry
 import pytz
 from typing import List
 
+TRACKED_SOURCE = "aginari"  # tracked_channels / expanded_tracked_channels의 source
+
 GUILD_ID = [1396829213100605580, 1378632284068122685]
 
 def only_in_guild():
@@ -19,6 +22,7 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
     def __init__(self, bot):
         self.bot = bot
         self.data_manager = DataManager()
+        self.tracked_channels = TrackedChannelRegistry()
         self.tz = pytz.timezone('Asia/Seoul')
         
     async def cog_load(self):
@@ -32,6 +36,13 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
         except Exception as e:
             print(f"❌ {self.__class__.__name__} 로그 전송 중 오류 발생: {e}")
             
+    async def reply_compacted(self, interaction: discord.Interaction, error: CompactedPeriodError):
+        """압축된 기간을 일별/주간으로 조회했을 때 안내 (defer 여부에 맞춰 응답)"""
+        if interaction.response.is_done():
+            await interaction.followup.send(str(error), ephemeral=True)
+        else:
+            await interaction.response.send_message(str(error), ephemeral=True)
+
     def calculate_points(self, seconds: int) -> int:
         """음성 채널 사용 시간을 점수로 변환 (1분당 2점, 초 단위 내림)"""
         minutes = seconds // 60
@@ -44,35 +55,7 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
         return f"{days}일 {hours}시간 {minutes}분 {seconds}초 ({self.calculate_points(total_seconds)}점)"
     
     async def get_expanded_tracked_channels(self) -> List[int]:
-        tracked_ids = await self.data_manager.get_tracked_channels("aginari")
-        expanded_ids = set()
-
-        # 1. 카테고리ID와 음성채널ID 분리
-        category_ids = set()
-        voice_channel_ids = set()
-        for cid in tracked_ids:
-            ch = self.bot.get_channel(cid)
-            if isinstance(ch, discord.CategoryChannel):
-                category_ids.add(cid)
-            elif isinstance(ch, discord.VoiceChannel):
-                voice_channel_ids.add(cid)
-
-        # 2. 카테고리ID로 등록된 경우, 해당 카테고리의 모든 하위 음성채널 포함
-        for cat_id in category_ids:
-            cat = self.bot.get_channel(cat_id)
-            if isinstance(cat, discord.CategoryChannel):
-                for vc in cat.voice_channels:
-                    expanded_ids.add(vc.id)
-
-        # 3. 음성채널ID로 등록된 경우, 해당 음성채널만 포함
-        expanded_ids.update(voice_channel_ids)
-
-        # 4. 삭제된 채널 중, category_id가 등록된 카테고리ID에 포함된 것만 추가 (DataManager 메소드 사용)
-        if category_ids:
-            deleted_channel_ids = await self.data_manager.get_deleted_channels_by_categories(list(category_ids))
-            expanded_ids.update(deleted_channel_ids)
-
-        return list(expanded_ids)
+        return list(await self.tracked_channels.get(self.bot, TRACKED_SOURCE))
 
     @app_commands.command(name="확인", description="개인 누적 시간을 확인합니다.")
     @app_commands.describe(
@@ -104,8 +87,10 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
             else:
                 base_datetime = datetime.now(self.tz)
 
-            tracked_channels = await self.get_expanded_tracked_channels()
-            times, start_date, end_date = await self.data_manager.get_user_times(user.id, period, base_datetime, tracked_channels)
+            await self.get_expanded_tracked_channels()  # 최신 확장 결과를 expanded_tracked_channels에 반영
+            times, start_date, end_date = await self.data_manager.get_user_times(
+                user.id, period, base_datetime, TRACKED_SOURCE, guild_id=interaction.guild.id
+            )
 
             if not times:
                 await interaction.response.send_message(f"해당 기간에 기록된 음성 채팅 기록이 없습니다.", ephemeral=True)
@@ -189,6 +174,8 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
             await interaction.followup.send(embed=embed)
             await self.log(f"{interaction.user}({interaction.user.id})님께서 {user}({user.id})님의 {period} 기록을 조회했습니다.")
 
+        except CompactedPeriodError as e:
+            await self.reply_compacted(interaction, e)
         except Exception as e:
             await self.log(f"음성 채팅 기록 확인 중 오류 발생: {e}")
             await interaction.response.send_message("기록 조회 중 오류가 발생했습니다.", ephemeral=True)
@@ -232,23 +219,26 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
             await interaction.response.defer() # 시간이 오래 걸릴 것을 대비해 defer 처리
             
             # 총 시간 데이터 조회
-            tracked_channels = await self.get_expanded_tracked_channels()
-            all_data, start_date, end_date = await self.data_manager.get_all_users_times(period, base_datetime, tracked_channels)
-
-            user_totals = [(uid, sum(times.values())) for uid, times in all_data.items()]
-            ranked = sorted(user_totals, key=lambda x: x[1], reverse=True)
+            # 순위 집계/정렬은 SQL에서 처리하고 요청한 페이지만 가져옴
+            await self.get_expanded_tracked_channels()  # 최신 확장 결과를 expanded_tracked_channels에 반영
+            total_users, start_date, end_date = await self.data_manager.count_ranked_users(
+                period, base_datetime, TRACKED_SOURCE, guild_id=interaction.guild.id
+            )
 
-            if not ranked:
+            if not total_users:
                 return await interaction.followup.send("해당 기간에 해당하는 기록이 없습니다.", ephemeral=True)
 
             items_per_page = 10
             start_index = (page - 1) * items_per_page
-            end_index = start_index + items_per_page
-            total_pages = (len(ranked) + items_per_page - 1) // items_per_page
+            total_pages = (total_users + items_per_page - 1) // items_per_page
 
             if page > total_pages:
                 return await interaction.followup.send(f"요청한 페이지는 존재하지 않습니다. (1-{total_pages})", ephemeral=True)
 
+            page_rows = await self.data_manager.get_ranking_page(
+                period, base_datetime, TRACKED_SOURCE, start_index, items_per_page, guild_id=interaction.guild.id
+            )
+
             start_str = start_date.strftime("%Y-%m-%d") if start_date else "-"
             end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d") if end_date else "-"
             
@@ -262,7 +252,7 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
             embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else None)
 
             # 현재 페이지의 순위 표시
-            for i, (uid, seconds) in enumerate(ranked[start_index:end_index], start=start_index + 1):
+            for i, (uid, seconds) in enumerate(page_rows, start=start_index + 1):
                 member = interaction.guild.get_member(uid)
                 name = member.display_name if member else f"알 수 없음 ({uid})"
                 embed.add_field(
@@ -273,21 +263,22 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
                 
             # 호출자의 순위가 현재 페이지에 포함되어 있지 않은 경우 하단에 추가 표시
             caller_id = interaction.user.id
-            if caller_id not in [uid for uid, _ in ranked[start_index:end_index]]:
-                for i, (uid, seconds) in enumerate(ranked, start=1):
-                    if uid == caller_id:
-                        member = interaction.guild.get_member(uid)
-                        name = member.display_name if member else f"알 수 없음 ({uid})"
-                        embed.add_field(
-                            name="───────── ౨ৎ ─────────",
-                            value=f"**{i}위 -** {interaction.user.mention}\n{self.format_duration(seconds)}",
-                            inline=False
-                        )
-                        break
+            if caller_id not in [uid for uid, _ in page_rows]:
+                rank, _, seconds, _, _ = await self.data_manager.get_user_rank(
+                    caller_id, period, base_datetime, TRACKED_SOURCE, guild_id=interaction.guild.id
+                )
+                if rank:
+                    embed.add_field(
+                        name="───────── ౨ৎ ─────────",
+                        value=f"**{rank}위 -** {interaction.user.mention}\n{self.format_duration(seconds)}",
+                        inline=False
+                    )
 
 
             await interaction.followup.send(embed=embed)
         
+        except CompactedPeriodError as e:
+            await self.reply_compacted(interaction, e)
         except Exception as e:
             await self.log(f"순위 확인 중 오류 발생: {e}")
             await interaction.response.send_message("순위 조회 중 오류가 발생했습니다.", ephemeral=True)
@@ -331,24 +322,28 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
                 await interaction.response.defer()  # 시간이 오래 걸릴 것을 대비해 defer 처리
                 
                 # 총 시간 데이터 조회
-                tracked_channels = await self.get_expanded_tracked_channels()
-                all_data, start_date, end_date = await self.data_manager.get_all_users_times(period, base_datetime, tracked_channels)
-
-                role_member_ids = {member.id for member in role.members}
-                filtered = [(uid, sum(times.values())) for uid, times in all_data.items() if uid in role_member_ids]
-                ranked = sorted(filtered, key=lambda x: x[1], reverse=True)
+                await self.get_expanded_tracked_channels()  # 최신 확장 결과를 expanded_tracked_channels에 반영
+                # 역할 멤버 스냅샷을 갱신하고 역할 멤버만 SQL에서 집계
+                await self.data_manager.sync_role_members(role.id, [member.id for member in role.members])
+                total_users, start_date, end_date = await self.data_manager.count_ranked_users(
+                    period, base_datetime, TRACKED_SOURCE, role_id=role.id, guild_id=interaction.guild.id
+                )
 
-                if not ranked:
+                if not total_users:
                     return await interaction.followup.send(f"{role.name} 역할의 기록이 없습니다.", ephemeral=True)
 
                 items_per_page = 10
                 start_index = (page - 1) * items_per_page
-                end_index = start_index + items_per_page
-                total_pages = (len(ranked) + items_per_page - 1) // items_per_page
+                total_pages = (total_users + items_per_page - 1) // items_per_page
 
                 if page > total_pages:
                     return await interaction.followup.send(f"요청한 페이지는 존재하지 않습니다. (1-{total_pages})", ephemeral=True)
 
+                page_rows = await self.data_manager.get_ranking_page(
+                    period, base_datetime, TRACKED_SOURCE, start_index, items_per_page,
+                    role_id=role.id, guild_id=interaction.guild.id
+                )
+
                 start_str = start_date.strftime("%Y-%m-%d") if start_date else "-"
                 end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d") if end_date else "-"
                     
@@ -362,7 +357,7 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
                 embed.set_thumbnail(url=interaction.guild.icon.url if interaction.guild.icon else None)
 
                 # 현재 페이지의 순위 표시
-                for i, (uid, seconds) in enumerate(ranked[start_index:end_index], start=start_index + 1):
+                for i, (uid, seconds) in enumerate(page_rows, start=start_index + 1):
                     member = interaction.guild.get_member(uid)
                     name = member.display_name if member else f"알 수 없음 ({uid})"
                     embed.add_field(
@@ -373,20 +368,21 @@ class HerbCommand(commands.GroupCog, group_name="허브"):
                     
                 # 호출자의 순위가 현재 페이지에 포함되어 있지 않은 경우 하단에 추가 표시
                 caller_id = interaction.user.id
-                if caller_id not in [uid for uid, _ in ranked[start_index:end_index]]:
-                    for i, (uid, seconds) in enumerate(ranked, start=1):
-                        if uid == caller_id:
-                            member = interaction.guild.get_member(uid)
-                            name = member.display_name if member else f"알 수 없음 ({uid})"
-                            embed.add_field(
-                                name="───────── ౨ৎ ─────────",
-                                value=f"**{i}위 -** {interaction.user.mention}\n{self.format_duration(seconds)}",
-                                inline=False
-                            )
-                            break
+                if caller_id not in [uid for uid, _ in page_rows]:
+                    rank, _, seconds, _, _ = await self.data_manager.get_user_rank(
+                        caller_id, period, base_datetime, TRACKED_SOURCE, role_id=role.id, guild_id=interaction.guild.id
+                    )
+                    if rank:
+                        embed.add_field(
+                            name="───────── ౨ৎ ─────────",
+                            value=f"**{rank}위 -** {interaction.user.mention}\n{self.format_duration(seconds)}",
+                            inline=False
+                        )
 
                 await interaction.followup.send(embed=embed)
 
+            except CompactedPeriodError as e:
+                await self.reply_compacted(interaction, e)
             except Exception as e:
                 await self.log(f"순위 확인 중 오류 발생: {e}")
                 await interaction.response.send_message("역할 순위 조회 중 오류가 발생했습니다.", ephemeral=True)
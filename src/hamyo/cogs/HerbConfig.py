@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands
 from DataManager import DataManager
+from voice_leaderboard import VoiceLeaderboard
+from voice_utils import TrackedChannelRegistry
 
 GUILD_ID = [1396829213100605580, 1378632284068122685]
 
@@ -68,8 +70,13 @@ class HerbConfig(commands.Cog):
 
         channel_mentions = []
         
-        for channel_id in await self.data_manager.get_tracked_channels("aginari"):
-            channel = await self.bot.fetch_channel(channel_id)
+        for channel_id in await self.data_manager.get_tracked_channels("aginari", ctx.guild.id):
+            channel = self.bot.get_channel(channel_id)
+            if channel is None and not await TrackedChannelRegistry().is_missing(channel_id):
+                try:
+                    channel = await self.bot.fetch_channel(channel_id)
+                except Exception:
+                    channel = None
             if channel:
                 channel_mentions.append(channel.mention)
 
@@ -88,7 +95,8 @@ class HerbConfig(commands.Cog):
         added = []
         for ch in channels:
             if isinstance(ch, (discord.VoiceChannel, discord.CategoryChannel)):
-                await self.data_manager.register_tracked_channel(ch.id, "aginari")
+                await self.data_manager.register_tracked_channel(ch.id, "aginari", ctx.guild.id)
+                TrackedChannelRegistry().invalidate("aginari")
                 added.append(ch.mention)
                 await self.log(f"{ctx.author}({ctx.author.id})님에 의해 추적 채널/카테고리에 {ch.mention}({ch.id})를 등록 완료하였습니다.")
 
@@ -104,6 +112,7 @@ class HerbConfig(commands.Cog):
         for ch in channels:
             if isinstance(ch, (discord.VoiceChannel, discord.CategoryChannel)):
                 await self.data_manager.unregister_tracked_channel(ch.id, "aginari")
+                TrackedChannelRegistry().invalidate("aginari")
                 removed.append(ch.mention)
                 await self.log(f"{ctx.author}({ctx.author.id})님에 의해 {ch.mention}({ch.id})채널 추적을 중지하였습니다.")
 
@@ -116,6 +125,8 @@ class HerbConfig(commands.Cog):
     @has_admin_role()
     async def reset_all(self, ctx):
         await self.data_manager.reset_data()
+        VoiceLeaderboard().invalidate()
+        TrackedChannelRegistry().invalidate()
         await ctx.send("모든 사용자 기록 및 삭제 채널 정보가 초기화되었습니다.")
         await self.log(f"{ctx.author}({ctx.author.id})님에 의해 모든 사용자 기록 및 삭제 채널 정보가 초기화되었습니다.")
         
@@ -123,6 +134,7 @@ class HerbConfig(commands.Cog):
     @has_admin_role()
     async def reset_all_channel(self, ctx):
         await self.data_manager.reset_tracked_channels("aginari")
+        TrackedChannelRegistry().invalidate("aginari")
         await ctx.send("모든 채널 기록이 초기화되었습니다.")
         await self.log(f"{ctx.author}({ctx.author.id})님에 의해 모든 채널 기록이 초기화되었습니다.")
         
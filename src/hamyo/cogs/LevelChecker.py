@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from LevelDataManager import LevelDataManager
+from quest_rules import QuestRuleEngine
 from typing import Optional, Dict, Any, List
 import logging
 import asyncio
@@ -18,35 +19,8 @@ class LevelChecker(commands.Cog):
         self.QUEST_COMPLETION_CHANNEL_ID = 1400442713605668875
         self.DIARY_CHANNEL_ID = 1396829222978322609
         
-        # 퀘스트 경험치 설정
-        self.quest_exp = {
-            'daily': {
-                'attendance': 10,
-                'diary': 5,
-                'voice_30min': 15,
-                'bbibbi': 5,
-                'call': 3,
-                'friend': 3
-            },
-            'weekly': {
-                'recommend_3': 50,
-                'attendance_4': 20,
-                'attendance_7': 50,
-                'diary_4': 10,
-                'diary_7': 30,
-                'voice_5h': 50,
-                'voice_10h': 70,
-                'voice_20h': 100,
-                'shop_purchase': 30,
-                'board_participate': 25,
-                'ping_use': 25
-            },
-            'one_time': {
-                'self_intro': 50,
-                'review': 80,
-                'monthly_role': 100
-            }
-        }
+        # 퀘스트 규칙 (config/quest_rules.json), quest_exp는 {분류: {퀘스트: 다공}} 형태
+        self.quest_rules = QuestRuleEngine()
         
         # 역할 승급 기준
         self.role_thresholds = {
@@ -73,6 +47,10 @@ class LevelChecker(commands.Cog):
             'dakyung': '다경'
         }
     
+    @property
+    def quest_exp(self) -> Dict[str, Dict[str, int]]:
+        return self.quest_rules.quest_exp
+
     async def cog_load(self):
         """Cog 로드 시 데이터베이스 초기화"""
         await self.data_manager.ensure_initialized()
@@ -89,6 +67,21 @@ class LevelChecker(commands.Cog):
     # ===========================================
     # 공통 부분 처리
     # ===========================================
+
+    async def process_event(self, user_id: int, event: str, count: int = 1, label: str = None) -> Dict[str, Any]:
+        """이벤트를 퀘스트 규칙으로 평가해 지급하고 공통 후처리합니다."""
+        try:
+            result = await self.quest_rules.handle(user_id, event, count)
+        except Exception as e:
+            label = label or event
+            await self.log(f"{label} 퀘스트 처리 중 오류 발생: {e}")
+            result = {
+                'success': False,
+                'exp_gained': 0,
+                'messages': [f"{label} 퀘스트 처리 중 오류가 발생했습니다."],
+                'quest_completed': []
+            }
+        return await self._finalize_quest_result(user_id, result)
     
     async def _finalize_quest_result(self, user_id: int, result: Dict[str, Any]) -> Dict[str, Any]:
         """퀘스트 결과 공통 후처리 (메시지 출력, 역할 승급 확인)"""
@@ -395,53 +388,7 @@ class LevelChecker(commands.Cog):
     
     async def process_attendance(self, user_id: int) -> Dict[str, Any]:
         """출석 퀘스트 처리 (일간 + 주간 마일스톤)"""
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        
-        try:
-            # 일간 출석 퀘스트 처리
-            daily_exp = self.quest_exp['daily']['attendance']
-            await self.data_manager.add_exp(user_id, daily_exp, 'daily', 'attendance')
-            
-            result['success'] = True
-            result['exp_gained'] = daily_exp
-            result['quest_completed'].append('daily_attendance')
-            result['messages'].append(f"📅 출석 수행 완료! **+{daily_exp} 다공**")
-            
-            # 주간 출석 마일스톤 직접 확인
-            current_count = await self.data_manager.get_quest_count(user_id, 'daily', 'attendance', 'week')
-            
-            # 4회 달성 확인
-            if current_count == 4:
-                milestone_4_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'attendance_4', 'week')
-                if milestone_4_count == 0:
-                    bonus_exp_4 = self.quest_exp['weekly']['attendance_4']
-                    await self.data_manager.add_exp(user_id, bonus_exp_4, 'weekly', 'attendance_4')
-                    result['exp_gained'] += bonus_exp_4
-                    result['quest_completed'].append('weekly_attendance_4')
-                    result['messages'].append(f"🏆 주간 출석 4회 달성! **+{bonus_exp_4} 다공**")
-            
-            # 7회 달성 확인
-            elif current_count == 7:
-                # 7회 보상 지급
-                milestone_7_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'attendance_7', 'week')
-                if milestone_7_count == 0:
-                    bonus_exp_7 = self.quest_exp['weekly']['attendance_7']
-                    await self.data_manager.add_exp(user_id, bonus_exp_7, 'weekly', 'attendance_7')
-                    result['exp_gained'] += bonus_exp_7
-                    result['quest_completed'].append('weekly_attendance_7')
-                    result['messages'].append(f"🏆 주간 출석 7회 달성! **+{bonus_exp_7} 다공**")
-            
-        except Exception as e:
-            await self.log(f"출석 퀘스트 처리 중 오류 발생: {e}")
-            result['messages'].append("출석 수행 처리 중 오류가 발생했습니다.")
-        
-        # 공통 후처리
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, 'attendance', label="출석")
     
     # ===========================================
     # 다방일지 퀘스트 처리
@@ -489,18 +436,7 @@ class LevelChecker(commands.Cog):
                 user_id = message.author.id
 
                 try:
-                    # get_quest_count로 오늘 작성했는지 확인 (0 또는 1 반환)
-                    today_count = await self.data_manager.get_quest_count(
-                        user_id, 
-                        quest_type='daily', 
-                        quest_subtype='diary',
-                        timeframe='day'
-                    )
-
-                    if today_count > 0:
-                        return  # 오늘 이미 작성함
-                    
-                    # 다방일지 퀘스트 처리
+                    # 다방일지 퀘스트 처리 (오늘 이미 작성했으면 규칙의 일간 상한으로 지급되지 않음)
                     result = await self.process_diary(user_id)
                     
                     # 성공 시 반응 추가
@@ -525,278 +461,51 @@ class LevelChecker(commands.Cog):
 
     async def process_call(self, user_id: int) -> Dict[str, Any]:
         """전화하자 일일 퀘스트 처리"""
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        try:
-            # get_quest_count로 오늘 이미 지급했는지 확인
-            today_count = await self.data_manager.get_quest_count(
-                user_id,
-                quest_type='daily',
-                quest_subtype='call',
-                timeframe='day'
-            )
-            if today_count > 0:
-                return result  # 이미 지급됨
-
-            exp = self.quest_exp['daily']['call']
-            await self.data_manager.add_exp(user_id, exp, 'daily', 'call')
-            result['success'] = True
-            result['exp_gained'] = exp
-            result['quest_completed'].append('daily_call')
-            result['messages'].append(f"📢 전화하자 퀘스트 완료! **+{exp} 다공**")
-        except Exception as e:
-            await self.log(f"전화하자 퀘스트 처리 중 오류: {e}")
-            result['messages'].append("전화하자 퀘스트 처리 중 오류가 발생했습니다.")
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, 'call', label="전화하자")
 
     async def process_friend(self, user_id: int) -> Dict[str, Any]:
         """친구하자 일일 퀘스트 처리"""
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        try:
-            # get_quest_count로 오늘 이미 지급했는지 확인
-            today_count = await self.data_manager.get_quest_count(
-                user_id,
-                quest_type='daily',
-                quest_subtype='friend',
-                timeframe='day'
-            )
-            if today_count > 0:
-                return result  # 이미 지급됨
-
-            exp = self.quest_exp['daily']['friend']
-            await self.data_manager.add_exp(user_id, exp, 'daily', 'friend')
-            result['success'] = True
-            result['exp_gained'] = exp
-            result['quest_completed'].append('daily_friend')
-            result['messages'].append(f"📢 친구하자 퀘스트 완료! **+{exp} 다공**")
-        except Exception as e:
-            await self.log(f"친구하자 퀘스트 처리 중 오류: {e}")
-            result['messages'].append("친구하자 퀘스트 처리 중 오류가 발생했습니다.")
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, 'friend', label="친구하자")
 
     async def process_diary(self, user_id: int) -> Dict[str, Any]:
         """다방일지 퀘스트 처리 (일간 + 주간 마일스톤)"""
-        await self.data_manager.ensure_initialized()
-        
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        
-        try:
-            # 일간 다방일지 퀘스트 처리
-            daily_exp = self.quest_exp['daily']['diary']
-            await self.data_manager.add_exp(user_id, daily_exp, 'daily', 'diary')
-            
-            result['success'] = True
-            result['exp_gained'] = daily_exp
-            result['quest_completed'].append('daily_diary')
-            result['messages'].append(f"📝 일지 수행 완료! **+{daily_exp} 다공**")
-            
-            # 주간 다방일지 마일스톤 직접 확인
-            current_count = await self.data_manager.get_quest_count(user_id, 'daily', 'diary', 'week')
-            
-            # 4회 달성 확인
-            if current_count == 4:
-                milestone_4_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'diary_4', 'week')
-                if milestone_4_count == 0:
-                    bonus_exp_4 = self.quest_exp['weekly']['diary_4']
-                    await self.data_manager.add_exp(user_id, bonus_exp_4, 'weekly', 'diary_4')
-                    result['exp_gained'] += bonus_exp_4
-                    result['quest_completed'].append('weekly_diary_4')
-                    result['messages'].append(f"🏆 주간 일지 4회 달성! **+{bonus_exp_4} 다공**")
-            
-            # 7회 달성 확인
-            elif current_count == 7:
-                # 4회 보상이 없다면 먼저 지급
-                milestone_4_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'diary_4', 'week')
-                if milestone_4_count == 0:
-                    bonus_exp_4 = self.quest_exp['weekly']['diary_4']
-                    await self.data_manager.add_exp(user_id, bonus_exp_4, 'weekly', 'diary_4')
-                    result['exp_gained'] += bonus_exp_4
-                    result['quest_completed'].append('weekly_diary_4')
-                    result['messages'].append(f"🏆 주간 일지 4회 달성! **+{bonus_exp_4} 다공**")
-                
-                # 7회 보상 지급
-                milestone_7_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'diary_7', 'week')
-                if milestone_7_count == 0:
-                    bonus_exp_7 = self.quest_exp['weekly']['diary_7']
-                    await self.data_manager.add_exp(user_id, bonus_exp_7, 'weekly', 'diary_7')
-                    result['exp_gained'] += bonus_exp_7
-                    result['quest_completed'].append('weekly_diary_7')
-                    result['messages'].append(f"🏆 주간 일지 7회 달성! **+{bonus_exp_7} 다공**")
-            
-        except Exception as e:
-            await self.log(f"다방일지 처리 중 오류 발생: {e}")
-        
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, 'diary', label="다방일지")
     
     async def process_board(self, user_id: int) -> Dict[str, Any]:
         """
-        게시판 참여 시 호출: 주간 게시판 3회 달성 시 경험치 지급
+        게시판 참여 시 호출: 참여 기록 후 주간 게시판 3회 달성 시 경험치 지급
         on_message에서 특정 카테고리에 글 작성 시 호출됨.
         """
-        await self.data_manager.ensure_initialized()
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        try:
-            # 게시판 참여 기록 (quest_logs에 'weekly', 'board_participate'로 기록)
-            async with self.data_manager.db_connect() as db:
-                week_start = self.data_manager._get_week_start()
-                await db.execute("""
-                    INSERT INTO quest_logs (user_id, quest_type, quest_subtype, exp_gained, week_start)
-                    VALUES (?, 'weekly', 'board_participate', 0, ?)
-                """, (user_id, week_start))
-                await db.commit()
-
-            # 이번 주 게시판 참여 횟수 확인
-            board_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'board_participate', 'week')
-
-            # 이미 보상 지급 여부 확인
-            already_rewarded = await self.data_manager.get_quest_count(user_id, 'weekly', 'board_participate_3', 'week') > 0
-
-            if board_count >= 3 and not already_rewarded:
-                exp = self.quest_exp['weekly']['board_participate']
-                await self.data_manager.add_exp(user_id, exp, 'weekly', 'board_participate_3')
-                result['success'] = True
-                result['exp_gained'] = exp
-                result['quest_completed'].append('weekly_board_participate_3')
-                result['messages'].append(f"📝 주간 게시판 3회 작성 달성! **+{exp} 다공**")
-                # 공통 후처리(메시지, 승급 등)
-                return await self._finalize_quest_result(user_id, result)
-        except Exception as e:
-            await self.log(f"게시판 퀘스트 처리 중 오류: {e}")
-            result['messages'].append("게시판 퀘스트 처리 중 오류가 발생했습니다.")
-        return result
+        return await self.process_event(user_id, 'board', label="게시판")
 
     async def process_voice_30min(self, user_id: int) -> dict:
         """
         음성방 30분 일일 퀘스트 처리 (중복 지급 방지)
         """
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        try:
-            # 오늘 이미 지급했는지 확인
-            async with self.data_manager.db_connect() as db:
-                today_kst = datetime.now(KST).strftime("%Y-%m-%d")
-                cursor = await db.execute("""
-                    SELECT COUNT(*) FROM quest_logs
-                    WHERE user_id = ? AND quest_type = 'daily' AND quest_subtype = 'voice_30min'
-                      AND DATE(completed_at, '+9 hours') = ?
-                """, (user_id, today_kst))
-                today_count = (await cursor.fetchone())[0]
-            if today_count > 0:
-                return result  # 이미 지급됨
-
-            exp = self.quest_exp['daily']['voice_30min']
-            await self.data_manager.add_exp(user_id, exp, 'daily', 'voice_30min')
-            result['success'] = True
-            result['exp_gained'] = exp
-            result['quest_completed'].append('daily_voice_30min')
-            result['messages'].append(f"🔊 음성방 30분 수행 완료! **+{exp} 다공**")
-        except Exception as e:
-            await self.log(f"음성 30분 퀘스트 처리 중 오류: {e}")
-            result['messages'].append("음성 30분 퀘스트 처리 중 오류가 발생했습니다.")
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, 'voice_30min', label="음성 30분")
         
     async def process_voice_weekly(self, user_id: int, hour: int) -> dict:
         """
         음성방 주간 5/10/20시간 퀘스트 처리 (중복 지급 방지)
         hour: 5, 10, 20 중 하나
         """
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
-        quest_map = {5: 'voice_5h', 10: 'voice_10h', 20: 'voice_20h'}
-        if hour not in quest_map:
-            return result
-        quest_subtype = quest_map[hour]
-        try:
-            # 이번 주 이미 지급했는지 확인
-            week_start = self.data_manager._get_week_start()
-            async with self.data_manager.db_connect() as db:
-                cursor = await db.execute("""
-                    SELECT COUNT(*) FROM quest_logs
-                    WHERE user_id = ? AND quest_type = 'weekly' AND quest_subtype = ? AND week_start = ?
-                """, (user_id, quest_subtype, week_start))
-                week_count = (await cursor.fetchone())[0]
-            if week_count > 0:
-                return result  # 이미 지급됨
-
-            exp = self.quest_exp['weekly'][quest_subtype]
-            await self.data_manager.add_exp(user_id, exp, 'weekly', quest_subtype)
-            result['success'] = True
-            result['exp_gained'] = exp
-            result['quest_completed'].append(f'weekly_{quest_subtype}')
-            result['messages'].append(f"🏆 음성방 {hour}시간(주간) 수행 완료! **+{exp} 다공**")
-        except Exception as e:
-            await self.log(f"음성 {hour}시간 퀘스트 처리 중 오류: {e}")
-            result['messages'].append(f"음성 {hour}시간 퀘스트 처리 중 오류가 발생했습니다.")
-        return await self._finalize_quest_result(user_id, result)
+        return await self.process_event(user_id, f'voice_{hour}h', label=f"음성 {hour}시간")
     
     async def process_recommend_quest(self, user_id: int, count: int = 1) -> Dict[str, Any]:
         """
         추천 인증 시 호출: 주간 추천 3회 달성 시 경험치 지급
         Economy.py에서 '추천' 인증마다 호출됨.
         """
-        await self.data_manager.ensure_initialized()
-        result = {
-            'success': False,
-            'exp_gained': 0,
-            'messages': [],
-            'quest_completed': []
-        }
         try:
-            # 추천 인증 기록 (quest_logs에 'weekly', 'recommend'로 count만큼 기록)
-            async with self.data_manager.db_connect() as db:
-                week_start = self.data_manager._get_week_start()
-                for _ in range(count):
-                    await db.execute("""
-                        INSERT INTO quest_logs (user_id, quest_type, quest_subtype, exp_gained, week_start)
-                        VALUES (?, 'weekly', 'recommend', 0, ?)
-                    """, (user_id, week_start))
-                await db.commit()
-
-            # 이번 주 추천 인증 횟수 확인
-            recommend_count = await self.data_manager.get_quest_count(user_id, 'weekly', 'recommend', 'week')
-
-            # 이미 보상 지급 여부 확인
-            already_rewarded = await self.data_manager.get_quest_count(user_id, 'weekly', 'recommend_3', 'week') > 0
-
-            if recommend_count >= 3 and not already_rewarded:
-                exp = self.quest_exp['weekly']['recommend_3']
-                await self.data_manager.add_exp(user_id, exp, 'weekly', 'recommend_3')
-                result['success'] = True
-                result['exp_gained'] = exp
-                result['quest_completed'].append('weekly_recommend_3')
-                result['messages'].append(f"🌱 주간 추천 3회 달성! **+{exp} 다공**")
-                # 공통 후처리(메시지, 승급 등)
-                return await self._finalize_quest_result(user_id, result)
+            result = await self.quest_rules.handle(user_id, 'recommend', count)
         except Exception as e:
             await self.log(f"추천 퀘스트 처리 중 오류: {e}")
-            result['messages'].append("추천 퀘스트 처리 중 오류가 발생했습니다.")
+            result = {
+                'success': False,
+                'exp_gained': 0,
+                'messages': ["추천 퀘스트 처리 중 오류가 발생했습니다."],
+                'quest_completed': []
+            }
         
         # Always trigger event for Snowflake (regardless of weekly reward)
         for _ in range(count):
@@ -860,36 +569,11 @@ class LevelChecker(commands.Cog):
             # ...일일 퀘스트 처리...
             pass
         elif quest_type in self.quest_exp.get('weekly', {}):
-            # board_participate, shop_purchase만 처리
-            if quest_type in ['board_participate', 'shop_purchase']:
-                # 이미 이번 주에 완료했는지 확인
-                week_count = await self.data_manager.get_quest_count(
-                    user_id, 'weekly', quest_type, 'week'
-                )
-                result = {
-                    'success': False,
-                    'exp_gained': 0,
-                    'messages': [],
-                    'quest_completed': []
-                }
-                if week_count > 0:
-                    result['messages'].append("이미 이번 주에 완료한 퀘스트입니다.")
-                    return result
-                exp = self.quest_exp['weekly'][quest_type]
-                await self.data_manager.add_exp(user_id, exp, 'weekly', quest_type)
-                result['success'] = True
-                result['exp_gained'] = exp
-                result['quest_completed'].append(quest_type)
-                result['messages'].append(f"✨ {quest_type} 주간 퀘스트 완료! **+{exp} 다공**")
-                return await self._finalize_quest_result(user_id, result)
-            else:
-                # 그 외 weekly는 강제 완료 불가
-                return {
-                    'success': False,
-                    'exp_gained': 0,
-                    'messages': ["이 주간 퀘스트는 강제 완료가 지원되지 않습니다."],
-                    'quest_completed': []
-                }
+            # 규칙에서 force가 허용된 퀘스트(board_participate, shop_purchase)만 이번 주에 한 번 강제 완료
+            result = await self.quest_rules.force(user_id, quest_type)
+            if not result['success']:
+                return result
+            return await self._finalize_quest_result(user_id, result)
         elif quest_type in self.quest_exp.get('one_time', {}):
             # 일회성 퀘스트 처리
             already = await self.data_manager.is_one_time_quest_completed(user_id, quest_type)
@@ -3,12 +3,12 @@ from discord.ext import commands
 from LevelDataManager import LevelDataManager
 from DataManager import DataManager
 from typing import Optional, Dict, Any, List
+import asyncio
 import logging
 from datetime import datetime, timedelta
 import json, os
 import pytz
-from voice_utils import get_expanded_tracked_channels as expand_tracked 
-import time
+from voice_utils import TrackedChannelRegistry
 
 CONFIG_PATH = "config/level_config.json"
 KST = pytz.timezone("Asia/Seoul")
@@ -58,8 +58,7 @@ class LevelCommands(commands.Cog):
         self.data_manager = LevelDataManager()
         self.voice_data_manager = DataManager()
         self.logger = logging.getLogger(__name__)
-        self._tracked_voice_cache = None
-        self._tracked_voice_cache_at = 0  # epoch seconds
+        self.tracked_channels = TrackedChannelRegistry()
 
         # 역할 정보
         self.role_info = {
@@ -85,15 +84,6 @@ class LevelCommands(commands.Cog):
         except Exception as e:
             print(f"❌ {self.__class__.__name__} 로그 전송 중 오류 발생: {e}")
             
-    async def _get_tracked_voice_ids_cached(self, ttl: int = 600) -> set[int]:
-        now_ts = time.time()
-        if self._tracked_voice_cache and (now_ts - self._tracked_voice_cache_at) < ttl:
-            return self._tracked_voice_cache
-        ids = set(await expand_tracked(self.bot, self.voice_data_manager, "voice"))
-        self._tracked_voice_cache = ids
-        self._tracked_voice_cache_at = now_ts
-        return ids
-    
     @commands.command(name='내정보', aliases=['myinfo', '정보'])
     @in_myinfo_allowed_channel()
     async def my_info(self, ctx, member: discord.Member = None):
@@ -109,10 +99,22 @@ class LevelCommands(commands.Cog):
             if data_manager is None or level_checker is None:
                 return await ctx.reply("설정이 아직 준비되지 않았어요. 잠시 후 다시 시도해 주세요.")
 
-            # 1) 기본 유저 데이터 (총 다공/현재 경지)
-            user_data = await data_manager.get_user_exp(user_id) if hasattr(data_manager, "get_user_exp") else None
-            total_exp = int(user_data.get("total_exp", 0)) if user_data else 0
-            current_role_key = user_data.get("current_role", "hub") if user_data else "hub"
+            # 추적 채널 목록 확보 (공용 레지스트리, 음성 조회의 'voice' 필터에 반영)
+            tracked_channel_ids = await self.tracked_channels.get(self.bot, "voice")
+            if not tracked_channel_ids:
+                return
+
+            # 1) 다공/경지/인증 랭크/퀘스트 횟수/주간 순위는 SQL 한 번, 음성 일간/주간 합계는 동시에 조회
+            now = datetime.now(KST)
+            dashboard, voice_day, voice_week = await asyncio.gather(
+                data_manager.get_user_dashboard(user_id),
+                self.voice_data_manager.get_users_period_totals([user_id], '일간', now, "voice"),
+                self.voice_data_manager.get_users_period_totals([user_id], '주간', now, "voice"),
+            )
+            if dashboard is None:
+                raise RuntimeError("내정보 데이터 조회 실패")
+            total_exp = int(dashboard["total_exp"])
+            current_role_key = dashboard["current_role"]
 
             # 2) 역할(경지) 임계값/진행률 계산 (LevelChecker.role_thresholds 기반)
             role_thresholds = getattr(level_checker, "role_thresholds", {"hub": 0, "dado": 400, "daho": 1800, "dakyung": 6000, "dahyang": 12000})
@@ -140,62 +142,33 @@ class LevelCommands(commands.Cog):
                 need_to_next = max(0, next_floor - total_exp)
 
             # 3) 인증 랭크(보이스/채팅) — 저장소에 없으면 0 처리
-            voice_lv = 0
-            chat_lv = 0
-            if hasattr(data_manager, "get_all_certified_ranks"):
-                try:
-                    cert = await data_manager.get_all_certified_ranks(user_id)
-                    voice_lv = int(cert.get("voice", 0))
-                    chat_lv = int(cert.get("chat", 0))
-                except Exception:
-                    pass
+            voice_lv = int(dashboard["certified"].get("voice", 0))
+            chat_lv = int(dashboard["certified"].get("chat", 0))
             
             next_voice_lv = ((voice_lv // 5) + 1) * 5 if voice_lv % 5 != 0 else voice_lv + 5
             next_chat_lv = ((chat_lv // 5) + 1) * 5 if chat_lv % 5 != 0 else chat_lv + 5
 
-            # 4) 일일/주간 집계 값 가져오기
+            # 4) 일일/주간 집계 값
             # 일일: 출석/일지/삐삐(카운트), 음성 분
-            def _safe_get_quest(user, qtype, subtype, scope):
-                if hasattr(data_manager, "get_quest_count"):
-                    return data_manager.get_quest_count(user, qtype, subtype, scope)
-                return None
-
-            att_daily = await _safe_get_quest(user_id, 'daily', 'attendance', 'day') or 0
-            diary_daily = await _safe_get_quest(user_id, 'daily', 'diary', 'day') or 0
-            call_daily = await _safe_get_quest(user_id, 'daily', 'call', 'day') or 0
-            friend_daily = await _safe_get_quest(user_id, 'daily', 'friend', 'day') or 0
-            
-            # 추적 채널 목록 확보 (캐시가 있으면 사용, 없으면 유틸 함수로 확장)
-            try:
-                tracked_channel_ids = set(await self._get_tracked_voice_ids_cached())
-            except AttributeError:
-                # 캐시 헬퍼가 없는 경우 폴백
-                from voice_utils import get_expanded_tracked_channels as expand_tracked
-                tracked_channel_ids = set(await expand_tracked(self.bot, self.data_manager, "voice"))
-                
-            if not tracked_channel_ids:
-                return
-
-            # 음성 데이터는 self.voice_data_manager.get_user_times로 가져옴
-            voice_sec_day = 0
-            voice_sec_week = 0
-            now = datetime.now(KST)
-            
-            if hasattr(self.voice_data_manager, "get_user_times"):
-                # 일간
-                day_result, _, _ = await self.voice_data_manager.get_user_times(
-                    user_id = user_id, 
-                    period='일간',
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids))
-                voice_sec_day = sum(day_result.values()) if day_result else 0
-                # 주간
-                week_result, _, _ = await self.voice_data_manager.get_user_times(
-                    user_id = user_id, 
-                    period='주간',
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids))
-                voice_sec_week = sum(week_result.values()) if week_result else 0
+            daily_counts = dashboard["daily"]
+            att_daily = daily_counts[('daily', 'attendance')]
+            diary_daily = daily_counts[('daily', 'diary')]
+            call_daily = daily_counts[('daily', 'call')]
+            friend_daily = daily_counts[('daily', 'friend')]
+
+            voice_sec_day = voice_day.get(user_id, 0)
+            voice_sec_week = voice_week.get(user_id, 0)
+
+            # 진행 중인 세션의 마지막 체크포인트 이후 시간도 포함
+            voice_tracker = self.bot.get_cog('VoiceTracker')
+            if voice_tracker:
+                for period in ('일간', '주간'):
+                    start_date, end_date = await self.voice_data_manager.get_period_range(period, now)
+                    live = voice_tracker.get_live_totals(start_date, end_date, tracked_channel_ids, [user_id]).get(user_id, 0)
+                    if period == '일간':
+                        voice_sec_day += live
+                    else:
+                        voice_sec_week += live
                 
             next_step = ""    
             if voice_sec_week < 18000:
@@ -213,19 +186,20 @@ class LevelCommands(commands.Cog):
             voice_rem_min_week = voice_min_week % 60
 
             # 주간: 출석/일지/추천/게시판/상점 카운트
-            att_week = await _safe_get_quest(user_id, 'daily', 'attendance', 'week') or 0
-            diary_week = await _safe_get_quest(user_id, 'daily', 'diary', 'week') or 0
-            recommend_week = await _safe_get_quest(user_id, 'weekly', 'recommend', 'week') or 0
-            board_week = await _safe_get_quest(user_id, 'weekly', 'board_participate', 'week') or 0
-            shop_week = await _safe_get_quest(user_id, 'weekly', 'shop_purchase', 'week') or 0
+            weekly_counts = dashboard["weekly"]
+            att_week = weekly_counts[('daily', 'attendance')]
+            diary_week = weekly_counts[('daily', 'diary')]
+            recommend_week = weekly_counts[('weekly', 'recommend')]
+            board_week = weekly_counts[('weekly', 'board_participate')]
+            shop_week = weekly_counts[('weekly', 'shop_purchase')]
 
             # 5) 아이콘 유틸
             def ox(done: bool) -> str:
                 return ":o:" if done else ":x:"
 
             # 7) 이번 주 총 획득 다공 및 순위
-            weekly_total = await self.data_manager.get_user_period_exp(user_id, 'weekly')
-            weekly_rank = await self.data_manager.get_user_period_rank(user_id, 'weekly')
+            weekly_total = dashboard["weekly_exp"]
+            weekly_rank = dashboard["weekly_rank"]
 
             # 8) 임베드 구성
             embed = discord.Embed(
@@ -349,14 +323,8 @@ class LevelCommands(commands.Cog):
         
         rank_emojis = ["🥇", "🥈", "🥉"] + ["🏅"] * 17
         
-        # 사용자의 순위 찾기
-        user_rank = None
-        user_exp = None
-        for i, (user_id, exp, role) in enumerate(rankings, 1):
-            if user_id == ctx.author.id:
-                user_rank = i
-                user_exp = exp
-                break
+        # 사용자의 순위와 바로 위 유저 (순위 캐시에서 조회)
+        context = await self.data_manager.get_user_rank_context(ctx.author.id, period_type)
         
         # 상위 10명 표시
         leaderboard_text = ""
@@ -379,11 +347,14 @@ class LevelCommands(commands.Cog):
         
         embed.description = leaderboard_text
         
-        # 사용자가 10위 밖이면 자신의 순위 표시
-        if user_rank and user_rank > 10:
+        # 사용자가 10위 밖이면 자신의 순위와 바로 위 순위와의 차이 표시
+        if context and context['score'] > 0 and context['rank'] > 10:
+            value = f"**{context['rank']}위** - {ctx.author.display_name} ({context['score']:,} 다공)"
+            if context['above']:
+                value += f"\n└ {context['above']['rank']}위까지 {context['gap']:,} 다공"
             embed.add_field(
                 name="📍 내 순위",
-                value=f"**{user_rank}위** - {ctx.author.display_name} ({user_exp:,} 다공)",
+                value=value,
                 inline=False
             )
         
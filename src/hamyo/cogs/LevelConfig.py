@@ -75,6 +75,11 @@ class LevelConfig(commands.Cog):
             value="`*exp reset <유저>` - 유저 초기화\n`*exp reset_all` - 전체 초기화",
             inline=False
         )
+        embed.add_field(
+            name="🧮 집계",
+            value="`*exp rebuild` - 퀘스트 기록으로 일간/주간/월간 다공 합계 재생성",
+            inline=False
+        )
         await ctx.send(embed=embed)
     
     @exp_group.command(name='give')
@@ -203,6 +208,30 @@ class LevelConfig(commands.Cog):
         
         await message.edit(embed=embed, view=None)
     
+    @exp_group.command(name='rebuild')
+    @commands.has_permissions(administrator=True)
+    async def rebuild_period_counters(self, ctx):
+        """기간별 다공 합계 재생성"""
+        try:
+            counts = await self.data_manager.rebuild_period_counters()
+        except Exception as e:
+            await self.log(f"기간별 다공 합계 재생성 중 오류 발생: {e}")
+            await ctx.send("❌ 기간별 다공 합계 재생성 중 오류가 발생했습니다.")
+            return
+
+        embed = discord.Embed(
+            title="✅ 기간별 다공 합계 재생성 완료",
+            description="퀘스트 기록(quest_logs)으로 일간/주간/월간 합계를 다시 만들었습니다.",
+            color=0x00ff00
+        )
+        embed.add_field(
+            name="생성된 합계",
+            value=f"• 일간: {counts['daily']:,}행\n• 주간: {counts['weekly']:,}행\n• 월간: {counts['monthly']:,}행",
+            inline=False
+        )
+        await ctx.send(embed=embed)
+        await self.log(f"{ctx.author}({ctx.author.id})님에 의해 기간별 다공 합계가 재생성되었습니다.")
+
     @exp_group.command(name='reset_all')
     @commands.has_permissions(administrator=True)
     async def reset_all_users(self, ctx):
@@ -278,7 +307,8 @@ class LevelConfig(commands.Cog):
         )
         embed.add_field(
             name="🔧 관리",
-            value="`*quest complete <유저> <퀘스트> [사유]` - 퀘스트 강제 완료\n`*quest reset <유저>` - 퀘스트 초기화",
+            value="`*quest complete <유저> <퀘스트> [사유]` - 퀘스트 강제 완료\n`*quest reset <유저>` - 퀘스트 초기화\n"
+                  "`*quest reload` - 퀘스트 규칙(config/quest_rules.json) 다시 읽기",
             inline=False
         )
         embed.add_field(
@@ -510,10 +540,7 @@ class LevelConfig(commands.Cog):
         await view.wait()
         if view.confirmed:
             try:
-                async with self.data_manager.db_connect() as db:
-                    await db.execute("DELETE FROM quest_logs WHERE user_id = ?", (member.id,))
-                    await db.execute("DELETE FROM one_time_quests WHERE user_id = ?", (member.id,))
-                    await db.commit()
+                await self.data_manager.reset_user_quests(member.id)
                 
                 embed = discord.Embed(
                     title="✅ 퀘스트 초기화 완료",
@@ -541,6 +568,31 @@ class LevelConfig(commands.Cog):
         
         await message.edit(embed=embed, view=None)
     
+    @quest_group.command(name='reload')
+    @commands.has_permissions(administrator=True)
+    async def reload_quest_rules(self, ctx):
+        """퀘스트 규칙 다시 읽기"""
+        level_checker = self.bot.get_cog('LevelChecker')
+        if not level_checker:
+            await ctx.send("❌ LevelChecker를 찾을 수 없습니다.")
+            return
+
+        try:
+            level_checker.quest_rules.reload()
+        except Exception as e:
+            await self.log(f"퀘스트 규칙 로드 중 오류 발생: {e}")
+            await ctx.send(f"❌ 퀘스트 규칙을 읽지 못했습니다. 기존 규칙을 유지합니다.\n```{e}```")
+            return
+
+        quest_exp = level_checker.quest_exp
+        embed = discord.Embed(
+            title="✅ 퀘스트 규칙 다시 읽기 완료",
+            description=f"일일 {len(quest_exp['daily'])}개, 주간 {len(quest_exp['weekly'])}개, "
+                        f"일회성 {len(quest_exp['one_time'])}개 퀘스트가 적용되었습니다.",
+            color=0x00ff00
+        )
+        await ctx.send(embed=embed)
+
     @quest_group.command(name='list')
     @commands.has_permissions(administrator=True)
     async def quest_list(self, ctx):
@@ -40,6 +40,14 @@ class Admin(commands.Cog):
             python = sys.executable
             script = os.path.abspath(sys.argv[0])
             
+            # exec 전에 진행 중인 음성 세션을 저널에 반영해 재시작 후 이어서 적립
+            voice_tracker = self.bot.get_cog('VoiceTracker')
+            if voice_tracker:
+                try:
+                    await voice_tracker.save_open_sessions()
+                except Exception as e:
+                    await self.log(f"재시작 전 음성 세션 반영 중 오류: {e}")
+            
             await self.bot.close()
             
             os.execl(python, python, script)
@@ -2,10 +2,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 from datetime import datetime, timedelta
-from DataManager import DataManager
+from DataManager import CompactedPeriodError, DataManager
+from voice_leaderboard import VoiceLeaderboard
+from voice_utils import TrackedChannelRegistry
 import pytz
 import re
-from typing import Callable, List, Optional, Tuple
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+TRACKED_SOURCE = "voice"  # tracked_channels / expanded_tracked_channels의 source
 
 
 class TimeSummaryView(discord.ui.View):
@@ -108,7 +112,7 @@ class TimeSummaryView(discord.ui.View):
             )
 
         embed.set_thumbnail(url=self.user.display_avatar)
-        embed.set_footer(text="반영까지 최대 1분이 소요될 수 있다묘 .ᐟ")
+        embed.set_footer(text="진행 중인 통화 시간까지 실시간으로 반영된다묘 .ᐟ")
         return embed
 
     def render_category_block(self, cat: dict) -> str:
@@ -145,36 +149,46 @@ class TimeSummaryView(discord.ui.View):
                 pass
 
 
+# (offset, limit, after) -> [(user_id, seconds)], after는 이전 페이지 마지막 행의 (seconds, user_id)
+PageLoader = Callable[[int, int, Optional[Tuple[int, int]]], Awaitable[List[Tuple[int, int]]]]
+
+
 class RankingView(discord.ui.View):
+    """현재 페이지만 보관하고 이동할 때마다 page_loader로 해당 페이지를 불러옵니다."""
+
     def __init__(
         self,
         *,
         owner_id: int,
-        ranked: List[Tuple[int, int]],
+        page_loader: PageLoader,
+        total_count: int,
+        user_rank_info: Optional[Tuple[int, int]],
         formatter: Callable[[int], str],
         name_resolver: Callable[[int], str],
         title: str,
         window_label: str,
         page: int,
-        footer_note: str,
+        footer_note: Optional[str] = None,
         emoji_prefix: str = "<:BM_k_003:1399387520135069770>､ ",
         colour: Optional[discord.Colour] = None,
     ):
         super().__init__(timeout=180)
         self.owner_id = owner_id
-        self.ranked = ranked
+        self.page_loader = page_loader
+        self.current: List[Tuple[int, int]] = []
+        self._page_ends: dict[int, Tuple[int, int]] = {}  # page -> 마지막 행 (seconds, user_id)
         self.format_duration = formatter
         self.name_resolver = name_resolver
         self.title = title
         self.window_label = window_label
         self.items_per_page = 10
         self.page = page
-        self.total_pages = max(1, (len(ranked) + self.items_per_page - 1) // self.items_per_page)
+        self.total_pages = max(1, (total_count + self.items_per_page - 1) // self.items_per_page)
         self.footer_note = footer_note
         self.emoji_prefix = emoji_prefix
         self.colour = colour or discord.Colour.from_rgb(253, 237, 134)
         self.message: Optional[discord.Message] = None
-        self.user_rank_info = next(((idx + 1, secs) for idx, (uid, secs) in enumerate(ranked) if uid == owner_id), None)
+        self.user_rank_info = user_rank_info  # (rank, seconds)
 
         self.prev_button = discord.ui.Button(style=discord.ButtonStyle.secondary, label="◀ 이전")
         self.next_button = discord.ui.Button(style=discord.ButtonStyle.secondary, label="다음 ▶")
@@ -189,12 +203,19 @@ class RankingView(discord.ui.View):
         self.prev_button.disabled = self.page <= 1
         self.next_button.disabled = self.page >= self.total_pages
 
+    async def load_page(self):
+        """현재 페이지를 불러옵니다. 바로 앞 페이지를 본 적이 있으면 OFFSET 대신 그 마지막 행 기준으로 조회"""
+        offset = (self.page - 1) * self.items_per_page
+        self.current = await self.page_loader(offset, self.items_per_page, self._page_ends.get(self.page - 1))
+        if self.current:
+            uid, seconds = self.current[-1]
+            self._page_ends[self.page] = (seconds, uid)
+
     def render_page(self) -> str:
         start_index = (self.page - 1) * self.items_per_page
-        current = self.ranked[start_index : start_index + self.items_per_page]
 
         rows = []
-        for idx, (uid, seconds) in enumerate(current, start=start_index + 1):
+        for idx, (uid, seconds) in enumerate(self.current, start=start_index + 1):
             name = self.name_resolver(uid)
             prefix = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉" if idx == 3 else f"{idx:>2}위"
             marker = " • 당신" if self.user_rank_info and self.user_rank_info[0] == idx else ""
@@ -234,6 +255,7 @@ class RankingView(discord.ui.View):
         if self.page > 1:
             self.page -= 1
             self.update_button_states()
+            await self.load_page()
         await interaction.response.edit_message(embed=self.render_page(), view=self)
 
     async def go_next(self, interaction: discord.Interaction):
@@ -244,6 +266,7 @@ class RankingView(discord.ui.View):
         if self.page < self.total_pages:
             self.page += 1
             self.update_button_states()
+            await self.load_page()
         await interaction.response.edit_message(embed=self.render_page(), view=self)
 
     async def on_timeout(self):
@@ -261,6 +284,8 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
     def __init__(self, bot):
         self.bot = bot
         self.data_manager = DataManager()
+        self.leaderboard = VoiceLeaderboard()
+        self.tracked_channels = TrackedChannelRegistry()
         self.tz = pytz.timezone('Asia/Seoul')
         
     async def cog_load(self):
@@ -274,6 +299,13 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
         except Exception as e:
             print(f"❌ {self.__class__.__name__} 로그 전송 중 오류 발생: {e}")
             
+    async def reply_compacted(self, interaction: discord.Interaction, error: CompactedPeriodError):
+        """압축된 기간을 일별/주간으로 조회했을 때 안내 (defer 여부에 맞춰 응답)"""
+        if interaction.response.is_done():
+            await interaction.followup.send(str(error), ephemeral=True)
+        else:
+            await interaction.response.send_message(str(error), ephemeral=True)
+
     def calculate_points(self, seconds: int) -> int:
         """음성 채널 사용 시간을 점수로 변환 (1분당 2점, 초 단위 내림)"""
         minutes = seconds // 60
@@ -286,55 +318,60 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
         return f"{days}일 {hours}시간 {minutes}분 {seconds}초 ({self.calculate_points(total_seconds)}점)"
     
     async def get_expanded_tracked_channels(self) -> List[int]:
-        tracked_ids = await self.data_manager.get_tracked_channels("voice")
-        expanded_ids = set()
+        return list(await self.tracked_channels.get(self.bot, TRACKED_SOURCE))
 
-        # 1. 카테고리ID와 음성채널ID 분리
-        category_ids = set()
-        voice_channel_ids = set()
-        deleted_category_ids = set()  # 삭제된 카테고리 ID 저장
-        
-        for cid in tracked_ids:
-            ch = self.bot.get_channel(cid)
-            if ch is None:
-                try:
-                    ch = await self.bot.fetch_channel(cid)
-                except Exception:
-                    ch = None
-            
-            if isinstance(ch, discord.CategoryChannel):
-                category_ids.add(cid)
-            elif isinstance(ch, (discord.VoiceChannel, discord.StageChannel)):
-                voice_channel_ids.add(cid)
-            else:
-                # 삭제되었거나 접근 불가 → 삭제된 카테고리로 간주
-                deleted_category_ids.add(cid)
+    def get_live_seconds(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        channel_ids: Iterable[int],
+        user_ids: Optional[Iterable[int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Dict[int, Dict[int, int]]:
+        """VoiceTracker가 들고 있는 진행 중 세션의 미적립 초 {user_id: {channel_id: seconds}}"""
+        tracker = self.bot.get_cog('VoiceTracker')
+        if tracker is None or not start_date or not end_date:
+            return {}
+        return tracker.get_live_seconds(start_date, end_date, channel_ids, user_ids, guild_id)
+
+    def get_live_totals(self, *args, **kwargs) -> Dict[int, int]:
+        return {uid: sum(channels.values()) for uid, channels in self.get_live_seconds(*args, **kwargs).items()}
+
+    async def get_ranking(
+        self,
+        period: str,
+        base_datetime: datetime,
+        tracked_channels: List[int],
+        user_id: int,
+        guild_id: Optional[int] = None,
+    ) -> Tuple[PageLoader, int, Optional[Tuple[int, int]], Optional[datetime], Optional[datetime]]:
+        """
+        (페이지 로더, 전체 인원, user_id의 (순위, 초), 시작일, 종료일)을 반환합니다.
+        현재 기간이면 메모리 순위에서, 아니면 SQL 집계에서 페이지 단위로 가져옵니다.
+        진행 중인 세션의 미적립 시간도 합계에 더하고, guild_id를 주면 해당 서버 기록만 집계합니다.
+        """
+        await self.leaderboard.ensure_ready(tracked_channels, guild_id)
+        start_date, end_date = await self.data_manager.get_period_range(period, base_datetime)
+        live = self.get_live_totals(start_date, end_date, tracked_channels, guild_id=guild_id)
+        if self.leaderboard.covers(period, base_datetime, guild_id):
+            rank, _, seconds = self.leaderboard.get_rank(user_id, period, live, guild_id)
+
+            async def load_page(offset: int, limit: int, after: Optional[Tuple[int, int]] = None):
+                return self.leaderboard.get_page(period, offset, limit, live, guild_id)
+
+            count = self.leaderboard.count(period, live, guild_id)
+            return load_page, count, (rank, seconds) if rank else None, start_date, end_date
+
+        rank, total_users, seconds, start_date, end_date = await self.data_manager.get_user_rank(
+            user_id, period, base_datetime, TRACKED_SOURCE, extra_seconds=live, guild_id=guild_id
+        )
 
-        # 2. 카테고리ID로 등록된 경우, 해당 카테고리의 모든 하위 음성채널 포함
-        for cat_id in category_ids:
-            cat = self.bot.get_channel(cat_id)
-            if cat is None:
-                try:
-                    cat = await self.bot.fetch_channel(cat_id)
-                except Exception:
-                    continue
-            if isinstance(cat, discord.CategoryChannel):
-                for vc in cat.voice_channels:
-                    expanded_ids.add(vc.id)
-                # Stage 채널도 포함
-                for sc in getattr(cat, "stage_channels", []):
-                    expanded_ids.add(sc.id)
-
-        # 3. 음성채널ID로 등록된 경우, 해당 음성채널만 포함
-        expanded_ids.update(voice_channel_ids)
-
-        # 4. 삭제된 채널 중, category_id가 등록된 카테고리ID에 포함된 것만 추가 (삭제된 카테고리 포함)
-        all_category_ids = category_ids | deleted_category_ids
-        if all_category_ids:
-            deleted_channel_ids = await self.data_manager.get_deleted_channels_by_categories(list(all_category_ids))
-            expanded_ids.update(deleted_channel_ids)
-
-        return list(expanded_ids)
+        async def load_page(offset: int, limit: int, after: Optional[Tuple[int, int]] = None):
+            return await self.data_manager.get_ranking_page(
+                period, base_datetime, TRACKED_SOURCE, offset, limit, after, extra_seconds=live, guild_id=guild_id
+            )
+
+        return load_page, total_users, (rank, seconds) if rank else None, start_date, end_date
 
     @app_commands.command(name="확인", description="개인 누적 시간을 확인합니다.")
     @app_commands.describe(
@@ -367,8 +404,15 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
             else:
                 base_datetime = datetime.now(self.tz)
 
+            guild_id = interaction.guild.id
             tracked_channels = await self.get_expanded_tracked_channels()
-            times, start_date, end_date = await self.data_manager.get_user_times(user.id, period, base_datetime, tracked_channels)
+            times, start_date, end_date = await self.data_manager.get_user_times(
+                user.id, period, base_datetime, TRACKED_SOURCE, guild_id=guild_id
+            )
+            # 마지막 체크포인트 이후 진행 중인 시간까지 포함
+            live = self.get_live_seconds(start_date, end_date, tracked_channels, guild_id=guild_id)
+            for channel_id, seconds in live.get(user.id, {}).items():
+                times[channel_id] = times.get(channel_id, 0) + seconds
 
             if not times:
                 await interaction.response.send_message(f"해당 기간에 기록된 음성 채팅 기록이 없습니다.", ephemeral=True)
@@ -435,13 +479,20 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
 
             sorted_categories = sorted(category_details.items(), key=lambda x: (x[1]["position"], x[1]["name"]))
 
-            # 순위 계산 (동일 기간/채널 기준)
-            rank, total_users, user_total, _, _ = await self.data_manager.get_user_rank(
-                user.id,
-                period,
-                base_datetime,
-                tracked_channels,
-            )
+            # 순위 계산 (동일 기간/채널 기준) - 현재 기간이면 메모리 순위 사용
+            await self.leaderboard.ensure_ready(tracked_channels, guild_id)
+            live_totals = {uid: sum(channels.values()) for uid, channels in live.items()}
+            if self.leaderboard.covers(period, base_datetime, guild_id):
+                rank, total_users, _ = self.leaderboard.get_rank(user.id, period, live_totals, guild_id)
+            else:
+                rank, total_users, user_total, _, _ = await self.data_manager.get_user_rank(
+                    user.id,
+                    period,
+                    base_datetime,
+                    TRACKED_SOURCE,
+                    extra_seconds=live_totals,
+                    guild_id=guild_id,
+                )
 
             view = TimeSummaryView(
                 owner_id=interaction.user.id,
@@ -458,6 +509,8 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
             view.message = message
             await self.log(f"{interaction.user}({interaction.user.id})님께서 {user}({user.id})님의 {period} 기록을 조회했습니다. [길드: {interaction.guild.name}({interaction.guild.id}), 채널: {interaction.channel.name if interaction.channel else 'DM'}({interaction.channel_id})]")
 
+        except CompactedPeriodError as e:
+            await self.reply_compacted(interaction, e)
         except Exception as e:
             await self.log(f"음성 채팅 기록 확인 중 오류 발생: {e} [길드: {interaction.guild.name if interaction.guild else 'N/A'}, 채널: {interaction.channel.name if interaction.channel else 'DM'}({interaction.channel_id})]")
             await interaction.response.send_message("기록 조회 중 오류가 발생했습니다.", ephemeral=True)
@@ -501,18 +554,17 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
 
             await interaction.response.defer() # 시간이 오래 걸릴 것을 대비해 defer 처리
 
-            # 총 시간 데이터 조회
+            # 총 시간 데이터 조회 (현재 일간/주간/월간은 메모리 순위, 그 외는 DB 집계)
             tracked_channels = await self.get_expanded_tracked_channels()
-            all_data, start_date, end_date = await self.data_manager.get_all_users_times(period, base_datetime, tracked_channels)
-
-            user_totals = [(uid, sum(times.values())) for uid, times in all_data.items()]
-            ranked = sorted(user_totals, key=lambda x: x[1], reverse=True)
+            page_loader, total_count, user_rank_info, start_date, end_date = await self.get_ranking(
+                period, base_datetime, tracked_channels, interaction.user.id, interaction.guild.id
+            )
 
-            if not ranked:
+            if not total_count:
                 return await interaction.followup.send("해당 기간에 해당하는 기록이 없습니다.", ephemeral=True)
 
             items_per_page = 10
-            total_pages = (len(ranked) + items_per_page - 1) // items_per_page
+            total_pages = (total_count + items_per_page - 1) // items_per_page
 
             if page > total_pages:
                 return await interaction.followup.send(f"요청한 페이지는 존재하지 않습니다. (1-{total_pages})", ephemeral=True)
@@ -521,7 +573,6 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
             end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d") if end_date else "-"
 
             window_label = f"{period} ({start_str} ~ {end_str})"
-            footer_note = "반영까지 최대 1분이 소요될 수 있습니다."
 
             def resolve_name(uid: int) -> str:
                 member = interaction.guild.get_member(uid)
@@ -529,19 +580,23 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
 
             view = RankingView(
                 owner_id=interaction.user.id,
-                ranked=ranked,
+                page_loader=page_loader,
+                total_count=total_count,
+                user_rank_info=user_rank_info,
                 formatter=self.format_duration,
                 name_resolver=resolve_name,
                 title="음성 채널 순위",
                 window_label=window_label,
                 page=page,
-                footer_note=footer_note,
                 emoji_prefix="<:BM_k_003:1399387520135069770>､ ",
             )
+            await view.load_page()
 
             message = await interaction.followup.send(embed=view.render_page(), view=view)
             view.message = message
 
+        except CompactedPeriodError as e:
+            await self.reply_compacted(interaction, e)
         except Exception as e:
             await self.log(f"순위 확인 중 오류 발생: {e} [길드: {interaction.guild.name if interaction.guild else 'N/A'}, 채널: {interaction.channel.name if interaction.channel else 'DM'}({interaction.channel_id})]")
             await interaction.response.send_message("순위 조회 중 오류가 발생했습니다.", ephemeral=True)
@@ -586,18 +641,22 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
             await interaction.response.defer()  # 시간이 오래 걸릴 것을 대비해 defer 처리
 
             # 총 시간 데이터 조회
-            tracked_channels = await self.get_expanded_tracked_channels()
-            all_data, start_date, end_date = await self.data_manager.get_all_users_times(period, base_datetime, tracked_channels)
-
-            role_member_ids = {member.id for member in role.members}
-            filtered = [(uid, sum(times.values())) for uid, times in all_data.items() if uid in role_member_ids]
-            ranked = sorted(filtered, key=lambda x: x[1], reverse=True)
+            tracked_channels = await self.get_expanded_tracked_channels()  # 최신 확장 결과를 expanded_tracked_channels에 반영
+            # 역할 멤버 스냅샷을 갱신하고 역할 멤버만 SQL에서 집계
+            member_ids = [member.id for member in role.members if not member.bot]
+            await self.data_manager.sync_role_members(role.id, member_ids)
+            guild_id = interaction.guild.id
+            start_date, end_date = await self.data_manager.get_period_range(period, base_datetime)
+            live = self.get_live_totals(start_date, end_date, tracked_channels, member_ids, guild_id)
+            total_count, start_date, end_date = await self.data_manager.count_ranked_users(
+                period, base_datetime, TRACKED_SOURCE, role_id=role.id, extra_seconds=live, guild_id=guild_id
+            )
 
-            if not ranked:
+            if not total_count:
                 return await interaction.followup.send(f"{role.name} 역할의 기록이 없습니다.", ephemeral=True)
 
             items_per_page = 10
-            total_pages = (len(ranked) + items_per_page - 1) // items_per_page
+            total_pages = (total_count + items_per_page - 1) // items_per_page
 
             if page > total_pages:
                 return await interaction.followup.send(f"요청한 페이지는 존재하지 않습니다. (1-{total_pages})", ephemeral=True)
@@ -605,32 +664,128 @@ class VoiceCommands(commands.GroupCog, group_name="보이스"):
             start_str = start_date.strftime("%Y-%m-%d") if start_date else "-"
             end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d") if end_date else "-"
             window_label = f"{role.name} • {period} ({start_str} ~ {end_str})"
-            footer_note = "반영까지 최대 1분이 소요될 수 있습니다."
 
             def resolve_name(uid: int) -> str:
                 member = interaction.guild.get_member(uid)
                 return member.display_name if member else f"알 수 없음 ({uid})"
 
+            rank, _, seconds, _, _ = await self.data_manager.get_user_rank(
+                interaction.user.id, period, base_datetime, TRACKED_SOURCE,
+                role_id=role.id, extra_seconds=live, guild_id=guild_id
+            )
+
+            async def load_page(offset: int, limit: int, after: Optional[Tuple[int, int]] = None):
+                return await self.data_manager.get_ranking_page(
+                    period, base_datetime, TRACKED_SOURCE, offset, limit, after,
+                    role_id=role.id, extra_seconds=live, guild_id=guild_id
+                )
+
             view = RankingView(
                 owner_id=interaction.user.id,
-                ranked=ranked,
+                page_loader=load_page,
+                total_count=total_count,
+                user_rank_info=(rank, seconds) if rank else None,
                 formatter=self.format_duration,
                 name_resolver=resolve_name,
                 title=f"{role.name} 역할 음성 사용 시간 순위",
                 window_label=window_label,
                 page=page,
-                footer_note=footer_note,
                 colour=role.colour,
                 emoji_prefix="<:BM_k_003:1399387520135069770>､ ",
             )
+            await view.load_page()
 
             message = await interaction.followup.send(embed=view.render_page(), view=view)
             view.message = message
 
+        except CompactedPeriodError as e:
+            await self.reply_compacted(interaction, e)
         except Exception as e:
             await self.log(f"역할 순위 확인 중 오류 발생: {e} [길드: {interaction.guild.name if interaction.guild else 'N/A'}, 채널: {interaction.channel.name if interaction.channel else 'DM'}({interaction.channel_id})]")
             await interaction.response.send_message("역할 순위 조회 중 오류가 발생했습니다.", ephemeral=True)
 
+    @app_commands.command(name="시간대", description="요일/시간대별 서버 음성 활동량을 확인합니다.")
+    @app_commands.describe(
+        period="확인할 기간을 선택합니다. (주간/월간/누적, 기본값: 월간)",
+        base_date="기준일을 지정합니다. (YYYY-MM-DD 형식, 미입력시 현재 날짜)"
+    )
+    @app_commands.choices(period=[
+        app_commands.Choice(name="주간", value="주간"),
+        app_commands.Choice(name="월간", value="월간"),
+        app_commands.Choice(name="누적", value="누적")
+    ])
+    async def check_heatmap(self, interaction: discord.Interaction,
+                            period: str = "월간",
+                            base_date: str = None):
+        try:
+            if base_date:
+                try:
+                    base_datetime = datetime.strptime(base_date, "%Y-%m-%d")
+                    base_datetime = base_datetime.replace(tzinfo=self.tz)
+                except ValueError:
+                    await interaction.response.send_message("날짜 형식이 올바르지 않습니다. YYYY-MM-DD 형식으로 입력해주세요.", ephemeral=True)
+                    return
+            else:
+                base_datetime = datetime.now(self.tz)
+
+            await interaction.response.defer()
+
+            start_date, end_date = await self.data_manager.get_period_range(period, base_datetime)
+            if not start_date or not end_date:
+                return await interaction.followup.send("해당 기간에 해당하는 기록이 없습니다.", ephemeral=True)
+            heatmap = await self.data_manager.get_voice_heatmap(interaction.guild.id, start_date, end_date)
+            if not any(any(row) for row in heatmap):
+                return await interaction.followup.send("해당 기간에 해당하는 기록이 없습니다.", ephemeral=True)
+
+            # 요일마다 기간 안에 든 날 수가 다르므로 하루 평균 동시 접속자 수로 비교
+            day_counts = [0] * 7
+            day = start_date.date()
+            while day < end_date.date():
+                day_counts[day.weekday()] += 1
+                day += timedelta(days=1)
+            averages = [
+                [seconds / 3600 / day_counts[weekday] if day_counts[weekday] else 0 for seconds in row]
+                for weekday, row in enumerate(heatmap)
+            ]
+            peak = max(max(row) for row in averages)
+            shades = " ░▒▓█"
+            weekday_names = "월화수목금토일"
+            lines = ["    0     6     12    18    "]
+            for weekday, row in enumerate(averages):
+                cells = "".join(shades[min(max(int(value / peak * len(shades)), 1), len(shades) - 1)] if value else shades[0] for value in row)
+                lines.append(f"{weekday_names[weekday]}  {cells}")
+
+            peak_weekday, peak_hour = max(
+                ((weekday, hour) for weekday in range(7) for hour in range(24)),
+                key=lambda key: averages[key[0]][key[1]]
+            )
+            busiest_hours = sorted(
+                range(24), key=lambda hour: sum(averages[weekday][hour] for weekday in range(7)), reverse=True
+            )[:3]
+
+            end_str = (end_date - timedelta(days=1)).strftime("%Y-%m-%d")
+            embed = discord.Embed(
+                title="시간대별 음성 활동",
+                description=f"{period} ({start_date.strftime('%Y-%m-%d')} ~ {end_str})\n```\n" + "\n".join(lines) + "\n```",
+                colour=discord.Colour.from_rgb(253, 237, 134)
+            )
+            embed.add_field(
+                name="가장 붐비는 시간",
+                value=f"{weekday_names[peak_weekday]}요일 {peak_hour}시 (평균 {averages[peak_weekday][peak_hour]:.1f}명)",
+                inline=False
+            )
+            embed.add_field(
+                name="붐비는 시간대 (전체 요일)",
+                value=", ".join(f"{hour}시" for hour in busiest_hours),
+                inline=False
+            )
+            embed.set_footer(text="칸 색이 진할수록 평균 동시 접속자가 많습니다. (KST 기준)")
+            await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            await self.log(f"시간대 활동 확인 중 오류 발생: {e} [길드: {interaction.guild.name if interaction.guild else 'N/A'}, 채널: {interaction.channel.name if interaction.channel else 'DM'}({interaction.channel_id})]")
+            await interaction.followup.send("시간대 활동 조회 중 오류가 발생했습니다.", ephemeral=True)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(VoiceCommands(bot))
@@ -1,8 +1,15 @@
+import os
+import time
 import discord
-from discord.ext import commands
-from DataManager import DataManager
+from discord.ext import commands, tasks
+from datetime import datetime, time as dt_time
+from DataManager import DataManager, DAILY_RETENTION_DAYS, KST, KST_FIXED
+from voice_leaderboard import VoiceLeaderboard
+from voice_utils import TrackedChannelRegistry
 
 GUILD_ID = [1396829213100605580, 1305132293899423785]
+COMPACTION_HOUR = 5  # 일별 기록 압축을 실행하는 시각 (KST, 이용자가 적은 시간)
+EXPORT_DIR = "data/exports"  # 서버 음성 기록 내보내기 파일 위치
 
 def only_in_guild():
     async def predicate(ctx):
@@ -15,6 +22,10 @@ class VoiceConfig(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.data_manager = DataManager()
+        self.compact_voice_data.start()
+
+    def cog_unload(self):
+        self.compact_voice_data.cancel()
 
     async def cog_load(self):
         print(f"✅ {self.__class__.__name__} loaded successfully!")
@@ -60,6 +71,26 @@ class VoiceConfig(commands.Cog):
             value="현재 등록되어 있는 모든 채널/카테고리를 제거합니다.", 
             inline=False
         ),
+        embed.add_field(
+            name=f"*{command_name} 기록압축 (보존일수)", 
+            value=f"보존일수(기본 {DAILY_RETENTION_DAYS}일)보다 오래된 일별 기록을 월별 합계만 남기고 정리합니다. (매일 {COMPACTION_HOUR}시 자동 실행)", 
+            inline=False
+        ),
+        embed.add_field(
+            name=f"*{command_name} 파일정리전환", 
+            value="압축 후 빈 공간을 파일에서 조금씩 돌려주도록 DB를 한 번 전환합니다. **주의! 파일 전체를 다시 쓰는 동안 음성 기록 반영이 멈추므로 이용자가 적은 시간에 실행하세요.**", 
+            inline=False
+        ),
+        embed.add_field(
+            name=f"*{command_name} 서버내보내기", 
+            value="이 서버의 음성 기록을 JSON 파일(데이터통합 형식)로 내보냅니다.", 
+            inline=False
+        ),
+        embed.add_field(
+            name=f"*{command_name} 서버기록삭제", 
+            value="이 서버의 음성 기록과 채널 설정만 삭제합니다. 다른 서버 기록은 유지됩니다.", 
+            inline=False
+        ),
         embed.add_field(
             name=f"*{command_name} 완전초기화", 
             value="유저 음성 기록을 전부 삭제합니다. **주의! 보이스 기록을 열람하는 다른 명령어가 있는 경우, 그 명령어에서도 모든 기록이 삭제됩니다.**", 
@@ -68,9 +99,9 @@ class VoiceConfig(commands.Cog):
 
         channel_mentions = []
         
-        for channel_id in await self.data_manager.get_tracked_channels("voice"):
+        for channel_id in await self.data_manager.get_tracked_channels("voice", ctx.guild.id):
             channel = self.bot.get_channel(channel_id)
-            if channel is None:
+            if channel is None and not await TrackedChannelRegistry().is_missing(channel_id):
                 try:
                     channel = await self.bot.fetch_channel(channel_id)
                 except Exception:
@@ -98,7 +129,8 @@ class VoiceConfig(commands.Cog):
         added = []
         for ch in channels:
             if isinstance(ch, (discord.VoiceChannel, discord.CategoryChannel)):
-                await self.data_manager.register_tracked_channel(ch.id, "voice")
+                await self.data_manager.register_tracked_channel(ch.id, "voice", ctx.guild.id)
+                TrackedChannelRegistry().invalidate("voice")
                 added.append(ch.mention)
                 await self.log(f"{ctx.author}({ctx.author.id})님에 의해 추적 채널/카테고리에 {ch.mention}({ch.id})를 등록 완료하였습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
 
@@ -115,6 +147,7 @@ class VoiceConfig(commands.Cog):
         for ch in channels:
             if isinstance(ch, (discord.VoiceChannel, discord.CategoryChannel)):
                 await self.data_manager.unregister_tracked_channel(ch.id, "voice")
+                TrackedChannelRegistry().invalidate("voice")
                 removed.append(ch.mention)
                 await self.log(f"{ctx.author}({ctx.author.id})님에 의해 {ch.mention}({ch.id})채널 추적을 중지하였습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
 
@@ -135,6 +168,7 @@ class VoiceConfig(commands.Cog):
         for cid in channel_ids:
             if cid in tracked_channels:
                 await self.data_manager.unregister_tracked_channel(cid, "voice")
+                TrackedChannelRegistry().invalidate("voice")
                 removed.append(str(cid))
                 await self.log(f"{ctx.author}({ctx.author.id})님에 의해 ID {cid} 채널/카테고리 추적을 중지하였습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
             else:
@@ -156,25 +190,131 @@ class VoiceConfig(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def reset_all(self, ctx):
         await self.data_manager.reset_data()
+        VoiceLeaderboard().invalidate()
+        TrackedChannelRegistry().invalidate()
         await ctx.send("모든 사용자 기록 및 삭제 채널 정보가 초기화되었습니다.")
         await self.log(f"{ctx.author}({ctx.author.id})님에 의해 모든 사용자 기록 및 삭제 채널 정보가 초기화되었습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
         
+    async def unassigned_note(self) -> str:
+        """서버를 알 수 없어 서버 단위 작업에서 빠진 음성 기록이 있으면 안내 문구를 반환합니다."""
+        unassigned = sum((await self.data_manager.get_unassigned_counts()).values())
+        return f"\n(서버를 알 수 없는 음성 기록 {unassigned:,}행은 포함되지 않았습니다.)" if unassigned else ""
+
+    @voice.command(name="서버내보내기")
+    @only_in_guild()
+    @commands.has_permissions(administrator=True)
+    async def export_guild_records(self, ctx):
+        path = os.path.join(EXPORT_DIR, f"voice_{ctx.guild.id}_{datetime.now(KST).strftime('%Y%m%d')}.json")
+        status = await ctx.reply("이 서버의 음성 기록을 내보내는 중입니다...")
+        rows = await self.data_manager.export_guild(ctx.guild.id, path)
+        summary = f"{rows:,}행을 `{path}`에 내보냈습니다.{await self.unassigned_note()}"
+        limit = ctx.guild.filesize_limit
+        if os.path.getsize(path) <= limit:
+            await status.edit(content=summary)
+            await ctx.send(file=discord.File(path))
+        else:
+            await status.edit(content=f"{summary} (파일이 {limit / 1024 / 1024:.0f}MB를 넘어 서버에만 저장되었습니다.)")
+        await self.log(f"{ctx.author}({ctx.author.id})님에 의해 서버 음성 기록 {rows:,}행을 내보냈습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
+
+    @voice.command(name="서버기록삭제")
+    @only_in_guild()
+    @commands.has_permissions(administrator=True)
+    async def purge_guild_records(self, ctx):
+        removed = await self.data_manager.purge_guild(ctx.guild.id)
+        VoiceLeaderboard().invalidate()
+        TrackedChannelRegistry().invalidate()
+        await ctx.send(f"이 서버의 음성 기록 및 채널 설정이 삭제되었습니다. ({sum(removed.values()):,}행){await self.unassigned_note()}")
+        details = ", ".join(f"{table} {count:,}" for table, count in removed.items())
+        await self.log(f"{ctx.author}({ctx.author.id})님에 의해 서버 음성 기록이 삭제되었습니다. ({details}) [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
+
     @voice.command(name="채널초기화")
     @only_in_guild()
     @commands.has_permissions(administrator=True)
     async def reset_all_channel(self, ctx):
         await self.data_manager.reset_tracked_channels("voice")
+        TrackedChannelRegistry().invalidate("voice")
         await ctx.send("모든 채널 기록이 초기화되었습니다.")
         await self.log(f"{ctx.author}({ctx.author.id})님에 의해 모든 채널 기록이 초기화되었습니다. [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
 
+    async def run_compaction(self, retention_days: int = DAILY_RETENTION_DAYS) -> str:
+        """일별 기록을 압축하고 전후 행 수/파일 크기를 로그로 남긴 뒤 요약 문자열을 반환합니다."""
+        before = await self.data_manager.get_storage_stats()
+        await self.log(
+            f"음성 기록 압축 시작 (보존 {retention_days}일) - 일별 {before['voice_days']:,}행, 주간 {before['voice_times_weekly']:,}행, "
+            f"월간 {before['voice_times_monthly']:,}행, 파일 {before['file_size'] / 1024 / 1024:.1f}MB"
+        )
+        horizon = await self.data_manager.compact_voice_days(retention_days)
+        if horizon is None:
+            summary = "새로 정리할 기록이 없습니다."
+        else:
+            after = await self.data_manager.get_storage_stats()
+            summary = (
+                f"{horizon} 이전 일별 기록 정리 완료 - 일별 {before['voice_days']:,} → {after['voice_days']:,}행, "
+                f"주간 {before['voice_times_weekly']:,} → {after['voice_times_weekly']:,}행, "
+                f"파일 {before['file_size'] / 1024 / 1024:.1f}MB → {after['file_size'] / 1024 / 1024:.1f}MB"
+            )
+        await self.log(f"음성 기록 압축 종료: {summary}")
+        return summary
+
+    @tasks.loop(time=dt_time(COMPACTION_HOUR, tzinfo=KST_FIXED))
+    async def compact_voice_data(self):
+        """매일 한 번 보존 기간이 지난 일별 기록을 압축"""
+        try:
+            await self.run_compaction()
+        except Exception as e:
+            await self.log(f"음성 기록 압축 중 오류 발생: {e}")
+
+    @compact_voice_data.before_loop
+    async def before_compact_voice_data(self):
+        await self.bot.wait_until_ready()
+
+    @voice.command(name="기록압축")
+    @only_in_guild()
+    @commands.has_permissions(administrator=True)
+    async def compact_records(self, ctx, retention_days: int = DAILY_RETENTION_DAYS):
+        if retention_days < 1:
+            await ctx.reply("보존일수는 1 이상이어야 합니다.")
+            return
+        status = await ctx.reply("음성 기록 압축을 시작합니다...")
+        summary = await self.run_compaction(retention_days)
+        await status.edit(content=summary)
+        await self.log(f"{ctx.author}({ctx.author.id})님에 의해 음성 기록 압축 실행 [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
+
+    @voice.command(name="파일정리전환")
+    @only_in_guild()
+    @commands.has_permissions(administrator=True)
+    async def enable_incremental_vacuum(self, ctx):
+        before = await self.data_manager.get_storage_stats()
+        status = await ctx.reply("DB 파일을 다시 쓰는 중입니다. 끝날 때까지 음성 기록 반영이 멈춥니다...")
+        if not await self.data_manager.enable_incremental_vacuum():
+            await status.edit(content="이미 전환된 DB입니다. 압축할 때마다 빈 공간을 자동으로 돌려줍니다.")
+            return
+        after = await self.data_manager.get_storage_stats()
+        await status.edit(content=f"전환 완료 - 파일 {before['file_size'] / 1024 / 1024:.1f}MB → {after['file_size'] / 1024 / 1024:.1f}MB")
+        await self.log(f"{ctx.author}({ctx.author.id})님에 의해 음성 DB incremental vacuum 전환 실행 [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
+
     @voice.command(name="데이터통합")
     @only_in_guild()
     @commands.has_permissions(administrator=True)
     async def migrate_all_data(self, ctx):
         user_paths = ["src/florence/jsons/user_times.json", "src/florence/voice_sub/user_times.json"]
         deleted_path = "src/florence/jsons/deleted_channels.json"
-        await self.data_manager.migrate_multiple_user_times(user_paths, deleted_path)
-        await ctx.send("데이터 통합 마이그레이션이 완료되었습니다.")
+        status = await ctx.send("데이터 통합 마이그레이션을 시작합니다...")
+        last_report = 0.0
+
+        async def report(path: str, entries: int, rows: int):
+            # 메시지 수정은 최대 5초에 한 번만
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report < 5:
+                return
+            last_report = now
+            await status.edit(content=f"데이터 통합 진행 중... `{os.path.basename(path)}` {entries:,}일 처리, {rows:,}행 추가")
+
+        inserted = await self.data_manager.migrate_multiple_user_times(user_paths, deleted_path, progress=report)
+        VoiceLeaderboard().invalidate()
+        TrackedChannelRegistry().invalidate()
+        await status.edit(content=f"데이터 통합 마이그레이션이 완료되었습니다. ({inserted:,}행 추가)")
         await self.log(f"{ctx.author}({ctx.author.id})님에 의해 데이터 통합 마이그레이션 실행 [길드: {ctx.guild.name}({ctx.guild.id}), 채널: {ctx.channel.name}({ctx.channel.id})]")
 
 async def setup(bot: commands.Bot):
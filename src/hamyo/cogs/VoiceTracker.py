@@ -1,32 +1,68 @@
 import discord
 from discord.ext import commands, tasks
-from datetime import datetime
-from DataManager import DataManager
-from voice_utils import get_expanded_tracked_channels as expand_tracked 
+from datetime import datetime, timedelta, time as dt_time
+from DataManager import DataManager, KST_FIXED
+from voice_utils import TrackedChannelRegistry, TRACKED_CHANNEL_TYPES
+from voice_leaderboard import VoiceLeaderboard
+from voice_presence import Presence, PresenceTable
 import asyncio
 import time
 import pytz
+from typing import Dict, Iterable, List, Optional, Tuple
 
 KST = pytz.timezone("Asia/Seoul")
 
+CHECKPOINT_MINUTES = 5   # 진행 중인 세션 시간을 중간 반영하는 주기
+QUEST_CHECK_MINUTES = 1  # 음성 퀘스트(30분/1시간/5·10·20시간) 달성을 확인하는 주기
+RECONCILE_MINUTES = 10   # 놓친 입장/퇴장 이벤트를 채널 상태와 맞추는 주기
+RESUME_CATCHUP_SECONDS = 600  # 재시작 후 이어 적립할 때 인정하는 최대 공백
+
 class VoiceTracker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.data_manager = DataManager()
-        self.join_times = {}  # {user_id: {channel_id: join_time}}
+        self.leaderboard = VoiceLeaderboard()
+        self.tracked_channels = TrackedChannelRegistry()
+        self.presence = PresenceTable()  # 진행 중인 세션 (마지막으로 반영한 시점, 세션 id)
+        self._resume_sessions = []  # 재시작 전 열린 세션 (session_id, user_id, channel_id, checkpoint_at)
         bot.loop.create_task(self.data_manager.initialize())
-        self.track_voice_time.start()
+        self.checkpoint_voice_time.start()
+        self.check_voice_quests.start()
+        self.reconcile_voice_sessions.start()
+        self.midnight_rollover.start()
         # --- 추가: 음성 퀘스트 지급 여부 메모리 관리 ---
         self.voice_quest_daily_given = set()  # (user_id, date)
         self.voice_quest_weekly_given = {}    # user_id: set([5, 10, 20])  # 시간 단위
         self.voice_1h_tracker = set() # user_id set for today
         self.current_date_str = datetime.now(KST).strftime("%Y-%m-%d")
-        self._tracked_voice_cache = None
-        self._tracked_voice_cache_at = 0  # epoch seconds
+        self.current_week_str = None
 
     async def cog_load(self):
+        # 재시작 전 열려 있던 세션은 봇 준비 후(reconcile 시작 전) 이어서 적립
+        try:
+            self._resume_sessions = await self.data_manager.get_open_voice_sessions()
+        except Exception as e:
+            print(f"❌ {self.__class__.__name__} 열린 음성 세션 조회 중 오류 발생: {e}")
         print(f"✅ {self.__class__.__name__} loaded successfully!")
 
+    async def cog_unload(self):
+        self.checkpoint_voice_time.cancel()
+        self.check_voice_quests.cancel()
+        self.reconcile_voice_sessions.cancel()
+        self.midnight_rollover.cancel()
+        # 종료/재시작 시 진행 중인 세션까지 적립하고 버퍼를 반영
+        try:
+            await self.save_open_sessions()
+        except Exception as e:
+            print(f"❌ {self.__class__.__name__} 음성 시간 반영 중 오류 발생: {e}")
+
+    async def save_open_sessions(self):
+        """진행 중인 세션을 지금까지 적립하고 세션 체크포인트와 함께 DB에 반영 (세션은 열린 채로 유지)"""
+        now_mono = time.monotonic()
+        for presence in self.presence.snapshot():
+            await self._accrue(presence, now_mono)
+        await self.data_manager.flush_voice_times()
+
     async def log(self, message):
         try:
             logger = self.bot.get_cog('Logger')
@@ -35,138 +71,299 @@ class VoiceTracker(commands.Cog):
         except Exception as e:
             print(f"❌ {self.__class__.__name__} 로그 전송 중 오류 발생: {e}")
             
-    async def _get_tracked_voice_ids_cached(self, ttl: int = 600) -> set[int]:
-        now_ts = time.time()
-        if self._tracked_voice_cache and (now_ts - self._tracked_voice_cache_at) < ttl:
-            return self._tracked_voice_cache
-        ids = set(await expand_tracked(self.bot, self.data_manager, "voice"))
-        self._tracked_voice_cache = ids
-        self._tracked_voice_cache_at = now_ts
-        return ids
-
     def get_all_voice_channels(self):
         channels = []
         for guild in self.bot.guilds:
             channels.extend(getattr(guild, "voice_channels", []))
             channels.extend(getattr(guild, "stage_channels", []))  
         return channels
-    
-    def invalidate_tracked_voice_cache(self):
-        self._tracked_voice_cache = None
-        self._tracked_voice_cache_at = 0
-
-    @tasks.loop(minutes=1)
-    async def track_voice_time(self):
-        now = datetime.now(KST)
-        channels = self.get_all_voice_channels()
 
-        for channel in channels:
-            for member in channel.members:
-                if member.bot:
-                    continue
+    def get_present_members(
+        self,
+        channel_ids: Optional[Iterable[int]] = None,
+        guild_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """지금 음성 채널에 있는 (user_id, channel_id) 목록 (채널 스캔 없이 세션 표에서 조회)"""
+        return self.presence.members(channel_ids, guild_id)
 
-                user_id = member.id
-                channel_id = channel.id
+    async def _accrue(self, presence: Presence, now_mono: float, flush: bool = True):
+        """
+        마지막 반영 시점부터 now_mono까지의 시간을 적립 (KST 자정을 넘기면 자정 정각에서 날짜별로 나눔)
+        flush=False면 버퍼에만 쌓고 DB 반영은 호출자에게 맡깁니다.
+        """
+        elapsed = presence.elapsed(now_mono)
+        if elapsed <= 0:
+            return
+        start, end = presence.ts, presence.ts + elapsed
+        day, day_end = presence.day, presence.day_end
+        # await 전에 체크포인트를 옮겨 동시에 들어온 적립이 같은 구간을 다시 세지 않도록 함
+        # (초 단위로 잘린 나머지는 다음 반영에 포함)
+        presence.advance(elapsed)
+        self._record_hours(presence.guild_id, start, end)
+
+        if end > day_end:
+            pieces = ((day_end - start, day_end, day), (end - day_end, end, day + 1))
+        else:
+            pieces = ((elapsed, end, day),)
+        for seconds, checkpoint, piece_day in pieces:
+            if seconds > 0:
+                await self.data_manager.add_voice_time(
+                    presence.user_id, presence.channel_id, seconds, presence.session_id, checkpoint,
+                    presence.guild_id, day=piece_day, flush=flush
+                )
 
-                if user_id not in self.join_times:
-                    self.join_times[user_id] = {}
+    def get_live_seconds(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        channel_ids: Optional[Iterable[int]] = None,
+        user_ids: Optional[Iterable[int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Dict[int, Dict[int, int]]:
+        """
+        진행 중인 세션에서 마지막 체크포인트 이후 아직 적립되지 않은 초 {user_id: {channel_id: seconds}}
+        [start_date, end_date)와 겹치는 부분만 계산하며, DB에는 아무것도 쓰지 않습니다.
+        guild_id를 주면 해당 서버 채널의 세션만 포함합니다. (서버를 모르는 채널은 channel_ids에 있으면 포함)
+        """
+        now_mono = time.monotonic()
+        start_ts, end_ts = int(start_date.timestamp()), int(end_date.timestamp())
+        channel_set = set(channel_ids) if channel_ids is not None else None
+        user_set = set(user_ids) if user_ids is not None else None
+        live: Dict[int, Dict[int, int]] = {}
+        for presence in self.presence:
+            if user_set is not None and presence.user_id not in user_set:
+                continue
+            if channel_set is not None and presence.channel_id not in channel_set:
+                continue
+            # 서버를 모르는 채널은 채널 조건이 있으면 그 조건만으로 포함 (DB 조회와 같음)
+            if guild_id is not None and presence.guild_id != guild_id and not (presence.guild_id is None and channel_set is not None):
+                continue
+            seconds = min(end_ts, presence.ts + presence.elapsed(now_mono)) - max(presence.ts, start_ts)
+            if seconds > 0:
+                live.setdefault(presence.user_id, {})[presence.channel_id] = seconds
+        return live
+
+    def get_live_totals(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        channel_ids: Optional[Iterable[int]] = None,
+        user_ids: Optional[Iterable[int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Dict[int, int]:
+        """get_live_seconds의 유저별 합계 {user_id: seconds}"""
+        return {
+            user_id: sum(channels.values())
+            for user_id, channels in self.get_live_seconds(start_date, end_date, channel_ids, user_ids, guild_id).items()
+        }
+
+    def _channel_guild(self, channel_id: int) -> Optional[int]:
+        """채널의 서버 ID (채널이 이미 삭제되었으면 DataManager가 기억하는 값, 모르면 None)"""
+        channel = self.bot.get_channel(channel_id)
+        if channel is not None:
+            return channel.guild.id
+        return self.data_manager.get_channel_guild(channel_id) or None
+
+    def _record_hours(self, guild_id: Optional[int], start_ts: int, end_ts: int):
+        """적립한 구간(start_ts~end_ts)을 서버 시간대별 활동 집계에도 더합니다."""
+        if guild_id is None or end_ts <= start_ts:
+            return
+        self.data_manager.add_voice_hours(guild_id, start_ts, end_ts)
 
-                if channel_id not in self.join_times[user_id]:
-                    self.join_times[user_id][channel_id] = now
-                    continue
+    async def _open_session(self, user_id: int, channel_id: int):
+        if (user_id, channel_id) in self.presence:
+            return
+        now_ts = int(time.time())
+        presence = self.presence.add(user_id, channel_id, self._channel_guild(channel_id), now_ts)
+        try:
+            presence.session_id = await self.data_manager.open_voice_session(user_id, channel_id, now_ts)
+        except Exception as e:
+            await self.log(f"음성 세션 시작 기록 중 오류 발생 (유저 - {user_id}, 채널 - {channel_id}): {e}")
 
-                join_time = self.join_times[user_id][channel_id]
+    async def _close_session(self, user_id: int, channel_id: int, credit: bool = True):
+        """세션 종료. credit=False면 마지막 반영 시점 이후는 적립하지 않음 (퇴장 시각을 모르는 경우)"""
+        presence = self.presence.get(user_id, channel_id)
+        if presence is None:
+            return
+        if credit:
+            await self._accrue(presence, time.monotonic())
+        if self.presence.remove(user_id, channel_id) is not presence:
+            return
 
-                if join_time.date() != now.date():
-                    midnight = join_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                    next_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                    duration1 = int((midnight - join_time).total_seconds())
-                    duration2 = int((now - next_day).total_seconds())
+        if presence.session_id is not None:
+            try:
+                await self.data_manager.close_voice_session(presence.session_id, presence.ts)
+            except Exception as e:
+                await self.log(f"음성 세션 종료 기록 중 오류 발생 (유저 - {user_id}, 채널 - {channel_id}): {e}")
 
-                    if duration1 > 0:
-                        await self.data_manager.add_voice_time(user_id, channel_id, duration1)
-                    if duration2 > 0:
-                        await self.data_manager.add_voice_time(user_id, channel_id, duration2)
+    @tasks.loop(minutes=CHECKPOINT_MINUTES)
+    async def checkpoint_voice_time(self):
+        """진행 중인 세션만 돌며 누적 시간을 중간 반영 (전체 채널/멤버 스캔 없음)"""
+        now_mono = time.monotonic()
+        for presence in self.presence.snapshot():
+            await self._accrue(presence, now_mono)
 
-                    self.join_times[user_id][channel_id] = next_day
-                else:
-                    duration = int((now - join_time).total_seconds())
-                    if duration > 0:
-                        await self.data_manager.add_voice_time(user_id, channel_id, duration)
-                        self.join_times[user_id][channel_id] = now
+        try:
+            await self.data_manager.flush_if_due()
+        except Exception as e:
+            await self.log(f"음성 시간 일괄 반영 중 오류 발생: {e}")
 
+    @tasks.loop(minutes=QUEST_CHECK_MINUTES)
+    async def check_voice_quests(self):
+        """
+        음성 퀘스트 달성 확인 (반영 주기와 별개로 1분마다)
+        합계는 메모리 순위 + 진행 중인 세션의 미적립 시간으로 계산하므로 DB 쓰기가 없습니다.
+        """
         await self.process_voice_quests()
 
-    async def process_voice_quests(self):
+    @check_voice_quests.before_loop
+    async def before_check_voice_quests(self):
+        await self.bot.wait_until_ready()
+
+    @checkpoint_voice_time.before_loop
+    async def before_checkpoint_voice_time(self):
+        """시작 시 채널 → 서버 매핑을 기록하고 SQLite 기록으로 메모리 순위를 구성"""
+        await self.bot.wait_until_ready()
+        try:
+            assigned = await self.data_manager.assign_channel_guilds(
+                {channel.id: guild.id for guild in self.bot.guilds for channel in guild.channels},
+                bot_guild_ids=[guild.id for guild in self.bot.guilds]
+            )
+            if assigned:
+                await self.log(f"서버가 기록되지 않은 음성 기록 {assigned:,}행에 서버 ID를 채웠습니다. [시스템]")
+            unassigned = await self.data_manager.get_unassigned_counts()
+            if any(unassigned.values()):
+                details = ", ".join(f"{table} {count:,}" for table, count in unassigned.items())
+                await self.log(f"서버를 알 수 없는 음성 기록이 남아 있습니다. 서버별 조회에는 추적 채널 기록으로 포함됩니다. ({details}) [시스템]")
+        except Exception as e:
+            await self.log(f"채널 서버 매핑 기록 중 오류 발생: {e}")
+        try:
+            await self.leaderboard.ensure_ready(await self.tracked_channels.get(self.bot, "voice"))
+        except Exception as e:
+            await self.log(f"음성 순위 초기 구성 중 오류 발생: {e}")
+
+    # 타이머가 자정 직전에 깨어나지 않도록 1초 여유
+    @tasks.loop(time=dt_time(0, 0, 1, tzinfo=KST_FIXED))
+    async def midnight_rollover(self):
         """
-        음성방 30분(일일), 5/10/20시간(주간) 퀘스트 경험치 지급
+        KST 자정에 진행 중인 세션을 모두 자정 기준으로 나눠 적립하고 한 번에 반영한 뒤,
+        일일(월요일이면 주간) 퀘스트 지급 캐시를 같은 시점에 초기화합니다.
         """
-        level_checker = self.bot.get_cog('LevelChecker')
-        if not level_checker:
-            return
+        now_mono = time.monotonic()
+        try:
+            for presence in self.presence.snapshot():
+                await self._accrue(presence, now_mono, flush=False)
+            await self.data_manager.flush_voice_times()
+        except Exception as e:
+            await self.log(f"자정 음성 시간 마감 중 오류 발생: {e}")
+        self._roll_voice_quest_caches(datetime.now(KST))
 
-        # 추적 채널 목록 확보 (캐시가 있으면 사용, 없으면 유틸 함수로 확장)
+    @midnight_rollover.before_loop
+    async def before_midnight_rollover(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(minutes=RECONCILE_MINUTES)
+    async def reconcile_voice_sessions(self):
+        """
+        음성 채널의 현재 상태와 열린 세션을 비교해 놓친 이벤트를 보정합니다.
+        - 채널에 있는데 세션이 없으면 지금부터 세션 시작
+        - 세션은 있는데 채널에 없으면 마지막 반영 시각으로 종료
+        """
+        present = set()
+        for channel in self.get_all_voice_channels():
+            for user_id in channel.voice_states:
+                member = channel.guild.get_member(user_id)
+                if member is None or member.bot:
+                    continue
+                present.add((user_id, channel.id))
+
+        opened = closed = 0
+        for user_id, channel_id in present:
+            if (user_id, channel_id) not in self.presence:
+                await self._open_session(user_id, channel_id)
+                opened += 1
+
+        for presence in self.presence.snapshot():
+            if (presence.user_id, presence.channel_id) not in present:
+                await self._close_session(presence.user_id, presence.channel_id, credit=False)
+                closed += 1
+
+        if self.reconcile_voice_sessions.current_loop and (opened or closed):
+            await self.log(f"음성 세션 보정: 시작 {opened}건, 종료 {closed}건 [시스템]")
+
+    @reconcile_voice_sessions.before_loop
+    async def before_reconcile_voice_sessions(self):
+        """재시작 전 열린 세션을 이어받은 뒤 현재 음성 채널 상태로 보정 시작"""
+        await self.bot.wait_until_ready()
         try:
-            tracked_channel_ids = set(await self._get_tracked_voice_ids_cached())
-        except AttributeError:
-            # 캐시 헬퍼가 없는 경우 폴백
-            from voice_utils import get_expanded_tracked_channels as expand_tracked
-            tracked_channel_ids = set(await expand_tracked(self.bot, self.data_manager, "voice"))
-            
-        if not tracked_channel_ids:
-            return
+            await self._resume_open_sessions()
+        except Exception as e:
+            await self.log(f"이전 음성 세션 복구 중 오류 발생: {e}")
 
-        now = datetime.now(KST)
-        user_ids = list(self.join_times.keys())
-        
-        for uid in user_ids:
-            try:
-                # === 일간(오늘) 누적 초 ===
-                day_map, _, _ = await self.data_manager.get_user_times(
-                    user_id=uid,
-                    period="일간",
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids)
+    async def _resume_open_sessions(self):
+        """
+        저널(voice_sessions)의 열린 세션 복구
+        - 아직 같은 채널에 있으면 마지막 적립 시각부터 이어서 적립 (공백은 최대 RESUME_CATCHUP_SECONDS만 인정)
+        - 채널에 없으면 마지막 적립 시각으로 종료
+        """
+        sessions, self._resume_sessions = self._resume_sessions, []
+        now_ts = int(time.time())
+        earliest = now_ts - RESUME_CATCHUP_SECONDS
+        resumed = closed = 0
+        for session_id, user_id, channel_id, checkpoint_ts in sessions:
+            channel = self.bot.get_channel(channel_id)
+            present = channel is not None and user_id in getattr(channel, "voice_states", {})
+            if present and (user_id, channel_id) not in self.presence:
+                presence = self.presence.add(
+                    user_id, channel_id, channel.guild.id, min(max(checkpoint_ts, earliest), now_ts)
                 )
-                daily_secs = sum(day_map.values()) if day_map else 0
+                presence.session_id = session_id
+                resumed += 1
+            else:
+                await self.data_manager.close_voice_session(session_id, checkpoint_ts)
+                closed += 1
 
-                if daily_secs >= 30 * 60:
-                    # 일일 30분 달성 → 중복 여부는 LevelChecker가 내부적으로 판단
-                    await level_checker.process_voice_30min(uid)
+        if resumed or closed:
+            await self.log(f"이전 음성 세션 복구: 이어서 적립 {resumed}건, 종료 {closed}건 [시스템]")
 
-                # 일일 1시간 달성
-                now_str = now.strftime("%Y-%m-%d")
-                if self.current_date_str != now_str:
-                    self.voice_1h_tracker.clear()
-                    self.current_date_str = now_str
-                    
-                if daily_secs >= 60 * 60 and uid not in self.voice_1h_tracker:
-                    self.voice_1h_tracker.add(uid)
-                    self.bot.dispatch('mission_completion', uid, 'voice_1h', None)
-
-                # === 주간 누적 초 ===
-                week_map, _, _ = await self.data_manager.get_user_times(
-                    user_id=uid,
-                    period="주간",
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids)
-                )
-                weekly_secs = sum(week_map.values()) if week_map else 0
+    async def process_voice_quests(self):
+        """
+        음성방 30분(일일), 5/10/20시간(주간) 퀘스트 경험치 지급
+        """
+        await self.process_voice_quests_for_users(self.presence.user_ids())
+
+    def _roll_voice_quest_caches(self, now: datetime):
+        """날짜/주가 바뀌면 퀘스트 지급 캐시 초기화"""
+        now_str = now.strftime("%Y-%m-%d")
+        if self.current_date_str != now_str:
+            self.voice_1h_tracker.clear()
+            self.voice_quest_daily_given.clear()
+            self.current_date_str = now_str
+
+        week_str = (now - timedelta(days=now.weekday())).strftime("%Y-%m-%d")
+        if self.current_week_str != week_str:
+            self.voice_quest_weekly_given.clear()
+            self.current_week_str = week_str
+
+    async def _get_tracked_totals(self, user_ids: set[int], period: str, now: datetime, tracked_channel_ids: set[int]) -> dict[int, int]:
+        """
+        추적 채널 기준 기간 합계 (메모리 순위가 있으면 사용, 없으면 GROUP BY 한 번으로 조회)
+        진행 중인 세션의 체크포인트 이후 시간도 더합니다.
+        """
+        if self.leaderboard.channel_ids == tracked_channel_ids and self.leaderboard.covers(period, now):
+            totals = self.leaderboard.get_totals(period, user_ids)
+        else:
+            totals = await self.data_manager.get_users_period_totals(list(user_ids), period, now, "voice")
+        start_date, end_date = await self.data_manager.get_period_range(period, now)
+        for uid, seconds in self.get_live_totals(start_date, end_date, tracked_channel_ids, user_ids).items():
+            totals[uid] = totals.get(uid, 0) + seconds
+        return totals
 
-                # 주간 5/10/20h 달성도 순차 검사 (중복 방지는 LevelChecker가 처리)
-                for h in (5, 10, 20):
-                    if weekly_secs >= h * 3600:
-                        await level_checker.process_voice_weekly(uid, h)
-            except Exception as e:
-                # 한 유저에서 에러가 나도 다른 유저 진행은 계속
-                try:
-                    await self.log(f"음성방 퀘스트 처리에서 유저 - {uid} 처리 중 오류: {e}")
-                except Exception:
-                    pass
-                        
     async def process_voice_quests_for_users(self, user_ids: set[int]):
         """
         음성방 30분(일일), 5/10/20시간(주간) 퀘스트 경험치 지급
+        - 대상 유저 전체의 일간/주간 합계를 한 번에 조회
+        - 새로 기준을 넘긴 유저만 LevelChecker로 전달 (중복 방지는 LevelChecker도 처리)
         """
         if not user_ids:
             return
@@ -175,46 +372,45 @@ class VoiceTracker(commands.Cog):
         if not level_checker:
             return
 
-        # 추적 채널 목록 확보 (캐시가 있으면 사용, 없으면 유틸 함수로 확장)
-        try:
-            tracked_channel_ids = set(await self._get_tracked_voice_ids_cached())
-        except AttributeError:
-            # 캐시 헬퍼가 없는 경우 폴백
-            from voice_utils import get_expanded_tracked_channels as expand_tracked
-            tracked_channel_ids = set(await expand_tracked(self.bot, self.data_manager, "voice"))
-            
+        tracked_channel_ids = await self.tracked_channels.get(self.bot, "voice")
         if not tracked_channel_ids:
             return
 
         now = datetime.now(KST)
+        self._roll_voice_quest_caches(now)
+        today_str = self.current_date_str
+
+        try:
+            daily_totals = await self._get_tracked_totals(user_ids, "일간", now, tracked_channel_ids)
+            weekly_totals = await self._get_tracked_totals(user_ids, "주간", now, tracked_channel_ids)
+        except Exception as e:
+            await self.log(f"음성방 퀘스트 합계 조회 중 오류: {e}")
+            return
+
         for uid in user_ids:
             try:
-                # === 일간(오늘) 누적 초 ===
-                day_map, _, _ = await self.data_manager.get_user_times(
-                    user_id=uid,
-                    period="일간",
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids)
-                )
-                daily_secs = sum(day_map.values()) if day_map else 0
-
-                if daily_secs >= 30 * 60:
-                    # 일일 30분 달성 → 중복 여부는 LevelChecker가 내부적으로 판단
-                    await level_checker.process_voice_30min(uid)
-
-                # === 주간 누적 초 ===
-                week_map, _, _ = await self.data_manager.get_user_times(
-                    user_id=uid,
-                    period="주간",
-                    base_date=now,
-                    channel_filter=list(tracked_channel_ids)
-                )
-                weekly_secs = sum(week_map.values()) if week_map else 0
+                daily_secs = daily_totals.get(uid, 0)
+                weekly_secs = weekly_totals.get(uid, 0)
+
+                # 일일 30분 달성
+                if daily_secs >= 30 * 60 and (uid, today_str) not in self.voice_quest_daily_given:
+                    result = await level_checker.process_voice_30min(uid)
+                    # 지급됐거나 이미 지급된 경우만 기록 (일시적 오류면 다음 주기에 다시 시도)
+                    if result.get('success') or result.get('already_completed'):
+                        self.voice_quest_daily_given.add((uid, today_str))
 
-                # 주간 5/10/20h 달성도 순차 검사 (중복 방지는 LevelChecker가 처리)
+                # 일일 1시간 달성
+                if daily_secs >= 60 * 60 and uid not in self.voice_1h_tracker:
+                    self.voice_1h_tracker.add(uid)
+                    self.bot.dispatch('mission_completion', uid, 'voice_1h', None)
+
+                # 주간 5/10/20h 달성
+                weekly_given = self.voice_quest_weekly_given.setdefault(uid, set())
                 for h in (5, 10, 20):
-                    if weekly_secs >= h * 3600:
-                        await level_checker.process_voice_weekly(uid, h)
+                    if weekly_secs >= h * 3600 and h not in weekly_given:
+                        result = await level_checker.process_voice_weekly(uid, h)
+                        if result.get('success') or result.get('already_completed'):
+                            weekly_given.add(h)
             except Exception as e:
                 # 한 유저에서 에러가 나도 다른 유저 진행은 계속
                 try:
@@ -225,15 +421,34 @@ class VoiceTracker(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel):
         if isinstance(channel, (discord.VoiceChannel, discord.StageChannel)) and channel.category_id:
-            await self.data_manager.register_deleted_channel(channel.id, channel.category_id)
+            await self.data_manager.register_deleted_channel(channel.id, channel.category_id, channel.guild.id)
             
             category_name = channel.category.name if channel.category else f"UnknownCategory({channel.category_id})"
             
             await self.log(
                 f"추적된 카테고리 {category_name}의 음성/스테이지 채널 {channel.name}({channel.id})이 삭제되었습니다. [길드: {channel.guild.name}({channel.guild.id})] [시스템]"
             )
-            # 추적 채널 캐시 무효화
-            self.invalidate_tracked_voice_cache()
+
+        # 삭제 확인된 ID로 기록하고 추적 채널 확장 결과 무효화 (삭제 채널 기록 후)
+        if isinstance(channel, TRACKED_CHANNEL_TYPES):
+            await self.tracked_channels.mark_missing([channel.id])
+            self.tracked_channels.invalidate()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        if isinstance(channel, TRACKED_CHANNEL_TYPES):
+            await self.data_manager.assign_channel_guilds({channel.id: channel.guild.id})
+            await self.tracked_channels.mark_present([channel.id])
+            self.tracked_channels.invalidate()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        # 카테고리 이동이나 종류 변경만 추적 채널 확장 결과에 영향을 줌
+        if isinstance(after, TRACKED_CHANNEL_TYPES) and (
+            getattr(before, "category_id", None) != getattr(after, "category_id", None)
+            or type(before) is not type(after)
+        ):
+            self.tracked_channels.invalidate()
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -241,35 +456,13 @@ class VoiceTracker(commands.Cog):
             if member.bot or before.channel == after.channel:
                 return
 
-            now = datetime.now(KST)
-
-            # 나간 채널 처리
+            # 나간 채널의 세션 종료 및 적립
             if before.channel:
-                if member.id in self.join_times and before.channel.id in self.join_times[member.id]:
-                    join_time = self.join_times[member.id][before.channel.id]
-
-                    if join_time.date() != now.date():
-                        midnight = join_time.replace(hour=23, minute=59, second=59, microsecond=999999)
-                        next_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                        duration1 = int((midnight - join_time).total_seconds())
-                        duration2 = int((now - next_day).total_seconds())
-
-                        if duration1 > 0:
-                            await self.data_manager.add_voice_time(member.id, before.channel.id, duration1)
-                        if duration2 > 0:
-                            await self.data_manager.add_voice_time(member.id, before.channel.id, duration2)
-                    else:
-                        duration = int((now - join_time).total_seconds())
-                        if duration > 0:
-                            await self.data_manager.add_voice_time(member.id, before.channel.id, duration)
-
-                    del self.join_times[member.id][before.channel.id]
-
-            # 입장한 채널 등록
+                await self._close_session(member.id, before.channel.id)
+
+            # 입장한 채널의 세션 시작
             if after.channel:
-                if member.id not in self.join_times:
-                    self.join_times[member.id] = {}
-                self.join_times[member.id][after.channel.id] = now
+                await self._open_session(member.id, after.channel.id)
             else:
                 await self.process_voice_quests_for_users({member.id}) # 나간 유저에 대해 음성 퀘스트 처리
         except Exception as e:
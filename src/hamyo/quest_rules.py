@@ -0,0 +1,260 @@
+# quest_rules.py
+import asyncio
+import json
+import os
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from LevelDataManager import LevelDataManager
+
+CONFIG_PATH = "config/quest_rules.json"
+PERIODS = ('day', 'week')
+CATEGORY_PERIOD = {'daily': 'day', 'weekly': 'week'}
+
+# 기본 퀘스트 정의 (config/quest_rules.json이 있으면 그 내용을 이 위에 덮어씀, load_quest_rules)
+# - exp: 지급 다공, on: 이 보상을 평가하는 이벤트 이름 (없으면 관리자 강제 완료로만 지급)
+# - at/counts: counts("분류.이름") 기록이 기간 내 at회 이상이면 지급하는 마일스톤
+#   exact: 기록 수가 정확히 at회가 되는 순간에만 지급 (이미 지나쳤으면 지급하지 않음)
+#   backfill: exact 마일스톤을 놓쳤어도 기록 수가 정확히 이 값이 되는 순간 아직 미지급이면 지급
+# - cap: 기간(period, 기본값은 분류에 따름)당 최대 지급 횟수 (생략 시 마일스톤은 1, 그 외는 무제한)
+# - log: quest_logs에 남기는 quest_subtype (기본값 퀘스트 이름), force: 관리자 강제 완료 허용
+# - events: 이벤트가 발생할 때마다 남기는 0다공 기록 (마일스톤 집계용)
+DEFAULT_QUEST_RULES = {
+    'daily': {
+        'attendance': {'exp': 10, 'on': 'attendance', 'message': "📅 출석 수행 완료! **+{exp} 다공**"},
+        'diary': {'exp': 5, 'on': 'diary', 'cap': 1, 'message': "📝 일지 수행 완료! **+{exp} 다공**"},
+        'voice_30min': {'exp': 15, 'on': 'voice_30min', 'cap': 1, 'message': "🔊 음성방 30분 수행 완료! **+{exp} 다공**"},
+        'bbibbi': {'exp': 5},
+        'call': {'exp': 3, 'on': 'call', 'cap': 1, 'message': "📢 전화하자 퀘스트 완료! **+{exp} 다공**"},
+        'friend': {'exp': 3, 'on': 'friend', 'cap': 1, 'message': "📢 친구하자 퀘스트 완료! **+{exp} 다공**"},
+    },
+    'weekly': {
+        'recommend_3': {'exp': 50, 'on': 'recommend', 'counts': 'weekly.recommend', 'at': 3,
+                        'message': "🌱 주간 추천 3회 달성! **+{exp} 다공**"},
+        'attendance_4': {'exp': 20, 'on': 'attendance', 'counts': 'daily.attendance', 'at': 4, 'exact': True,
+                         'message': "🏆 주간 출석 4회 달성! **+{exp} 다공**"},
+        'attendance_7': {'exp': 50, 'on': 'attendance', 'counts': 'daily.attendance', 'at': 7, 'exact': True,
+                         'message': "🏆 주간 출석 7회 달성! **+{exp} 다공**"},
+        'diary_4': {'exp': 10, 'on': 'diary', 'counts': 'daily.diary', 'at': 4, 'exact': True, 'backfill': 7,
+                    'message': "🏆 주간 일지 4회 달성! **+{exp} 다공**"},
+        'diary_7': {'exp': 30, 'on': 'diary', 'counts': 'daily.diary', 'at': 7, 'exact': True,
+                    'message': "🏆 주간 일지 7회 달성! **+{exp} 다공**"},
+        'voice_5h': {'exp': 50, 'on': 'voice_5h', 'cap': 1, 'message': "🏆 음성방 5시간(주간) 수행 완료! **+{exp} 다공**"},
+        'voice_10h': {'exp': 70, 'on': 'voice_10h', 'cap': 1, 'message': "🏆 음성방 10시간(주간) 수행 완료! **+{exp} 다공**"},
+        'voice_20h': {'exp': 100, 'on': 'voice_20h', 'cap': 1, 'message': "🏆 음성방 20시간(주간) 수행 완료! **+{exp} 다공**"},
+        'shop_purchase': {'exp': 30, 'cap': 1, 'force': True},
+        'board_participate': {'exp': 25, 'on': 'board', 'counts': 'weekly.board_participate', 'at': 3,
+                              'log': 'board_participate_3', 'force': True,
+                              'message': "📝 주간 게시판 3회 작성 달성! **+{exp} 다공**"},
+        'ping_use': {'exp': 25},
+    },
+    'one_time': {
+        'self_intro': {'exp': 50},
+        'review': {'exp': 80},
+        'monthly_role': {'exp': 100},
+    },
+    'events': {
+        'board': {'log': 'weekly.board_participate'},
+        'recommend': {'log': 'weekly.recommend'},
+    },
+}
+
+
+def load_quest_rules(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """
+    기본 정의에 path 파일의 변경분을 덮어쓴 퀘스트 정의를 반환합니다. 파일은 읽기만 합니다.
+    - 파일이 없으면 기본 정의 그대로
+    - {분류: {퀘스트: {항목: 값}}}로 적은 항목만 바꾸고, 새 퀘스트 이름이면 추가
+    - 퀘스트 값을 null로 적으면 그 기본 퀘스트를 끔
+    """
+    rules = {category: {name: dict(spec) for name, spec in quests.items()}
+             for category, quests in DEFAULT_QUEST_RULES.items()}
+    if not os.path.exists(path):
+        return rules
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    for category, quests in overrides.items():
+        target = rules.setdefault(category, {})
+        for name, spec in quests.items():
+            if spec is None:
+                target.pop(name, None)
+            else:
+                target.setdefault(name, {}).update(spec)
+    return rules
+
+
+def _log_key(ref: str) -> Tuple[str, str]:
+    """'분류.이름' -> (quest_type, quest_subtype)"""
+    quest_type, _, quest_subtype = ref.partition('.')
+    if not quest_subtype:
+        raise ValueError(f"잘못된 기록 이름입니다: {ref} ('분류.이름' 형식)")
+    return quest_type, quest_subtype
+
+
+class QuestRule:
+    """한 보상 규칙. 기간 내 기록 수는 (quest_type, quest_subtype, period) 키로 조회합니다."""
+
+    __slots__ = ("category", "name", "exp", "event", "period", "cap", "at", "exact_at", "counts",
+                 "log", "force", "message", "completed")
+
+    def __init__(self, category: str, name: str, spec: Dict[str, Any]):
+        self.category = category
+        self.name = name
+        self.exp = int(spec['exp'])
+        self.event: Optional[str] = spec.get('on')
+        self.period = spec.get('period', CATEGORY_PERIOD[category])
+        if self.period not in PERIODS:
+            raise ValueError(f"{category}.{name}: 지원하지 않는 기간입니다: {self.period}")
+        self.at: Optional[int] = spec.get('at')
+        # exact 마일스톤이 지급되는 기록 수 (None이면 at회 이상)
+        self.exact_at: Optional[frozenset] = None
+        if self.at is not None and spec.get('exact'):
+            self.exact_at = frozenset(n for n in (self.at, spec.get('backfill')) if n is not None)
+        self.counts = (_log_key(spec['counts']) + (self.period,)) if self.at is not None else None
+        self.cap: Optional[int] = spec.get('cap', 1 if self.at is not None else None)
+        self.log = (category, spec.get('log', name))
+        self.force = bool(spec.get('force', False))
+        self.message = spec.get('message', f"✨ {name} 퀘스트 완료! **+{{exp}} 다공**")
+        self.completed = f"{category}_{self.log[1]}"
+
+    @property
+    def own_key(self) -> Tuple[str, str, str]:
+        return self.log + (self.period,)
+
+    def grants(self, counts: Dict[Tuple[str, str, str], int], occurrences: int) -> int:
+        """counts(기간 내 기록 수) 기준으로 이번에 지급할 횟수"""
+        granted = counts.get(self.own_key, 0)
+        remaining = occurrences if self.cap is None else max(0, min(occurrences, self.cap - granted))
+        if self.at is not None:
+            count = counts.get(self.counts, 0)
+            reached = count in self.exact_at if self.exact_at is not None else count >= self.at
+            return min(remaining, 1) if reached else 0
+        return remaining
+
+
+class QuestRuleEngine:
+    """
+    퀘스트 정의를 이벤트별 규칙 목록으로 컴파일해 평가합니다.
+    - 이벤트 하나당 필요한 기간별 기록 수를 한 번에 읽고 (LevelDataManager.get_quest_log_counts)
+    - 메모리에서 모든 규칙을 순서대로 평가한 뒤 (일반 보상 -> 마일스톤, at 오름차순)
+    - 기록/다공 지급을 한 트랜잭션으로 씁니다 (LevelDataManager.apply_quest_logs)
+    - 읽기~쓰기 사이는 유저별 잠금으로 직렬화 (다른 유저의 평가는 기다리지 않음)
+    """
+
+    def __init__(self, definitions: Optional[Dict[str, Any]] = None):
+        self.data_manager = LevelDataManager()
+        # {user_id: asyncio.Lock}, 평가 중인 유저의 잠금만 남음
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.load(definitions if definitions is not None else load_quest_rules())
+
+    def load(self, definitions: Dict[str, Any]):
+        """정의를 컴파일해 교체합니다. 잘못된 정의면 ValueError/KeyError가 나고 기존 규칙은 유지됩니다."""
+        rules: Dict[str, QuestRule] = {}
+        by_event: Dict[str, List[QuestRule]] = {}
+        for category in CATEGORY_PERIOD:
+            for name, spec in definitions.get(category, {}).items():
+                rule = QuestRule(category, name, spec)
+                rules[name] = rule
+                if rule.event:
+                    by_event.setdefault(rule.event, []).append(rule)
+        for event_rules in by_event.values():
+            event_rules.sort(key=lambda r: (r.at is not None, r.at or 0))
+
+        event_logs = {
+            event: _log_key(spec['log'])
+            for event, spec in definitions.get('events', {}).items() if spec.get('log')
+        }
+        one_time = {name: int(spec['exp']) for name, spec in definitions.get('one_time', {}).items()}
+
+        self.rules = rules
+        self.by_event = by_event
+        self.event_logs = event_logs
+        self.quest_exp = {
+            **{category: {r.name: r.exp for r in rules.values() if r.category == category} for category in CATEGORY_PERIOD},
+            'one_time': one_time,
+        }
+
+    def reload(self, path: str = CONFIG_PATH):
+        self.load(load_quest_rules(path))
+
+    def _user_lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _new_result() -> Dict[str, Any]:
+        return {'success': False, 'exp_gained': 0, 'messages': [], 'quest_completed': [], 'already_completed': False}
+
+    async def _evaluate(self, user_id: int, rules: List[QuestRule], occurrences: int,
+                        event_log: Optional[Tuple[str, str]] = None) -> Dict[str, Any]:
+        result = self._new_result()
+        keys = set()
+        for rule in rules:
+            keys.add(rule.own_key)
+            if rule.counts:
+                keys.add(rule.counts)
+
+        async with self._user_lock(user_id):
+            counts = await self.data_manager.get_quest_log_counts(user_id, keys)
+            # 모든 규칙이 이번 기간 상한까지 이미 지급된 상태 (호출자가 재시도를 멈춰도 되는지 판단용)
+            result['already_completed'] = bool(rules) and all(
+                rule.cap is not None and counts.get(rule.own_key, 0) >= rule.cap for rule in rules
+            )
+            entries = []
+            if event_log:
+                entries.append((event_log[0], event_log[1], 0, occurrences))
+                for period in PERIODS:
+                    key = event_log + (period,)
+                    if key in counts:
+                        counts[key] += occurrences
+
+            for rule in rules:
+                n = rule.grants(counts, occurrences)
+                if not n:
+                    continue
+                entries.append((rule.log[0], rule.log[1], rule.exp, n))
+                for period in PERIODS:
+                    key = rule.log + (period,)
+                    if key in counts:
+                        counts[key] += n
+                result['exp_gained'] += rule.exp * n
+                for _ in range(n):
+                    result['quest_completed'].append(rule.completed)
+                    result['messages'].append(rule.message.format(exp=rule.exp))
+
+            if entries:
+                await self.data_manager.apply_quest_logs(user_id, entries)
+        result['success'] = bool(result['quest_completed'])
+        return result
+
+    async def handle(self, user_id: int, event: str, count: int = 1) -> Dict[str, Any]:
+        """이벤트 count회를 이 이벤트에 걸린 모든 규칙으로 평가하고 지급합니다."""
+        rules = self.by_event.get(event, [])
+        event_log = self.event_logs.get(event)
+        if not rules and not event_log:
+            return self._new_result()
+        return await self._evaluate(user_id, rules, count, event_log)
+
+    async def force(self, user_id: int, name: str) -> Dict[str, Any]:
+        """
+        관리자 강제 완료: force가 허용된 주간 규칙을 이번 주에 한 번 지급합니다.
+        마일스톤 조건(at)과 log 설정은 무시하고 퀘스트 이름으로 기록하며,
+        같은 이름의 기록(이벤트 기록 포함)이 이번 주에 있으면 지급하지 않습니다.
+        """
+        rule = self.rules.get(name)
+        if rule is None or not rule.force or rule.category != 'weekly':
+            result = self._new_result()
+            result['messages'].append("이 주간 퀘스트는 강제 완료가 지원되지 않습니다.")
+            return result
+
+        forced = QuestRule(rule.category, rule.name, {
+            'exp': rule.exp, 'period': 'week', 'cap': 1,
+            'message': f"✨ {rule.name} 주간 퀘스트 완료! **+{{exp}} 다공**",
+        })
+        forced.completed = rule.name
+        result = await self._evaluate(user_id, [forced], 1)
+        if not result['success']:
+            result['messages'].append("이미 이번 주에 완료한 퀘스트입니다.")
+        return result
@@ -0,0 +1,113 @@
+# rank_service.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# loader(bucket) -> [(user_id, score, rank), ...] 순위 순서 (RANK() OVER 결과)
+RankLoader = Callable[[Hashable], Awaitable[List[Tuple[int, int, int]]]]
+
+
+def rank_query(table: str, score: str, where: str = "") -> str:
+    """table의 score 내림차순 RANK() OVER 조회문 (score가 0 이하인 행은 제외)"""
+    condition = f"{where} AND {score} > 0" if where else f"{score} > 0"
+    return f"""
+        SELECT user_id, {score}, RANK() OVER (ORDER BY {score} DESC) AS rank
+          FROM {table}
+         WHERE {condition}
+         ORDER BY rank, user_id
+    """
+
+
+class RankBoard:
+    """한 (scope, bucket)의 순위 목록과 user_id -> 위치 색인"""
+
+    __slots__ = ("bucket", "entries", "index")
+
+    def __init__(self, bucket: Hashable, entries: List[Tuple[int, int, int]]):
+        self.bucket = bucket
+        self.entries = entries
+        self.index = {user_id: pos for pos, (user_id, _, _) in enumerate(entries)}
+
+    def _entry(self, pos: int) -> Optional[Dict[str, int]]:
+        if 0 <= pos < len(self.entries):
+            user_id, score, rank = self.entries[pos]
+            return {'user_id': user_id, 'score': score, 'rank': rank}
+        return None
+
+    def lookup(self, user_id: int) -> Dict[str, Any]:
+        """
+        {rank, score, total, above, below, gap}
+        - 순위에 없는 유저(점수 0)는 rank = 점수 있는 유저 수 + 1, above = 꼴찌
+        - above: 나보다 점수가 높은 가장 가까운 유저 (공동 순위는 건너뜀), gap: 그 유저와의 점수 차
+        - below: 나보다 점수가 낮은 가장 가까운 유저
+        """
+        total = len(self.entries)
+        pos = self.index.get(user_id)
+        if pos is None:
+            above = self._entry(total - 1)
+            return {
+                'rank': total + 1, 'score': 0, 'total': total,
+                'above': above, 'below': None,
+                'gap': above['score'] if above else 0,
+            }
+
+        _, score, rank = self.entries[pos]
+        # 같은 순위(동점)인 구간 [rank-1, end) 바깥의 바로 위/아래 유저
+        above = self._entry(rank - 2)
+        end = pos + 1
+        while end < total and self.entries[end][2] == rank:
+            end += 1
+        below = self._entry(end)
+        return {
+            'rank': rank, 'score': score, 'total': total,
+            'above': above, 'below': below,
+            'gap': above['score'] - score if above else 0,
+        }
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int, int]]:
+        return self.entries[offset:offset + limit]
+
+
+class RankService:
+    """
+    scope(예: 'daily', 'weekly', 'total')별 RANK() OVER 순위를 (scope, bucket) 단위로 메모리에 보관합니다.
+    - 처음 조회할 때 loader로 한 번 읽고, 같은 버킷의 다음 조회는 메모리에서 처리
+    - 데이터를 쓰는 쪽에서 invalidate(scope, bucket)를 호출하면 그 버킷만 버림 (TTL 없음)
+    - 버킷이 바뀌면(날짜/주가 넘어감) 새 버킷으로 다시 읽고 지난 버킷은 버림
+    """
+
+    def __init__(self, loaders: Dict[str, RankLoader]):
+        self.loaders = loaders
+        self._boards: Dict[str, RankBoard] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generation: Dict[str, int] = {}
+
+    def invalidate(self, scope: Optional[str] = None, bucket: Hashable = None):
+        """scope/bucket에 해당하는 캐시를 버립니다. scope를 생략하면 전체, bucket을 생략하면 scope의 모든 버킷"""
+        scopes = list(self.loaders) if scope is None else [scope]
+        for name in scopes:
+            self._generation[name] = self._generation.get(name, 0) + 1
+            board = self._boards.get(name)
+            if board is not None and (bucket is None or board.bucket == bucket):
+                del self._boards[name]
+
+    async def board(self, scope: str, bucket: Hashable = None) -> RankBoard:
+        board = self._boards.get(scope)
+        if board is not None and board.bucket == bucket:
+            return board
+
+        lock = self._locks.setdefault(scope, asyncio.Lock())
+        async with lock:
+            board = self._boards.get(scope)
+            if board is None or board.bucket != bucket:
+                generation = self._generation.get(scope, 0)
+                board = RankBoard(bucket, list(await self.loaders[scope](bucket)))
+                # 읽는 동안 쓰기가 있었으면 낡은 결과이므로 이번 호출에만 쓰고 보관하지 않음
+                if generation == self._generation.get(scope, 0):
+                    self._boards[scope] = board
+            return board
+
+    async def lookup(self, scope: str, user_id: int, bucket: Hashable = None) -> Dict[str, Any]:
+        return (await self.board(scope, bucket)).lookup(user_id)
+
+    async def get_rank(self, scope: str, user_id: int, bucket: Hashable = None) -> int:
+        return (await self.lookup(scope, user_id, bucket))['rank']
@@ -0,0 +1,291 @@
+# voice_leaderboard.py
+import asyncio
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import pytz
+
+from DataManager import DataManager
+
+KST = pytz.timezone("Asia/Seoul")
+LIVE_PERIODS = ("일간", "주간", "월간")
+
+
+def period_bucket(period: str, base_datetime: datetime) -> Optional[str]:
+    """기간별 버킷 키 (일간: 날짜, 주간: 월요일 날짜, 월간: 'YYYY-MM')"""
+    base = base_datetime.astimezone(KST)
+    if period == "일간":
+        return base.strftime("%Y-%m-%d")
+    if period == "주간":
+        return (base - timedelta(days=base.weekday())).strftime("%Y-%m-%d")
+    if period == "월간":
+        return base.strftime("%Y-%m")
+    return None
+
+
+class _Board:
+    """한 기간 버킷의 유저별 합계와 (-seconds, user_id) 정렬 목록"""
+
+    __slots__ = ("bucket", "totals", "order")
+
+    def __init__(self, bucket: str, totals: Optional[Dict[int, int]] = None):
+        self.bucket = bucket
+        self.totals: Dict[int, int] = {}
+        self.order: List[Tuple[int, int]] = []
+        if totals:
+            self.totals = {uid: secs for uid, secs in totals.items() if secs > 0}
+            self.order = sorted((-secs, uid) for uid, secs in self.totals.items())
+
+    def add(self, user_id: int, seconds: int):
+        old = self.totals.get(user_id, 0)
+        if old:
+            idx = bisect_left(self.order, (-old, user_id))
+            del self.order[idx]
+        new = old + seconds
+        if new > 0:
+            self.totals[user_id] = new
+            insort(self.order, (-new, user_id))
+        else:
+            self.totals.pop(user_id, None)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        seconds = self.totals.get(user_id)
+        if not seconds:
+            return None
+        return bisect_left(self.order, (-seconds, user_id)) + 1
+
+    def total(self, user_id: int) -> int:
+        return self.totals.get(user_id, 0)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int]]:
+        return self.order[offset:offset + limit]
+
+
+class _Overlay:
+    """
+    보드는 그대로 두고 몇 명의 추가 초(extra)를 읽는 시점에 합쳐 보여주는 뷰
+    - 추가분이 있는 유저만 따로 정렬해 두고, 나머지는 원래 order를 이분 탐색으로 읽음
+    - 조회 비용은 O(K + log N) (K: 추가분이 있는 유저 수), 보드 사본을 만들지 않음
+    """
+
+    __slots__ = ("base", "totals", "removed", "added", "adjusted")
+
+    def __init__(self, base: _Board, extra: Dict[int, int]):
+        self.base = base
+        self.adjusted = set()
+        self.removed: List[Tuple[int, int]] = []  # 원래 보드에서 빠지는 (-seconds, user_id)
+        self.added: List[Tuple[int, int]] = []    # 새 합계로 다시 들어가는 (-seconds, user_id)
+        self.totals: Dict[int, int] = {}
+        for user_id, seconds in extra.items():
+            if not seconds:
+                continue
+            old = base.totals.get(user_id, 0)
+            new = old + seconds
+            self.adjusted.add(user_id)
+            if old:
+                self.removed.append((-old, user_id))
+            if new > 0:
+                self.totals[user_id] = new
+                self.added.append((-new, user_id))
+        self.removed.sort()
+        self.added.sort()
+
+    def total(self, user_id: int) -> int:
+        if user_id in self.adjusted:
+            return self.totals.get(user_id, 0)
+        return self.base.totals.get(user_id, 0)
+
+    def __len__(self) -> int:
+        return len(self.base.order) - len(self.removed) + len(self.added)
+
+    def _before(self, key: Tuple[int, int]) -> int:
+        """합친 순서에서 key보다 앞에 오는 항목 수"""
+        return (bisect_left(self.base.order, key) - bisect_left(self.removed, key)
+                + bisect_left(self.added, key))
+
+    def rank(self, user_id: int) -> Optional[int]:
+        seconds = self.total(user_id)
+        if not seconds:
+            return None
+        return self._before((-seconds, user_id)) + 1
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int]]:
+        order, added = self.base.order, self.added
+        # 합친 위치가 offset 이하인 가장 뒤의 원래 보드 위치 i를 이분 탐색
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(order[mid]) <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        i = max(lo - 1, 0)
+        if i < len(order) and self._before(order[i]) <= offset:
+            j = bisect_left(added, order[i])
+            pos = self._before(order[i])
+        else:
+            i = j = pos = 0
+
+        rows: List[Tuple[int, int]] = []
+        while len(rows) < limit and (i < len(order) or j < len(added)):
+            if i < len(order) and order[i][1] in self.adjusted:
+                i += 1
+                continue
+            if j < len(added) and (i >= len(order) or added[j] < order[i]):
+                item = added[j]
+                j += 1
+            else:
+                item = order[i]
+                i += 1
+            if pos >= offset:
+                rows.append(item)
+            pos += 1
+        return rows
+
+
+class VoiceLeaderboard:
+    """
+    추적 채널 기준 일간/주간/월간 음성 순위를 메모리에 유지합니다.
+    - 서버(guild_id)별 보드와 전체 서버 보드(guild_id=None)를 처음 조회할 때 SQLite에서 구성
+    - 이후 DataManager.add_voice_time 누적분(아직 flush되지 않은 초 포함)으로 증분 갱신
+    """
+
+    _instance = None
+    # channel_ids를 확장해 기록한 expanded_tracked_channels의 source (SQL 조회는 ID 목록 대신 이 조인 사용)
+    source = "voice"
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.data_manager = DataManager()
+            cls._instance.channel_ids = None
+            cls._instance.boards = {}  # {(guild_id, period): _Board}
+            cls._instance._rebuild_lock = asyncio.Lock()
+            cls._instance.data_manager.add_voice_listener(cls._instance._on_voice_time)
+        return cls._instance
+
+    def _on_voice_time(self, date_str: str, user_id: int, channel_id: int, seconds: int):
+        if self.channel_ids is None or channel_id not in self.channel_ids:
+            return
+        day = KST.localize(datetime.strptime(date_str, "%Y-%m-%d"))
+        guild_id = self.data_manager.get_channel_guild(channel_id)
+        for (board_guild, period), board in list(self.boards.items()):
+            # 서버를 모르는(0) 추적 채널은 SQL 조회와 같이 모든 서버 보드에 포함
+            if board_guild is not None and guild_id and board_guild != guild_id:
+                continue
+            bucket = period_bucket(period, day)
+            if board.bucket < bucket:
+                # 기간이 바뀌었으면 새 버킷으로 교체
+                board = self.boards[(board_guild, period)] = _Board(bucket)
+            elif board.bucket != bucket:
+                continue
+            board.add(user_id, seconds)
+
+    def invalidate(self):
+        """다음 ensure_ready 호출 때 SQLite에서 다시 구성하도록 표시합니다."""
+        self.channel_ids = None
+        self.boards = {}
+
+    async def ensure_ready(self, channel_ids: Iterable[int], guild_id: Optional[int] = None):
+        """추적 채널 목록이 바뀌었거나 해당 서버 보드가 없거나 지난 기간이면 구성합니다."""
+        channel_ids = frozenset(channel_ids)
+        if self.channel_ids != channel_ids:
+            self.channel_ids = channel_ids
+            self.boards = {}
+        now = datetime.now(KST)
+        if any(self._stale((guild_id, period), now) for period in LIVE_PERIODS):
+            await self.rebuild(channel_ids, guild_id)
+
+    def _stale(self, key: Tuple[Optional[int], str], now: datetime) -> bool:
+        board = self.boards.get(key)
+        return board is None or board.bucket != period_bucket(key[1], now)
+
+    async def rebuild(self, channel_ids: Iterable[int], guild_id: Optional[int] = None):
+        async with self._rebuild_lock:
+            channel_ids = frozenset(channel_ids)
+            if self.channel_ids != channel_ids:
+                self.channel_ids = channel_ids
+                self.boards = {}
+            now = datetime.now(KST)
+            for period in LIVE_PERIODS:
+                if not self._stale((guild_id, period), now):
+                    continue
+                all_data, _, _ = await self.data_manager.get_all_users_times(
+                    period, now, self.source, guild_id=guild_id
+                )
+                # 조회 직후(중간에 await 없이) 교체하므로 이후 누적분은 새 보드에 반영됨
+                self.boards[(guild_id, period)] = _Board(
+                    period_bucket(period, now),
+                    {uid: sum(times.values()) for uid, times in all_data.items()},
+                )
+
+    def covers(self, period: str, base_datetime: Optional[datetime] = None, guild_id: Optional[int] = None) -> bool:
+        """해당 기간/기준일 조회를 메모리 순위로 처리할 수 있는지 여부"""
+        if self.channel_ids is None or period not in LIVE_PERIODS:
+            return False
+        base_datetime = base_datetime or datetime.now(KST)
+        board = self._current_board(period, guild_id)
+        return board is not None and board.bucket == period_bucket(period, base_datetime)
+
+    def _current_board(self, period: str, guild_id: Optional[int] = None) -> Optional[_Board]:
+        board = self.boards.get((guild_id, period))
+        if board is None or board.bucket != period_bucket(period, datetime.now(KST)):
+            return None
+        return board
+
+    def _view(self, period: str, extra: Optional[Dict[int, int]] = None, guild_id: Optional[int] = None):
+        """
+        현재 보드를 반환합니다. extra={user_id: seconds}를 주면 보드는 그대로 두고
+        읽을 때 그만큼 더해 보여주는 _Overlay를 반환합니다. (진행 중 세션의 미적립 시간 반영용)
+        """
+        board = self._current_board(period, guild_id)
+        if board is None or not extra:
+            return board
+        return _Overlay(board, extra)
+
+    def ranked(self, period: str, guild_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(user_id, seconds)를 순위 순서대로 반환합니다."""
+        board = self._current_board(period, guild_id)
+        if board is None:
+            return []
+        return [(uid, -neg) for neg, uid in board.order]
+
+    def get_page(
+        self,
+        period: str,
+        offset: int,
+        limit: int,
+        extra: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        board = self._view(period, extra, guild_id)
+        if board is None:
+            return []
+        return [(uid, -neg) for neg, uid in board.page(offset, limit)]
+
+    def count(self, period: str, extra: Optional[Dict[int, int]] = None, guild_id: Optional[int] = None) -> int:
+        board = self._view(period, extra, guild_id)
+        return len(board) if board else 0
+
+    def get_rank(
+        self,
+        user_id: int,
+        period: str,
+        extra: Optional[Dict[int, int]] = None,
+        guild_id: Optional[int] = None
+    ) -> Tuple[Optional[int], int, int]:
+        """(rank, total_users, user_total_seconds)"""
+        board = self._view(period, extra, guild_id)
+        if board is None:
+            return None, 0, 0
+        return board.rank(user_id), len(board), board.total(user_id)
+
+    def get_totals(self, period: str, user_ids: Iterable[int], guild_id: Optional[int] = None) -> Dict[int, int]:
+        """주어진 유저들의 현재 기간 합계 초 {user_id: seconds}"""
+        board = self._current_board(period, guild_id)
+        if board is None:
+            return {}
+        return {uid: board.totals[uid] for uid in user_ids if uid in board.totals}
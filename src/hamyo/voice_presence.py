@@ -0,0 +1,123 @@
+# voice_presence.py
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from DataManager import KST_OFFSET
+
+DAY_SECONDS = 86400
+
+
+def kst_day(ts: int) -> int:
+    """unix timestamp의 KST 날짜를 1970-01-01 기준 일수로 반환합니다."""
+    return (ts + KST_OFFSET) // DAY_SECONDS
+
+
+def kst_day_end(day: int) -> int:
+    """KST 일수 day가 끝나는(다음 날 0시) unix timestamp"""
+    return (day + 1) * DAY_SECONDS - KST_OFFSET
+
+
+class Presence:
+    """
+    음성 채널에 있는 한 유저의 세션 상태
+    - mono: 마지막으로 적립한 시점의 time.monotonic() 값 (경과 시간 계산용, 시계 변경 영향 없음)
+    - ts: 마지막으로 적립한 시점의 unix timestamp (초 단위 정수)
+    - day/day_end: ts의 KST 일수와 그 날이 끝나는 timestamp (자정 판정을 정수 비교로 처리)
+    """
+
+    __slots__ = ("user_id", "channel_id", "guild_id", "session_id", "mono", "ts", "day", "day_end")
+
+    def __init__(self, user_id: int, channel_id: int, guild_id: Optional[int], ts: int, mono: float):
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.session_id: Optional[int] = None
+        self.mono = mono
+        self.ts = ts
+        self.day = kst_day(ts)
+        self.day_end = kst_day_end(self.day)
+
+    def advance(self, seconds: int):
+        """적립한 seconds만큼 체크포인트를 옮깁니다. (초 단위로 잘린 나머지는 mono에 남음)"""
+        self.mono += seconds
+        self.ts += seconds
+        if self.ts >= self.day_end:
+            self.day = kst_day(self.ts)
+            self.day_end = kst_day_end(self.day)
+
+    def elapsed(self, now_mono: float) -> int:
+        """마지막 체크포인트 이후 경과한 정수 초"""
+        return int(now_mono - self.mono)
+
+
+class PresenceTable:
+    """
+    진행 중인 음성 세션 {(user_id, channel_id): Presence}
+    유저별 색인을 함께 두어 유저 단위 조회/반복 중 삭제를 싸게 처리합니다.
+    """
+
+    __slots__ = ("_sessions", "_by_user")
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[int, int], Presence] = {}
+        self._by_user: Dict[int, Dict[int, Presence]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[Presence]:
+        return iter(self._sessions.values())
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return key in self._sessions
+
+    def get(self, user_id: int, channel_id: int) -> Optional[Presence]:
+        return self._sessions.get((user_id, channel_id))
+
+    def add(
+        self,
+        user_id: int,
+        channel_id: int,
+        guild_id: Optional[int],
+        ts: int,
+        mono: Optional[float] = None
+    ) -> Presence:
+        """ts(unix timestamp)부터 적립할 세션을 추가합니다. mono를 생략하면 현재 시각 기준으로 환산합니다."""
+        if mono is None:
+            mono = time.monotonic() - (time.time() - ts)
+        presence = Presence(user_id, channel_id, guild_id, ts, mono)
+        self._sessions[(user_id, channel_id)] = presence
+        self._by_user.setdefault(user_id, {})[channel_id] = presence
+        return presence
+
+    def remove(self, user_id: int, channel_id: int) -> Optional[Presence]:
+        presence = self._sessions.pop((user_id, channel_id), None)
+        if presence is not None:
+            channels = self._by_user[user_id]
+            del channels[channel_id]
+            if not channels:
+                del self._by_user[user_id]
+        return presence
+
+    def snapshot(self) -> List[Presence]:
+        """반복 중 await로 추가/삭제되어도 안전한 사본"""
+        return list(self._sessions.values())
+
+    def user_ids(self) -> set:
+        return set(self._by_user)
+
+    def for_user(self, user_id: int) -> List[Presence]:
+        return list(self._by_user.get(user_id, {}).values())
+
+    def members(
+        self,
+        channel_ids: Optional[Iterable[int]] = None,
+        guild_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """현재 음성 채널에 있는 (user_id, channel_id) 목록. channel_ids/guild_id로 거를 수 있습니다."""
+        channel_set = set(channel_ids) if channel_ids is not None else None
+        return [
+            (p.user_id, p.channel_id) for p in self._sessions.values()
+            if (channel_set is None or p.channel_id in channel_set)
+            and (guild_id is None or p.guild_id == guild_id or (p.guild_id is None and channel_set is not None))
+        ]
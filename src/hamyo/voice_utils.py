@@ -1,112 +1,143 @@
 # voice_utils.py
+import asyncio
 import discord
-from typing import List, Set
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
 from DataManager import DataManager
 
-async def get_expanded_tracked_channels(
-    bot: discord.Client,
-    data_manager: DataManager,
-    source: str = "voice"
-) -> List[int]:
-    """
-    tracked_channels 테이블에 등록된 값(카테고리/채널 혼재)을
-    실제 집계에 쓰일 '음성/스테이지 채널 ID' 목록으로 확장해 반환.
-    - 카테고리 → 하위 voice + stage 채널 포함
-    - 삭제된 채널 → deleted_channels 테이블에서 카테고리 매핑으로 보강
-    - 삭제된 카테고리 → 해당 카테고리에 속한 삭제된 채널도 포함
-    """
-    tracked_ids = await data_manager.get_tracked_channels(source)
-    expanded_ids: Set[int] = set()
-
-    category_ids: Set[int] = set()
-    deleted_category_ids: Set[int] = set()  # 삭제된 카테고리 ID 저장
-    
-    # 1) 등록 목록을 분류
-    for cid in tracked_ids:
-        ch = bot.get_channel(cid)
-        if ch is None:
-            # fetch_channel은 레이트 제한도 있고 실패 가능성 있으니, 먼저 get_channel로 시도
-            try:
-                ch = await bot.fetch_channel(cid)
-            except Exception:
-                ch = None
-
-        if isinstance(ch, discord.CategoryChannel):
-            category_ids.add(cid)
-        elif isinstance(ch, (discord.VoiceChannel, discord.StageChannel)):
-            expanded_ids.add(cid)
-        else:
-            # 삭제되었거나 접근 불가 → 삭제된 카테고리로 간주하여 deleted_channels에서 조회
-            deleted_category_ids.add(cid)
-
-    # 2) 카테고리 하위의 활성 채널(보이스 + 스테이지) 추가
-    for cat_id in category_ids:
-        cat = bot.get_channel(cat_id) or await bot.fetch_channel(cat_id)
-        if isinstance(cat, discord.CategoryChannel):
-            for vc in getattr(cat, "voice_channels", []):
-                expanded_ids.add(vc.id)
-            # ✅ Stage 채널도 포함
-            for sc in getattr(cat, "stage_channels", []):
-                expanded_ids.add(sc.id)
-
-    # 3) 삭제된 채널(카테고리 매핑 보유분) 추가 - 활성 카테고리 + 삭제된 카테고리 모두 포함
-    all_category_ids = category_ids | deleted_category_ids
-    if all_category_ids:
-        deleted_ids = await data_manager.get_deleted_channels_by_categories(list(all_category_ids))
-        expanded_ids.update(int(i) for i in deleted_ids)
-
-    return list(expanded_ids)
-
-async def get_herb_expanded_tracked_channels(
-    bot: discord.Client,
-    data_manager: DataManager,
-    source: str = "herb"
-) -> List[int]:
+TRACKED_CHANNEL_TYPES = (discord.VoiceChannel, discord.StageChannel, discord.CategoryChannel)
+
+
+class TrackedChannelRegistry:
     """
-    tracked_channels 테이블에 등록된 값(카테고리/채널 혼재)을
-    실제 집계에 쓰일 '음성/스테이지 채널 ID' 목록으로 확장해 반환.
-    - 카테고리 → 하위 voice + stage 채널 포함
-    - 삭제된 채널 → deleted_channels 테이블에서 카테고리 매핑으로 보강
-    - 삭제된 카테고리 → 해당 카테고리에 속한 삭제된 채널도 포함
+    source('voice', 'aginari' 등)별로 확장된 추적 채널 ID 집합을 보관합니다.
+    - 채널 생성/삭제/이동, 추적 채널 등록/제거 시 invalidate로 정확히 무효화 (TTL 없음)
+    - 확장은 게이트웨이 캐시(get_channel)를 사용하고, 캐시에 없는 ID만 한 번 REST로 확인
+    - REST에서 404가 난 ID는 missing_channels에 기록해 이후 조회 없이 삭제된 카테고리로 처리
+    - 확장 결과는 expanded_tracked_channels 테이블에도 저장되어, 조회 시 channel_filter로 source 이름을 넘길 수 있음
     """
-    tracked_ids = await data_manager.get_tracked_channels(source)
-    expanded_ids: Set[int] = set()
-
-    category_ids: Set[int] = set()
-    deleted_category_ids: Set[int] = set()  # 삭제된 카테고리 ID 저장
-    
-    # 1) 등록 목록을 분류
-    for cid in tracked_ids:
-        ch = bot.get_channel(cid)
-        if ch is None:
-            # fetch_channel은 레이트 제한도 있고 실패 가능성 있으니, 먼저 get_channel로 시도
-            try:
-                ch = await bot.fetch_channel(cid)
-            except Exception:
-                ch = None
-
-        if isinstance(ch, discord.CategoryChannel):
-            category_ids.add(cid)
-        elif isinstance(ch, (discord.VoiceChannel, discord.StageChannel)):
-            expanded_ids.add(cid)
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance.data_manager = DataManager()
+            cls._instance._expanded: Dict[str, FrozenSet[int]] = {}
+            cls._instance._locks: Dict[str, asyncio.Lock] = {}
+            cls._instance._generation = 0
+            cls._instance._missing: Optional[Set[int]] = None  # 삭제가 확인된 ID (missing_channels)
+        return cls._instance
+
+    def invalidate(self, source: Optional[str] = None):
+        """source를 주면 해당 source만, 아니면 전체 확장 결과를 버립니다."""
+        self._generation += 1
+        if source is None:
+            self._expanded.clear()
         else:
-            # 삭제되었거나 접근 불가 → 삭제된 카테고리로 간주하여 deleted_channels에서 조회
-            deleted_category_ids.add(cid)
-
-    # 2) 카테고리 하위의 활성 채널(보이스 + 스테이지) 추가
-    for cat_id in category_ids:
-        cat = bot.get_channel(cat_id) or await bot.fetch_channel(cat_id)
-        if isinstance(cat, discord.CategoryChannel):
-            for vc in getattr(cat, "voice_channels", []):
-                expanded_ids.add(vc.id)
-            # ✅ Stage 채널도 포함
-            for sc in getattr(cat, "stage_channels", []):
-                expanded_ids.add(sc.id)
-
-    # 3) 삭제된 채널(카테고리 매핑 보유분) 추가 - 활성 카테고리 + 삭제된 카테고리 모두 포함
-    all_category_ids = category_ids | deleted_category_ids
-    if all_category_ids:
-        deleted_ids = await data_manager.get_deleted_channels_by_categories(list(all_category_ids))
-        expanded_ids.update(int(i) for i in deleted_ids)
-
-    return list(expanded_ids)
+            self._expanded.pop(source, None)
+
+    async def _get_missing(self) -> Set[int]:
+        if self._missing is None:
+            self._missing = set(await self.data_manager.get_missing_channels())
+        return self._missing
+
+    async def is_missing(self, channel_id: int) -> bool:
+        return channel_id in await self._get_missing()
+
+    async def mark_missing(self, channel_ids: Iterable[int]):
+        """삭제가 확인된 ID를 기록하고 확장 결과를 무효화합니다."""
+        missing = await self._get_missing()
+        new_ids = [cid for cid in channel_ids if cid not in missing]
+        if not new_ids:
+            return
+        await self.data_manager.mark_channels_missing(new_ids)
+        missing.update(new_ids)
+        self.invalidate()
+
+    async def mark_present(self, channel_ids: Iterable[int]):
+        """다시 나타난 ID를 삭제 기록에서 제거합니다."""
+        missing = await self._get_missing()
+        found = [cid for cid in channel_ids if cid in missing]
+        if not found:
+            return
+        await self.data_manager.clear_missing_channels(found)
+        missing.difference_update(found)
+        self.invalidate()
+
+    async def get(self, bot: discord.Client, source: str = "voice") -> FrozenSet[int]:
+        expanded = self._expanded.get(source)
+        if expanded is not None:
+            return expanded
+
+        lock = self._locks.setdefault(source, asyncio.Lock())
+        async with lock:
+            expanded = self._expanded.get(source)
+            if expanded is None:
+                generation = self._generation
+                expanded = frozenset(await self._expand(bot, source))
+                # 준비 전에는 채널 캐시가 비어 있으므로, 확장 중 무효화되었으면 낡은 결과이므로 보관하지 않음
+                if bot.is_ready() and generation == self._generation:
+                    # 조회 쿼리가 source 이름으로 조인할 수 있도록 테이블에도 기록
+                    await self.data_manager.set_expanded_tracked_channels(source, expanded)
+                    self._expanded[source] = expanded
+            return expanded
+
+    async def _expand(self, bot: discord.Client, source: str) -> Set[int]:
+        """
+        tracked_channels 테이블에 등록된 값(카테고리/채널 혼재)을
+        실제 집계에 쓰일 '음성/스테이지 채널 ID' 목록으로 확장해 반환.
+        - 카테고리 → 하위 voice + stage 채널 포함
+        - 삭제된 채널 → deleted_channels 테이블에서 카테고리 매핑으로 보강
+        - 삭제된 카테고리 → 해당 카테고리에 속한 삭제된 채널도 포함
+        """
+        tracked_ids = await self.data_manager.get_tracked_channels(source)
+        missing = await self._get_missing()
+        expanded_ids: Set[int] = set()
+        gone_ids: List[int] = []
+        reappeared_ids: List[int] = []
+
+        category_ids: Set[int] = set()
+        deleted_category_ids: Set[int] = set()  # 삭제된 카테고리 ID 저장
+
+        # 1) 등록 목록을 분류
+        for cid in tracked_ids:
+            ch = bot.get_channel(cid)
+            if ch is None and cid not in missing and bot.is_ready():
+                # 삭제 여부를 모르는 ID만 REST로 확인 (404면 기록해서 다음부터 생략)
+                try:
+                    ch = await bot.fetch_channel(cid)
+                except discord.NotFound:
+                    gone_ids.append(cid)
+                except Exception:
+                    ch = None
+            elif ch is not None and cid in missing:
+                reappeared_ids.append(cid)
+
+            if isinstance(ch, discord.CategoryChannel):
+                category_ids.add(cid)
+                # 2) 카테고리 하위의 활성 채널(보이스 + 스테이지) 추가
+                for vc in getattr(ch, "voice_channels", []):
+                    expanded_ids.add(vc.id)
+                for sc in getattr(ch, "stage_channels", []):
+                    expanded_ids.add(sc.id)
+            elif isinstance(ch, (discord.VoiceChannel, discord.StageChannel)):
+                expanded_ids.add(cid)
+            else:
+                # 삭제된 카테고리로 간주하여 deleted_channels에서 조회
+                deleted_category_ids.add(cid)
+
+        # 3) 삭제된 채널(카테고리 매핑 보유분) 추가 - 활성 카테고리 + 삭제된 카테고리 모두 포함
+        all_category_ids = category_ids | deleted_category_ids
+        if all_category_ids:
+            deleted_ids = await self.data_manager.get_deleted_channels_by_categories(list(all_category_ids))
+            expanded_ids.update(int(i) for i in deleted_ids)
+
+        if gone_ids:
+            await self.data_manager.mark_channels_missing(gone_ids)
+            missing.update(gone_ids)
+        if reappeared_ids:
+            await self.data_manager.clear_missing_channels(reappeared_ids)
+            missing.difference_update(reappeared_ids)
+
+        return expanded_ids
+